@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
+from utils.quantiles import build_quantile_sketches, SKETCHES_PATH
+from utils.geo import build_zip_centroids, CENTROIDS_PATH
+from utils.nlp_analysis import build_review_corpus, REVIEW_CORPUS_PATH
 
 @st.cache_data  
 def load_and_merge_olist_data():
@@ -57,10 +60,24 @@ def load_and_merge_olist_data():
     df["csat_score"] = np.random.randint(1, 6, size=len(df))
 
     
+    # Corpus de avaliações deduplicado por review_id e tokenizado uma única vez,
+    # com a polaridade do texto replicada nas linhas de cada avaliação
+    review_corpus = build_review_corpus(df)
+    df["review_polarity"] = df["review_id"].map(review_corpus.set_index("review_id")["polarity"])
+    
     # Salvar como CSV e Parquet
     df.to_csv("olist_merged_data.csv", index=False)
     df.to_parquet("olist_merged_data.parquet", index=False)
     
+    # Sketches de quantis de entrega e ticket por dia x estado x categoria
+    build_quantile_sketches(df).to_parquet(SKETCHES_PATH, index=False)
+    
+    # Centroides dos prefixos de CEP para os mapas
+    build_zip_centroids(geolocation).to_parquet(CENTROIDS_PATH, index=False)
+    
+    # Corpus gravado depois do dataset consolidado (ver load_review_corpus)
+    review_corpus.to_parquet(REVIEW_CORPUS_PATH, index=False)
+    
     print("Dataset consolidado salvo com sucesso!")
 
 if __name__ == "__main__":
@@ -1,20 +1,32 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from utils.KPIs import load_data, calculate_kpis, calculate_acquisition_retention_kpis, filter_by_date_range, kpi_card, render_kpi_block, render_plotly_glass_card, render_kpi_block_title
+from utils.KPIs import load_data, get_data_version, calculate_kpis, calculate_acquisition_retention_kpis, filter_by_date_range, STANDARD_PERIODS, get_standard_date_range, kpi_card, render_kpi_block, render_plotly_glass_card, render_kpi_block_title, format_kpi_delta
 from utils.insights import (
     generate_overview_insights, render_overview_insights,
     calculate_customer_behavior_insights, render_customer_behavior_insights,
     render_revenue_insights, render_satisfaction_insights,
     render_delivery_insights, render_improvement_opportunities,
-    analyze_category_performance, render_category_recommendations
+    render_category_recommendations, CATEGORY_SCORE_WEIGHTS
 )
 from utils.descriptions import render_page_title
+from utils.kpi_planner import RerunContext, compute_page_kpis, compute_kpis, KPI_REGISTRY
+from utils.kpi_definitions import get_custom_kpis, format_kpi_value
+from utils.cube import build_daily_cube, get_prefix_index, calculate_period_comparison
+from utils.rolling import get_rolling_metrics, ROLLING_LABELS, DEFAULT_WINDOWS
+from utils.quantiles import load_quantile_sketches, query_quantiles
+from utils.sellers import get_seller_scorecard, rank_sellers, SELLER_METRICS
+from utils.geo import get_geo_layers, color_scale, GEO_METRICS, ZOOM_LEVELS
+from utils.anomalies import get_anomaly_alerts, filter_alerts
+from utils.categories import get_category_index, analyze_category_index
+from utils.bootstrap import get_bootstrap_intervals, DEFAULT_RESAMPLES
+from utils.precomputed import load_precomputed
+from utils.drivers import analyze_revenue_drivers, DRIVER_DIMS, DRIVER_EFFECTS
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-# Importar funções de análise NLP
-from utils.nlp_analysis import analyze_reviews
+import pydeck as pdk
+import threading
 
 
 
@@ -37,39 +49,43 @@ st.sidebar.title("Configurações")
 st.sidebar.subheader("Período de Análise")
 periodo = st.sidebar.selectbox(
     "Selecione o período:",
-    [
-        "Todo o período",
-        "Último mês",
-        "Últimos 2 meses",
-        "Último trimestre",
-        "Último semestre",
-        "Último ano",
-        "Últimos 2 anos"
-    ]
+    list(STANDARD_PERIODS) + ["Período personalizado"]
 )
 
+# Intervalo livre escolhido pelo usuário
+if periodo == "Período personalizado":
+    custom_range = st.sidebar.date_input(
+        "Intervalo de datas:",
+        value=((max_date - timedelta(days=30)).date(), max_date.date()),
+        min_value=min_date.date(),
+        max_value=max_date.date()
+    )
+
 # Calcular o período selecionado
 def get_date_range(periodo):
     hoje = max_date
     if periodo == "Todo o período":
         return None
-    elif periodo == "Último mês":
-        return [hoje - timedelta(days=30), hoje]
-    elif periodo == "Últimos 2 meses":
-        return [hoje - timedelta(days=60), hoje]
-    elif periodo == "Último trimestre":
-        return [hoje - timedelta(days=90), hoje]
-    elif periodo == "Último semestre":
-        return [hoje - timedelta(days=180), hoje]
-    elif periodo == "Último ano":
-        return [hoje - timedelta(days=365), hoje]
-    elif periodo == "Últimos 2 anos":
-        return [hoje - timedelta(days=730), hoje]
+    elif periodo == "Período personalizado":
+        # Enquanto o usuário escolhe apenas a data inicial, usa todo o período
+        if len(custom_range) != 2:
+            return None
+        return [pd.Timestamp(custom_range[0]), pd.Timestamp(custom_range[1]) + timedelta(days=1) - timedelta(seconds=1)]
+    return get_standard_date_range(periodo, hoje)
 
 # Aplicar filtro de data
 date_range = get_date_range(periodo)
 filtered_df = filter_by_date_range(df, date_range)
 
+# Totais instantâneos do período a partir do índice de somas prefixadas
+daily_cube = build_daily_cube(df, get_data_version())
+prefix_index = get_prefix_index(daily_cube, get_data_version())
+period_totals = prefix_index.range_totals(*(date_range or [None, None]))
+st.sidebar.caption(
+    f"Receita no período: R$ {period_totals['receita']:,.2f} · "
+    f"{int(period_totals['pedidos']):,} pedidos"
+)
+
 # Filtro de gasto com marketing
 st.sidebar.subheader("Total Gasto com Marketing")
 marketing_spend = st.sidebar.number_input(
@@ -81,13 +97,19 @@ marketing_spend = st.sidebar.number_input(
     help="Digite o valor total gasto com marketing no período selecionado"
 )
 
+# KPIs personalizados declarados em kpi_definitions.json (compilados uma vez por definição)
+custom_kpis = get_custom_kpis()
+
+# Dados pré-calculados (precompute_insights.py) para os períodos padrão; None -> cálculo ao vivo
+precomputed = load_precomputed(get_data_version(), periodo, marketing_spend)
+
 # Navegação
 st.sidebar.markdown("---")
 st.sidebar.title("Navegação")
 pagina = st.sidebar.radio(
     "Selecione a página:",
     ["Visão Geral", "Aquisição e Retenção", "Comportamento do Cliente",
-    "Produtos e Categorias","Análise de Churn","Análise Estratégica"]
+    "Produtos e Categorias","Vendedores","Mapa","Análise de Churn","Análise Estratégica"]
 )
 
 # Funções auxiliares
@@ -101,10 +123,46 @@ def format_percentage(value):
     """Formata um valor como porcentagem com duas casas decimais."""
     return f"{value*100:.2f}%"
 
+def render_custom_kpis(page, values=None):
+    """Renderiza os KPIs personalizados da página, calculando-os em um único plano se necessário."""
+    names = [name for name, spec in custom_kpis.items() if page in spec['pages']]
+    if not names:
+        return
+    if values is None:
+        context = RerunContext(filtered_df, params={'marketing_spend': marketing_spend})
+        values = compute_kpis(context, names, {**KPI_REGISTRY, **custom_kpis})
+    render_kpi_block_title("📐 KPIs Personalizados")
+    render_kpi_block(
+        kpi_values={custom_kpis[name]['label']: format_kpi_value(values[name], custom_kpis[name]['format']) for name in names},
+        cols_per_row=3
+    )
+
+@st.cache_resource
+def start_nlp_warmup():
+    """Importa e aquece o módulo de NLP em segundo plano, uma única vez por processo."""
+    def warm_up():
+        try:
+            from utils.nlp_analysis import warm_up_nlp
+            warm_up_nlp()
+        except LookupError:
+            # Recursos do NLTK ausentes: o erro aparece ao abrir a análise de textos
+            pass
+    thread = threading.Thread(target=warm_up, name="nlp-warmup", daemon=True)
+    thread.start()
+    return thread
+
 # Exibir a página selecionada
 if pagina == "Visão Geral":
-    kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
-    insights = generate_overview_insights(filtered_df)
+    if precomputed:
+        kpis, insights = precomputed['kpis'], precomputed['overview_insights']
+    else:
+        # KPIs padrão e personalizados da página em um único plano
+        rerun_context = RerunContext(filtered_df, params={'marketing_spend': marketing_spend})
+        kpis = compute_page_kpis("Visão Geral", rerun_context, custom_kpis)
+        insights = generate_overview_insights(filtered_df)
+    
+    # Comparações com o período anterior e o ano anterior a partir do índice do cubo diário
+    comparison = calculate_period_comparison(prefix_index, date_range)
     render_page_title("Resumo Executivo", "📊")
     
     kpi_values = {
@@ -112,7 +170,12 @@ if pagina == "Visão Geral":
         "📦 Total de Pedidos": format_value(kpis['total_orders'], is_integer=True),
         "👥 Total de Clientes": format_value(kpis['total_customers'], is_integer=True)
     }
-    render_kpi_block(kpi_values=kpi_values, cols_per_row=3)
+    kpi_deltas = {
+        "💰 Receita Total": format_kpi_delta(comparison['total_revenue']),
+        "📦 Total de Pedidos": format_kpi_delta(comparison['total_orders'])
+    }
+    render_kpi_block(kpi_values=kpi_values, cols_per_row=3, deltas=kpi_deltas)
+    render_custom_kpis("Visão Geral", None if precomputed else kpis)
     st.markdown("---")
     # Insights de Receita
     render_revenue_insights(insights)
@@ -129,6 +192,41 @@ if pagina == "Visão Geral":
     fig_revenue.update_layout(showlegend=False)
     render_plotly_glass_card("Evolução da Receita Mensal", fig_revenue)
     
+    # Decomposição da variação da receita (volume, mix e ticket) a partir do cubo
+    with st.expander("🔎 O que explica a variação da receita?"):
+        reference_label = st.radio("Comparar com:", ["Período anterior", "Mesmo período do ano anterior"], horizontal=True)
+        revenue_drivers = analyze_revenue_drivers(
+            df, get_data_version(), date_range,
+            reference='previous' if reference_label == "Período anterior" else 'yoy'
+        )
+        if revenue_drivers is None:
+            st.info("Selecione um período para comparar a receita com o período de referência.")
+        elif not revenue_drivers['reference_available']:
+            first_date = revenue_drivers['first_date']
+            st.info(
+                f"Sem dados para o período de referência "
+                f"({revenue_drivers['previous'][0]:%d/%m/%Y}–{revenue_drivers['previous'][1]:%d/%m/%Y})"
+                + (f": os pedidos começam em {first_date:%d/%m/%Y}." if first_date is not None else ".")
+            )
+        else:
+            st.markdown(
+                f"Variação total da receita: **R$ {format_value(revenue_drivers['total_change'])}** "
+                f"({revenue_drivers['previous'][0]:%d/%m/%Y}–{revenue_drivers['previous'][1]:%d/%m/%Y} → "
+                f"{revenue_drivers['current'][0]:%d/%m/%Y}–{revenue_drivers['current'][1]:%d/%m/%Y})"
+            )
+            for tab, (dim, dim_label) in zip(st.tabs(list(DRIVER_DIMS.values())), DRIVER_DIMS.items()):
+                with tab:
+                    contributors = revenue_drivers['drivers'][dim]
+                    effects = contributors[list(DRIVER_EFFECTS)].rename(columns=DRIVER_EFFECTS)
+                    effects.index = effects.index.astype(str)
+                    fig_drivers = px.bar(
+                        effects.reset_index().melt(id_vars='index', var_name='Efeito', value_name='Contribuição'),
+                        x='Contribuição', y='index', color='Efeito', orientation='h',
+                        labels={'index': dim_label, 'Contribuição': 'Contribuição (R$)'}
+                    )
+                    fig_drivers.update_layout(barmode='relative', yaxis=dict(autorange='reversed'))
+                    st.plotly_chart(fig_drivers, use_container_width=True)
+    
     # Experiência do Cliente
     render_page_title("Experiência do Cliente", "😊")
     
@@ -138,7 +236,12 @@ if pagina == "Visão Geral":
         "📦 Tempo de Entrega": f"{int(kpis['avg_delivery_time'])} dias",
         "❌ Taxa de Cancelamento": format_percentage(kpis['cancellation_rate'])
     }
-    render_kpi_block(kpi_values=exp_kpis, cols_per_row=3)
+    exp_deltas = {
+        "😊 Satisfação Média": format_kpi_delta(comparison['csat']),
+        "📦 Tempo de Entrega": format_kpi_delta(comparison['avg_delivery_time'], higher_is_better=False),
+        "❌ Taxa de Cancelamento": format_kpi_delta(comparison['cancellation_rate'], higher_is_better=False)
+    }
+    render_kpi_block(kpi_values=exp_kpis, cols_per_row=3, deltas=exp_deltas)
     st.markdown("---")
     # Insights de Satisfação e Entrega
     col1, col2 = st.columns(2)
@@ -147,6 +250,21 @@ if pagina == "Visão Geral":
     with col2:
         render_delivery_insights(insights)
     
+    # Percentis de entrega e ticket a partir dos sketches de quantis
+    quantile_sketches = load_quantile_sketches(df, get_data_version())
+    delivery_percentiles = query_quantiles(quantile_sketches, 'delivery_time', date_range=date_range)
+    ticket_percentiles = query_quantiles(quantile_sketches, 'ticket', date_range=date_range)
+    percentile_kpis = {
+        "📦 Entrega p50 / p90 / p99": f"{delivery_percentiles['p50']:.0f} / {delivery_percentiles['p90']:.0f} / {delivery_percentiles['p99']:.0f} dias",
+        "💰 Ticket p50 / p90 / p99": f"R$ {ticket_percentiles['p50']:,.0f} / {ticket_percentiles['p90']:,.0f} / {ticket_percentiles['p99']:,.0f}"
+    }
+    render_kpi_block(kpi_values=percentile_kpis, cols_per_row=2)
+    with st.expander("📍 Percentis de entrega por estado"):
+        st.dataframe(
+            query_quantiles(quantile_sketches, 'delivery_time', date_range=date_range, by='customer_state').round(1),
+            use_container_width=True
+        )
+    
     st.markdown("---")
     # Gráficos de Satisfação e Cancelamento
     col1, col2 = st.columns(2)
@@ -183,6 +301,27 @@ if pagina == "Visão Geral":
         )
         render_plotly_glass_card("Evolução da Taxa de Cancelamento", fig_cancellation)
     
+    # Alertas de anomalias nas séries diárias (geral, categorias e estados)
+    render_page_title("Alertas de Anomalias", "🚨")
+    only_negative = st.checkbox("Mostrar apenas alertas de impacto negativo", value=True)
+    alerts = filter_alerts(get_anomaly_alerts(df, get_data_version()), date_range, only_negative=only_negative)
+    if alerts.empty:
+        st.info("Nenhuma anomalia detectada no período selecionado.")
+    else:
+        st.caption(
+            f"{len(alerts)} alertas no período. Um alerta exige que ao menos dois detectores "
+            "(EWMA, mediana/MAD e dia da semana) concordem."
+        )
+        st.dataframe(
+            alerts.head(50).assign(date=alerts['date'].dt.date).round({'valor': 3, 'esperado': 3, 'score': 1}).rename(columns={
+                'date': 'Data', 'dimensao': 'Dimensão', 'segmento': 'Segmento', 'metrica': 'Métrica',
+                'valor': 'Valor', 'esperado': 'Esperado', 'score': '|z|', 'detectores': 'Detectores',
+                'direcao': 'Direção', 'impacto': 'Impacto'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    
     # ===== SEÇÃO 4: OPORTUNIDADES DE MELHORIA =====
     st.markdown("## 🎯 Oportunidades de Melhoria")
     
@@ -192,7 +331,12 @@ if pagina == "Visão Geral":
         "💸 Receita Perdida": f"R$ {format_value(kpis['lost_revenue'])}",
         "💰 Ticket Médio": f"R$ {format_value(kpis['average_ticket'])}"
     }
-    render_kpi_block(kpi_values=attention_kpis, cols_per_row=3)
+    attention_deltas = {
+        "🎯 Taxa de Abandono": format_kpi_delta(comparison['abandonment_rate'], higher_is_better=False),
+        "💸 Receita Perdida": format_kpi_delta(comparison['lost_revenue'], higher_is_better=False),
+        "💰 Ticket Médio": format_kpi_delta(comparison['average_ticket'])
+    }
+    render_kpi_block(kpi_values=attention_kpis, cols_per_row=3, deltas=attention_deltas)
     st.markdown("---")
     # Oportunidades de Melhoria
     render_improvement_opportunities(insights)
@@ -204,7 +348,7 @@ if pagina == "Visão Geral":
 
 elif pagina == "Análise Estratégica":
     render_page_title("Análise Estratégica", "📈")
-    kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
+    kpis = precomputed['kpis'] if precomputed else calculate_kpis(filtered_df, marketing_spend, date_range)
     
     # ===== SEÇÃO 1: VISÃO GERAL E KPIs PRINCIPAIS =====
     # Preparar dicionário de KPIs principais
@@ -370,6 +514,29 @@ elif pagina == "Análise Estratégica":
     # Renderizar gráfico com efeito glass
     render_plotly_glass_card("🔮 Evolução e Previsão de Receita", fig_forecast)
     
+    # Métricas móveis (7/30/90 dias) a partir do cubo diário
+    rolling_metrics = get_rolling_metrics(prefix_index, get_data_version(), date_range)
+    rolling_metric = st.selectbox(
+        "Métrica móvel:",
+        list(ROLLING_LABELS),
+        format_func=lambda metric: ROLLING_LABELS[metric]
+    )
+    fig_rolling = go.Figure()
+    for window in DEFAULT_WINDOWS:
+        fig_rolling.add_trace(go.Scatter(
+            x=rolling_metrics.index,
+            y=rolling_metrics[f'{rolling_metric}_{window}d'],
+            name=f'Média móvel {window} dias',
+            mode='lines'
+        ))
+    fig_rolling.update_layout(
+        xaxis_title="Data",
+        yaxis_title=ROLLING_LABELS[rolling_metric],
+        showlegend=True
+    )
+    fig_rolling.update_layout(dragmode=False, hovermode=False)
+    render_plotly_glass_card("📊 Métricas Móveis", fig_rolling)
+    
     # ===== SEÇÃO 3: SAZONALIDADE E PADRÕES DE VENDA =====
     st.header("📅 Sazonalidade e Padrões de Venda")
     
@@ -845,8 +1012,11 @@ elif pagina == "Análise Estratégica":
 
 elif pagina == "Aquisição e Retenção":
     render_page_title("Aquisição e Retenção", "🔄")
-    kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
-    acquisition_kpis = calculate_acquisition_retention_kpis(filtered_df, marketing_spend, date_range)
+    if precomputed:
+        kpis, acquisition_kpis = precomputed['kpis'], precomputed['acquisition_kpis']
+    else:
+        kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
+        acquisition_kpis = calculate_acquisition_retention_kpis(filtered_df, marketing_spend, date_range)
     
     # 📊 Métricas
     
@@ -1355,8 +1525,29 @@ elif pagina == "Aquisição e Retenção":
 
 elif pagina == "Comportamento do Cliente":
     render_page_title("Comportamento do Cliente", "👥")
-    kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
-    acquisition_kpis = calculate_acquisition_retention_kpis(filtered_df, marketing_spend, date_range)
+    
+    # Avaliações quase duplicadas (modelos/spam) podem ser desconsideradas nas notas e na análise de textos
+    st.sidebar.markdown("---")
+    exclude_duplicates = st.sidebar.checkbox(
+        "Excluir avaliações quase duplicadas",
+        value=False,
+        help="Mantém apenas a primeira avaliação de cada grupo de textos quase idênticos (MinHash/LSH)"
+    )
+    page_df, page_version = filtered_df, get_data_version()
+    if exclude_duplicates:
+        from utils.nlp_analysis import load_review_corpus
+        from utils.duplicates import get_near_duplicates
+        near_duplicates = get_near_duplicates(load_review_corpus(df, get_data_version()), get_data_version())
+        duplicate_ids = near_duplicates.loc[near_duplicates['duplicate'], 'review_id']
+        page_df = filtered_df.assign(
+            review_score=filtered_df['review_score'].mask(filtered_df['review_id'].isin(duplicate_ids))
+        )
+        page_version = f"{get_data_version()}-sem-duplicatas"
+    
+    # KPIs da página calculados pelo planejador, com intermediários compartilhados no rerun
+    rerun_context = RerunContext(page_df, params={'marketing_spend': marketing_spend})
+    use_precomputed = precomputed and not exclude_duplicates
+    kpis = precomputed['customer_kpis'] if use_precomputed else compute_page_kpis("Comportamento do Cliente", rerun_context, custom_kpis)
     
     # ===== SEÇÃO 1: VISÃO GERAL =====
     # Preparar dicionário de KPIs de Cliente
@@ -1364,7 +1555,7 @@ elif pagina == "Comportamento do Cliente":
     customer_kpis = {
         "🎯 Taxa de Abandono": format_percentage(kpis['abandonment_rate']),
         "😊 Satisfação do Cliente": format_value(kpis['csat']),
-        "🔄 Taxa de Recompra": format_percentage(acquisition_kpis['repurchase_rate'])
+        "🔄 Taxa de Recompra": format_percentage(kpis['repurchase_rate'])
     }
     render_kpi_block(kpi_values=customer_kpis, cols_per_row=3)
     
@@ -1372,28 +1563,71 @@ elif pagina == "Comportamento do Cliente":
     st.markdown("<h2 style='text-align: center;'>⏱️ Métricas de Tempo</h2>", unsafe_allow_html=True)
     time_kpis = {
         "📦 Tempo Médio de Entrega": f"{int(kpis['avg_delivery_time'])} dias",
-        "⏳ Tempo até 2ª Compra": f"{int(acquisition_kpis['avg_time_to_second'])} dias",
+        "⏳ Tempo até 2ª Compra": f"{int(kpis['avg_time_to_second'])} dias",
         "💰 Ticket Médio": f"R$ {format_value(kpis['average_ticket'])}"
     }
     render_kpi_block(kpi_values=time_kpis, cols_per_row=3)
+    render_custom_kpis("Comportamento do Cliente", None if use_precomputed else kpis)
+    
+    # Intervalos de confiança por bootstrap (reamostragem de pedidos)
+    st.markdown("<h2 style='text-align: center;'>📏 Intervalos de Confiança</h2>", unsafe_allow_html=True)
+    n_resamples = st.select_slider(
+        "Número de reamostras (bootstrap)",
+        options=[200, 500, 1000, 2000, 5000],
+        value=1000,
+        help="Mais reamostras tornam os limites mais estáveis, com maior custo de cálculo"
+    )
+    if use_precomputed and n_resamples == DEFAULT_RESAMPLES:
+        intervals = precomputed['bootstrap']
+    else:
+        intervals = get_bootstrap_intervals(page_df, page_version, date_range, n_resamples, n_jobs=4)
+    interval_formats = {
+        'total_revenue': lambda v: f"R$ {format_value(v)}",
+        'average_ticket': lambda v: f"R$ {format_value(v)}",
+        'csat': lambda v: f"{v:.2f}",
+        'cancellation_rate': format_percentage,
+        'ticket_vs_satisfaction': lambda v: f"{v:+.3f}",
+        'repurchase_vs_satisfaction': lambda v: f"{v:+.3f}"
+    }
+    interval_kpis = {intervals.loc[name, 'label']: fmt(intervals.loc[name, 'estimate']) for name, fmt in interval_formats.items()}
+    interval_ranges = {
+        intervals.loc[name, 'label']: f"IC 95%: {fmt(intervals.loc[name, 'lower'])} – {fmt(intervals.loc[name, 'upper'])}"
+        for name, fmt in interval_formats.items()
+    }
+    render_kpi_block(kpi_values=interval_kpis, cols_per_row=3, deltas=interval_ranges)
     
     st.markdown("---")
     
     # ===== SEÇÃO 2: ANÁLISE DETALHADA =====
-    render_customer_behavior_insights(filtered_df)
+    render_customer_behavior_insights(rerun_context.frame)
     
     # ===== SEÇÃO 3: ANÁLISE DE TEXTOS DAS AVALIAÇÕES =====
     st.header("📝 Análise de Textos das Avaliações")
     
-    # Realizar análise NLP
-    nlp_results = analyze_reviews(filtered_df)
+    # Realizar análise NLP (módulo importado só quando a seção é exibida)
+    from utils.nlp_analysis import analyze_reviews, load_review_corpus, select_reviews
+    from utils.topics import get_topic_models
+    from utils.term_frequency import get_term_frequency_index
+    review_corpus = load_review_corpus(df, get_data_version())
+    text_corpus = review_corpus
+    if exclude_duplicates:
+        text_corpus = review_corpus[~review_corpus['review_id'].isin(duplicate_ids)]
+    nlp_results = analyze_reviews(
+        rerun_context.frame,
+        corpus=text_corpus,
+        topic_models=get_topic_models(review_corpus, get_data_version()),
+        term_index=get_term_frequency_index(text_corpus, page_version),
+        date_range=date_range,
+        cache_key=(page_version, tuple(str(d) for d in date_range or ()))
+    )
     
     # Exibir wordclouds em três colunas
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.subheader("☀️ Avaliações Positivas")
-        st.pyplot(nlp_results['positive_wordcloud'])
+        if nlp_results['positive_wordcloud'] is not None:
+            st.image(nlp_results['positive_wordcloud'], caption="Palavras mais frequentes em avaliações positivas", use_column_width=True)
         
         st.markdown("**Palavras mais frequentes:**")
         for word, freq in nlp_results['positive_freq'].items():
@@ -1410,7 +1644,8 @@ elif pagina == "Comportamento do Cliente":
     st.markdown("---")
     with col2:
         st.subheader("⚖️ Avaliações Neutras")
-        st.pyplot(nlp_results['neutral_wordcloud'])
+        if nlp_results['neutral_wordcloud'] is not None:
+            st.image(nlp_results['neutral_wordcloud'], caption="Palavras mais frequentes em avaliações neutras", use_column_width=True)
         
         st.markdown("**Palavras mais frequentes:**")
         for word, freq in nlp_results['neutral_freq'].items():
@@ -1426,7 +1661,8 @@ elif pagina == "Comportamento do Cliente":
     
     with col3:
         st.subheader("🌧️ Avaliações Negativas")
-        st.pyplot(nlp_results['negative_wordcloud'])
+        if nlp_results['negative_wordcloud'] is not None:
+            st.image(nlp_results['negative_wordcloud'], caption="Palavras mais frequentes em avaliações negativas", use_column_width=True)
         
         st.markdown("**Palavras mais frequentes:**")
         for word, freq in nlp_results['negative_freq'].items():
@@ -1476,11 +1712,115 @@ elif pagina == "Comportamento do Cliente":
         "📈 Proporção Negativas": f"{(nlp_results['metrics']['negative_count'] / total_reviews):.1%}"
     }
     render_kpi_block(kpi_values=proportion_kpis, cols_per_row=3)
+    
+    # Polaridade do texto (léxico), independente da nota atribuída
+    st.markdown("---")
+    render_kpi_block_title("🧭 Polaridade do Texto")
+    polarity_kpis = {
+        "🧭 Polaridade Média (Positivas)": f"{nlp_results['metrics']['avg_positive_polarity']:+.2f}",
+        "🧭 Polaridade Média (Neutras)": f"{nlp_results['metrics']['avg_neutral_polarity']:+.2f}",
+        "🧭 Polaridade Média (Negativas)": f"{nlp_results['metrics']['avg_negative_polarity']:+.2f}",
+        "⚠️ Nota Alta com Texto Negativo": nlp_results['metrics']['positive_score_negative_text'],
+        "💬 Nota Baixa com Texto Positivo": nlp_results['metrics']['negative_score_positive_text']
+    }
+    render_kpi_block(kpi_values=polarity_kpis, cols_per_row=3)
+    
+    # Polaridade por categoria a partir do cubo diário separado por categoria
+    category_polarity = get_prefix_index(
+        build_daily_cube(df, get_data_version(), dims=('product_category_name',)),
+        get_data_version(),
+        split_by='product_category_name'
+    ).range_totals(*(date_range or [None, None]))
+    category_polarity = category_polarity[category_polarity['polarity_count'] >= 30]
+    if not category_polarity.empty:
+        category_polarity = (category_polarity['polarity_sum'] / category_polarity['polarity_count']).sort_values()
+        category_polarity = pd.concat([category_polarity.head(10), category_polarity.tail(10)])
+        category_polarity = category_polarity[~category_polarity.index.duplicated()]
+        fig_polarity = px.bar(
+            x=category_polarity.values,
+            y=category_polarity.index,
+            orientation='h',
+            labels={'x': 'Polaridade média do texto', 'y': 'Categoria'},
+            color=category_polarity.values,
+            color_continuous_scale='RdYlGn',
+            range_color=[-1, 1]
+        )
+        render_plotly_glass_card("Categorias com Texto Mais Negativo e Mais Positivo", fig_polarity)
+    
+    # Grupos de avaliações quase idênticas e os vendedores/produtos afetados
+    st.markdown("---")
+    render_kpi_block_title("🧬 Avaliações Quase Duplicadas")
+    from utils.duplicates import get_near_duplicates, duplicate_report, duplicate_summary, DUPLICATE_REPORT_DIMS
+    near_duplicates = get_near_duplicates(review_corpus, get_data_version())
+    period_corpus = select_reviews(review_corpus, date_range=date_range)
+    period_duplicates = near_duplicates[near_duplicates['review_id'].isin(period_corpus['review_id'])]
+    summary = duplicate_summary(period_duplicates)
+    render_kpi_block(kpi_values={
+        "🧬 Grupos de Textos Quase Idênticos": summary['clusters'],
+        "📝 Avaliações em Grupos": summary['clustered_reviews'],
+        "🚫 Cópias (excluíveis)": summary['duplicate_reviews']
+    }, cols_per_row=3)
+    if summary['clusters'] > 0:
+        for tab, (dim, dim_label) in zip(st.tabs(list(DUPLICATE_REPORT_DIMS.values())), DUPLICATE_REPORT_DIMS.items()):
+            with tab:
+                report = duplicate_report(period_corpus, period_duplicates, by=dim)
+                st.dataframe(report.rename(columns={
+                    'avaliacoes': 'Avaliações',
+                    'em_grupos': 'Em grupos',
+                    'grupos': 'Grupos',
+                    'participacao': 'Participação',
+                    'nota_media': 'Nota média',
+                    'nota_media_grupos': 'Nota média (grupos)'
+                }).rename_axis(dim_label), use_container_width=True)
+    
+    # Busca textual nas avaliações (índice invertido sobre os tokens do corpus)
+    st.markdown("---")
+    render_kpi_block_title("🔎 Busca nas Avaliações")
+    from utils.search import get_search_index
+    search_query = st.text_input(
+        "Buscar nas avaliações",
+        placeholder='Ex.: quebrado OR "embalagem violada"',
+        help=('Termos separados por espaço são combinados (E); use OR para alternativas e aspas para frases. '
+              'Palavras muito comuns (como "não" e "chegou") não fazem parte do índice e são ignoradas')
+    )
+    search_categories = st.multiselect(
+        "Categorias da busca",
+        sorted(review_corpus['product_category_name'].dropna().unique()),
+        help="Vazio para todas as categorias"
+    )
+    if search_query.strip():
+        search_results = get_search_index(text_corpus, page_version).search(search_query, date_range, search_categories)
+        if search_results['ignored']:
+            st.warning(
+                "Palavras ignoradas na busca (muito comuns, não fazem parte do índice): "
+                + ", ".join(search_results['ignored'])
+            )
+        render_kpi_block(kpi_values={
+            "🔎 Avaliações Encontradas": search_results['count'],
+            "⭐ Nota Média": format_value(search_results['avg_score']) if search_results['count'] else "-",
+            "🏷️ Categorias": len(search_results['categories'])
+        }, cols_per_row=3)
+        if search_results['count']:
+            trend = search_results['trend']
+            fig_search = px.line(
+                x=trend.index.to_timestamp(), y=trend.values, markers=True,
+                labels={'x': 'Mês', 'y': 'Avaliações'}
+            )
+            render_plotly_glass_card(f"Avaliações com \"{search_query.strip()}\" por Mês", fig_search)
+            st.dataframe(
+                search_results['reviews'][['date', 'review_score', 'product_category_name', 'review_comment_message']].rename(columns={
+                    'date': 'Data',
+                    'review_score': 'Nota',
+                    'product_category_name': 'Categoria',
+                    'review_comment_message': 'Avaliação'
+                }),
+                use_container_width=True, hide_index=True
+            )
 
 elif pagina == "Produtos e Categorias":
     render_page_title("Produtos e Categorias", "📦")
     st.title("Produtos e Categorias")
-    kpis = calculate_kpis(filtered_df, marketing_spend, date_range)
+    kpis = precomputed['kpis'] if precomputed else calculate_kpis(filtered_df, marketing_spend, date_range)
     
     # Adicionar filtro de categorias
     st.sidebar.markdown("---")
@@ -1609,8 +1949,23 @@ elif pagina == "Produtos e Categorias":
     # Análise de Categorias
     render_kpi_block_title("📦 Análise de Categorias")
     
+    # Filtro de estados e pesos do score, aplicados sobre o índice mensal das categorias
+    category_index = get_category_index(df, get_data_version())
+    score_states = st.multiselect(
+        "Estados considerados no ranking",
+        list(category_index.states),
+        help="Deixe vazio para considerar todos os estados"
+    )
+    with st.expander("⚖️ Pesos do score composto"):
+        weight_cols = st.columns(3)
+        score_weights = {
+            metric: weight_cols[i % 3].slider(label, 0.0, 1.0, weight, 0.05, key=f"peso_{metric}")
+            for i, (metric, (label, weight)) in enumerate(CATEGORY_SCORE_WEIGHTS.items())
+        }
+    
     # Calcular análise de categorias
-    category_analysis = analyze_category_performance(df)
+    category_analysis = analyze_category_index(category_index, date_range, score_states, score_weights)
+    st.caption("Ranking calculado com agregados mensais: períodos que cortam um mês incluem o mês inteiro, e o número de clientes é aproximado.")
     
     # Renderizar recomendações
     render_category_recommendations(category_analysis)
@@ -1732,7 +2087,116 @@ elif pagina == "Produtos e Categorias":
        - Avaliação média do mercado: {format_value(avg_rating_market)}/5.0
     """)
 
+elif pagina == "Vendedores":
+    render_page_title("Vendedores", "🏪")
+    seller_metrics = get_seller_scorecard(filtered_df, get_data_version(), date_range)
+    
+    # Visão geral dos vendedores ativos no período
+    seller_kpis = {
+        "🏪 Vendedores Ativos": format_value(len(seller_metrics), is_integer=True),
+        "💰 Receita Mediana por Vendedor": f"R$ {format_value(seller_metrics['revenue'].median())}",
+        "⏰ Entregas Atrasadas (média)": format_percentage(seller_metrics['late_share'].mean())
+    }
+    render_kpi_block(kpi_values=seller_kpis, cols_per_row=3)
+    st.markdown("---")
+    
+    # Ranking configurável
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        ranking_metric = st.selectbox(
+            "Métrica do ranking:",
+            list(SELLER_METRICS),
+            format_func=lambda metric: SELLER_METRICS[metric][0]
+        )
+    with col2:
+        ranking_size = st.slider("Quantidade de vendedores:", min_value=5, max_value=50, value=10, step=5)
+    with col3:
+        min_orders = st.number_input("Mínimo de pedidos:", min_value=1, value=10, step=1)
+    
+    seller_columns = {
+        'seller_city': 'Cidade',
+        'seller_state': 'Estado',
+        **{metric: label for metric, (label, _) in SELLER_METRICS.items()}
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 🌟 Melhores Vendedores")
+        best_sellers = rank_sellers(seller_metrics, ranking_metric, ranking_size, best=True, min_orders=min_orders)
+        st.dataframe(best_sellers[list(seller_columns)].rename(columns=seller_columns).round(2), use_container_width=True)
+    with col2:
+        st.markdown("### ⚠️ Vendedores que Precisam de Atenção")
+        worst_sellers = rank_sellers(seller_metrics, ranking_metric, ranking_size, best=False, min_orders=min_orders)
+        st.dataframe(worst_sellers[list(seller_columns)].rename(columns=seller_columns).round(2), use_container_width=True)
+    
+    # Receita x atrasos por vendedor
+    eligible_sellers = seller_metrics[seller_metrics['orders'] >= min_orders]
+    fig_sellers = px.scatter(
+        eligible_sellers,
+        x='late_share',
+        y='review_score',
+        size='revenue',
+        color='seller_state',
+        hover_name=eligible_sellers.index,
+        labels={'late_share': 'Entregas Atrasadas', 'review_score': 'Avaliação Média', 'seller_state': 'Estado'}
+    )
+    fig_sellers.update_layout(xaxis=dict(tickformat=".0%"))
+    render_plotly_glass_card("📊 Atrasos vs Avaliação por Vendedor", fig_sellers)
+
+elif pagina == "Mapa":
+    render_page_title("Mapa de Desempenho", "🗺️")
+    geo_layers = get_geo_layers(filtered_df, get_data_version(), date_range)
+    
+    if geo_layers is None:
+        st.warning("Dados de geolocalização não encontrados. Execute o ETL (JuntandoTabelas.py) para gerar os centroides de CEP.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            geo_metric = st.selectbox("Métrica:", list(GEO_METRICS), format_func=lambda metric: GEO_METRICS[metric])
+        with col2:
+            geo_level = st.selectbox("Nível de agregação:", list(ZOOM_LEVELS), index=2)
+        
+        # Apenas as células agregadas são enviadas ao navegador
+        cells = geo_layers[geo_level].dropna(subset=[geo_metric]).copy()
+        cells[['r', 'g', 'b', 'a']] = color_scale(cells[geo_metric], higher_is_better=geo_metric != 'avg_delivery_time')
+        cells['elevation'] = cells['orders'] / cells['orders'].max() if not cells.empty else 0
+        
+        kind, parameter = ZOOM_LEVELS[geo_level]
+        if kind == 'hex':
+            layer = pdk.Layer(
+                "ColumnLayer",
+                data=cells,
+                get_position=["lng", "lat"],
+                get_elevation="elevation",
+                elevation_scale=200000,
+                radius=parameter * 1000,
+                disk_resolution=6,
+                get_fill_color=["r", "g", "b", "a"],
+                pickable=True,
+                extruded=True
+            )
+        else:
+            layer = pdk.Layer(
+                "ScatterplotLayer",
+                data=cells,
+                get_position=["lng", "lat"],
+                get_radius="elevation",
+                radius_scale=150000,
+                radius_min_pixels=4,
+                get_fill_color=["r", "g", "b", "a"],
+                pickable=True
+            )
+        
+        st.pydeck_chart(pdk.Deck(
+            layers=[layer],
+            initial_view_state=pdk.ViewState(latitude=-15.0, longitude=-50.0, zoom=3.5, pitch=40 if kind == 'hex' else 0),
+            tooltip={"text": f"{{cell}}\nPedidos: {{orders}}\n{GEO_METRICS[geo_metric]}: {{{geo_metric}}}"}
+        ))
+        st.caption(f"{len(cells):,} células agregadas no servidor")
+
 elif pagina == "Análise de Churn":
     render_page_title("Análise de Churn", "📉")
     import paginas.analise_churn
-    paginas.analise_churn.app()
\ No newline at end of file
+    paginas.analise_churn.app()
+
+# Aquecer o NLP em segundo plano depois da primeira renderização
+start_nlp_warmup()
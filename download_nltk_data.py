@@ -0,0 +1,12 @@
+import argparse
+from utils.nlp_analysis import download_nltk_data, NLTK_DATA_DIR, NLTK_RESOURCES
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Baixa os recursos do NLTK para o diretório local usado pelo app')
+    parser.add_argument('--dir', type=str, default=NLTK_DATA_DIR,
+                        help='Diretório de destino dos recursos')
+
+    args = parser.parse_args()
+
+    download_nltk_data(args.dir)
+    print(f"Recursos do NLTK ({', '.join(NLTK_RESOURCES.values())}) disponíveis em {args.dir}")
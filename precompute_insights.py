@@ -0,0 +1,81 @@
+import os
+import argparse
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from utils.KPIs import get_data_version, STANDARD_PERIODS
+from utils.precomputed import compute_period_payload, write_artifact, PRECOMPUTED_DIR, DEFAULT_MARKETING_SPEND
+
+DATA_PATH = "olist_merged_data.parquet"
+
+# Dataset carregado uma vez por processo de trabalho
+_worker_df = None
+
+def _init_worker(data_path):
+    """Carrega o dataset consolidado no processo de trabalho."""
+    global _worker_df
+    _worker_df = pd.read_parquet(data_path)
+
+def _compute_period(args):
+    """Calcula o payload de um período no processo de trabalho."""
+    periodo, max_date, marketing_spend = args
+    start = time.time()
+    payload = compute_period_payload(_worker_df, periodo, max_date, marketing_spend)
+    return periodo, payload, time.time() - start
+
+def main(data_path=DATA_PATH, output_dir=PRECOMPUTED_DIR, marketing_spend=DEFAULT_MARKETING_SPEND, workers=None):
+    """
+    Pré-calcula os dados das páginas para todos os períodos padrão e grava o artefato versionado.
+
+    Parâmetros:
+    -----------
+    data_path : str
+        Caminho do dataset consolidado (padrão: 'olist_merged_data.parquet')
+    output_dir : str
+        Diretório base dos artefatos (padrão: 'precomputed')
+    marketing_spend : float
+        Gasto com marketing usado nos KPIs de aquisição (padrão: 50000)
+    workers : int ou None
+        Número de processos (padrão: um por núcleo, limitado ao número de períodos)
+
+    Retorno:
+    --------
+    str
+        Diretório do artefato gravado
+    """
+    data_version = get_data_version(data_path)
+    max_date = pd.to_datetime(pd.read_parquet(data_path, columns=['order_purchase_timestamp'])['order_purchase_timestamp']).max()
+    print(f"Versão dos dados: {data_version}")
+    print(f"Períodos: {len(STANDARD_PERIODS)} | Data de referência: {max_date}")
+
+    tasks = [(periodo, max_date, marketing_spend) for periodo in STANDARD_PERIODS]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    payloads = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_path,)) as executor:
+        for periodo, payload, elapsed in executor.map(_compute_period, tasks):
+            payloads[periodo] = payload
+            print(f"  {periodo}: {elapsed:.1f}s")
+
+    directory = write_artifact(payloads, data_version, max_date, marketing_spend, output_dir)
+    print(f"Artefato gravado em {directory}")
+    return directory
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pré-cálculo dos dados do dashboard para os períodos padrão')
+    parser.add_argument('--data', type=str, default=DATA_PATH,
+                        help='Caminho do dataset consolidado')
+    parser.add_argument('--output', type=str, default=PRECOMPUTED_DIR,
+                        help='Diretório base dos artefatos (um subdiretório por versão dos dados)')
+    parser.add_argument('--marketing_spend', type=float, default=DEFAULT_MARKETING_SPEND,
+                        help='Gasto com marketing usado nos KPIs de aquisição')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Número de processos (0 para um por núcleo)')
+
+    args = parser.parse_args()
+
+    main(
+        data_path=args.data,
+        output_dir=args.output,
+        marketing_spend=args.marketing_spend,
+        workers=args.workers or None
+    )
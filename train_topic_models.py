@@ -0,0 +1,77 @@
+import os
+import argparse
+import time
+import pandas as pd
+from utils.nlp_analysis import REVIEW_CORPUS_PATH
+from utils.topics import (
+    train_topic_models, save_topic_models, topic_terms, TOPIC_MODELS_PATH, TOPIC_METHODS,
+    DEFAULT_N_TOPICS, DEFAULT_EPOCHS, DEFAULT_BATCH_SIZE, MIN_DF
+)
+
+def main(corpus_path=REVIEW_CORPUS_PATH, output_path=TOPIC_MODELS_PATH, n_topics=DEFAULT_N_TOPICS,
+         n_epochs=DEFAULT_EPOCHS, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Treina os modelos de tópicos das avaliações e grava o arquivo usado pelo dashboard.
+
+    Parâmetros:
+    -----------
+    corpus_path : str
+        Corpus de avaliações tokenizadas gerado pelo JuntandoTabelas.py
+    output_path : str
+        Arquivo de saída (padrão: 'models/review_topics.joblib')
+    n_topics : int
+        Número de tópicos (padrão: 10)
+    n_epochs : int
+        Passadas sobre o corpus (padrão: 5)
+    batch_size : int
+        Avaliações por minibatch (padrão: 2048)
+
+    Retorno:
+    --------
+    dict
+        Modelos treinados
+    """
+    if not os.path.exists(corpus_path):
+        raise FileNotFoundError(f"Corpus não encontrado em {corpus_path}. Execute JuntandoTabelas.py primeiro.")
+    corpus = pd.read_parquet(corpus_path, columns=['review_id', 'tokens'])
+    print(f"Avaliações no corpus: {len(corpus)}")
+
+    start = time.time()
+    models = train_topic_models(corpus['tokens'], corpus['review_id'], n_topics, n_epochs, batch_size)
+    if models is None:
+        raise ValueError(f"Corpus pequeno demais para {n_topics} tópicos: poucas avaliações com texto ou "
+                         f"nenhum termo em pelo menos {MIN_DF} avaliações.")
+    print(f"Treinamento: {time.time() - start:.1f}s | Documentos: {models['dtm'].shape[0]} | "
+          f"Vocabulário: {models['dtm'].shape[1]}")
+
+    for method, label in TOPIC_METHODS.items():
+        print(f"\nTópicos ({label}):")
+        for topic, words in enumerate(topic_terms(models, method)):
+            print(f"  Tópico {topic + 1}: {', '.join(words)}")
+
+    save_topic_models(models, output_path)
+    print(f"\nModelos salvos em {output_path}")
+    return models
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Treinamento offline dos modelos de tópicos das avaliações')
+    parser.add_argument('--corpus', type=str, default=REVIEW_CORPUS_PATH,
+                        help='Caminho do corpus de avaliações tokenizadas')
+    parser.add_argument('--output', type=str, default=TOPIC_MODELS_PATH,
+                        help='Arquivo de saída dos modelos')
+    parser.add_argument('--n_topics', type=int, default=DEFAULT_N_TOPICS,
+                        help='Número de tópicos')
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS,
+                        help='Passadas sobre o corpus')
+    parser.add_argument('--batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Avaliações por minibatch')
+
+    args = parser.parse_args()
+
+    main(
+        corpus_path=args.corpus,
+        output_path=args.output,
+        n_topics=args.n_topics,
+        n_epochs=args.epochs,
+        batch_size=args.batch_size
+    )
@@ -1,12 +1,38 @@
 import pandas as pd
+import numpy as np
 import streamlit as st
 import streamlit.components.v1 as components
+import os
+from datetime import timedelta
 
 @st.cache_data
 def load_data():
     """Carrega os dados consolidados do Olist."""
     return pd.read_parquet("olist_merged_data.parquet")
 
+def get_data_version(path="olist_merged_data.parquet"):
+    """Retorna um identificador da versão do dataset consolidado (data de modificação e tamanho)."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+# Períodos padrão do filtro da barra lateral: nome -> dias até a data mais recente (None = todo o período)
+STANDARD_PERIODS = {
+    "Todo o período": None,
+    "Último mês": 30,
+    "Últimos 2 meses": 60,
+    "Último trimestre": 90,
+    "Último semestre": 180,
+    "Último ano": 365,
+    "Últimos 2 anos": 730,
+}
+
+def get_standard_date_range(periodo, max_date):
+    """Retorna o intervalo [início, fim] de um período padrão, ou None para todo o período."""
+    days = STANDARD_PERIODS[periodo]
+    if days is None:
+        return None
+    return [max_date - timedelta(days=days), max_date]
+
 def filter_by_date_range(df, date_range):
     """Filtra o DataFrame pelo período selecionado."""
     if not date_range or len(date_range) != 2:
@@ -200,6 +226,102 @@ def calculate_churn_features(df, cutoff_date):
     
     return churn_features
 
+def calculate_churn_features_for_cutoffs(df, cutoff_dates):
+    """
+    Calcula as features de churn para várias datas de corte em uma única passada.
+
+    Ordena os dados uma vez por cliente e data de compra e acumula os agregados
+    de cada cliente. Para cada data de corte é usado o último estado acumulado
+    com compra <= corte, então nenhuma linha futura entra nas features.
+
+    Args:
+        df (pd.DataFrame): DataFrame consolidado do Olist
+        cutoff_dates (list): Datas de corte (qualquer formato aceito por pd.to_datetime)
+
+    Returns:
+        pd.DataFrame: Uma linha por (cutoff_date, customer_unique_id) com as mesmas
+        colunas de calculate_churn_features
+    """
+    cutoffs = pd.DatetimeIndex(pd.to_datetime(cutoff_dates)).unique().sort_values()
+    feature_columns = ['total_spent', 'num_orders', 'avg_order_value', 'std_order_value',
+                       'avg_installments', 'avg_review', 'cancel_rate', 'recency']
+
+    data = pd.DataFrame({
+        'customer_unique_id': df['customer_unique_id'].values,
+        'order_id': df['order_id'].values,
+        'timestamp': pd.to_datetime(df['order_purchase_timestamp']).values,
+        'payment_value': df['payment_value'].values,
+        'payment_installments': df['payment_installments'].values,
+        'review_score': df['review_score'].values,
+        'canceled': (df['order_status'] == 'canceled').values
+    })
+
+    # Índice da primeira data de corte que inclui cada linha (corte >= compra)
+    data['bucket'] = cutoffs.searchsorted(data['timestamp'], side='left')
+    data = data[data['bucket'] < len(cutoffs)]
+    if data.empty:
+        return pd.DataFrame(columns=['cutoff_date', 'customer_unique_id'] + feature_columns)
+
+    # Ordenação única por cliente e tempo
+    data = data.sort_values(['customer_unique_id', 'timestamp'], kind='mergesort')
+
+    # Agregados acumulados por cliente
+    is_new_order = ~data.duplicated(['customer_unique_id', 'order_id'])
+    payment = data['payment_value'].astype(float)
+    installments = data['payment_installments'].astype(float)
+    review = data['review_score'].astype(float)
+    cumulative = pd.DataFrame({
+        'customer_unique_id': data['customer_unique_id'],
+        'bucket': data['bucket'],
+        'last_purchase': data['timestamp'],
+        'num_orders': is_new_order.astype(int),
+        'payment_sum': payment.fillna(0),
+        'payment_sq_sum': payment.fillna(0) ** 2,
+        'payment_count': payment.notna().astype(int),
+        'installments_sum': installments.fillna(0),
+        'installments_count': installments.notna().astype(int),
+        'review_sum': review.fillna(0),
+        'review_count': review.notna().astype(int),
+        'canceled_rows': data['canceled'].astype(int)
+    })
+    sum_columns = ['num_orders', 'payment_sum', 'payment_sq_sum', 'payment_count',
+                   'installments_sum', 'installments_count', 'review_sum',
+                   'review_count', 'canceled_rows']
+    cumulative[sum_columns] = cumulative.groupby('customer_unique_id', sort=False)[sum_columns].cumsum()
+
+    # Estado do cliente ao final de cada bucket de corte
+    states = cumulative.drop_duplicates(['customer_unique_id', 'bucket'], keep='last')
+
+    # Cada estado vale do seu bucket até o próximo bucket do mesmo cliente
+    next_bucket = states.groupby('customer_unique_id', sort=False)['bucket'].shift(-1)
+    next_bucket = next_bucket.fillna(len(cutoffs)).astype(int).values
+    repeats = next_bucket - states['bucket'].values
+    expanded = states.loc[states.index.repeat(repeats)].reset_index(drop=True)
+    offsets = np.arange(len(expanded)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    expanded['bucket'] = expanded['bucket'].values + offsets
+
+    cutoff_values = cutoffs[expanded['bucket'].values]
+    num_orders = expanded['num_orders']
+    total_spent = expanded['payment_sum']
+    payment_count = expanded['payment_count']
+    variance = (expanded['payment_sq_sum'] - total_spent ** 2 / payment_count.where(payment_count > 0)) / (payment_count - 1).where(payment_count > 1)
+
+    churn_features = pd.DataFrame({
+        'cutoff_date': cutoff_values,
+        'customer_unique_id': expanded['customer_unique_id'].values,
+        'total_spent': total_spent.values,
+        'num_orders': num_orders.values,
+        'avg_order_value': (total_spent / num_orders).values,
+        'std_order_value': np.sqrt(variance.clip(lower=0)).values,
+        'avg_installments': (expanded['installments_sum'] / expanded['installments_count'].where(expanded['installments_count'] > 0)).values,
+        'avg_review': (expanded['review_sum'] / expanded['review_count'].where(expanded['review_count'] > 0)).values,
+        # Mesma semântica de calculate_churn_features: NaN para clientes sem cancelamentos
+        'cancel_rate': (expanded['canceled_rows'].where(expanded['canceled_rows'] > 0) / num_orders).values,
+        'recency': (cutoff_values - pd.DatetimeIndex(expanded['last_purchase'])).days
+    })
+
+    return churn_features.sort_values(['cutoff_date', 'customer_unique_id']).reset_index(drop=True)
+
 def define_churn(df, cutoff_date):
     """Define a variável de churn com base na data de corte."""
     # Converter colunas de data para datetime
@@ -219,7 +341,29 @@ def define_churn(df, cutoff_date):
     
     return churn_df
 
-def kpi_card(title, value, help_text=None):
+def format_kpi_delta(comparison, higher_is_better=True):
+    """
+    Formata as variações de um KPI em relação ao período anterior e ao ano anterior.
+
+    Args:
+        comparison (dict): Entrada de calculate_period_comparison para o KPI
+        higher_is_better (bool): Se aumentos do KPI são positivos para o negócio
+
+    Returns:
+        str: HTML com as variações, ou None quando não há referência
+    """
+    parts = []
+    for key, label in [('delta_previous', 'vs período anterior'), ('delta_yoy', 'vs ano anterior')]:
+        delta = comparison.get(key)
+        if delta is None or pd.isna(delta):
+            continue
+        arrow = "▲" if delta > 0 else "▼" if delta < 0 else "■"
+        is_good = (delta > 0) == higher_is_better
+        color = "#95a5a6" if delta == 0 else "#2ecc71" if is_good else "#e74c3c"
+        parts.append(f'<span style="color: {color};">{arrow} {abs(delta)*100:.1f}% {label}</span>')
+    return "<br>".join(parts) if parts else None
+
+def kpi_card(title, value, help_text=None, delta=None):
     """Creates a KPI card with a glass effect."""
     is_dark_theme = st.get_option("theme.base") == "dark"
     text_color = "rgba(255,255,255,0.9)" if is_dark_theme else "rgba(0,0,0,0.9)"
@@ -243,6 +387,7 @@ def kpi_card(title, value, help_text=None):
             {title}  
             <br>  
             <span style="font-size: 28px; font-weight: bold;">{value}</span>
+            {f'<div style="font-size: 14px; font-weight: normal; margin-top: 8px;">{delta}</div>' if delta else ''}
         </div>
         """,
         unsafe_allow_html=True
@@ -257,14 +402,16 @@ def kpi_card(title, value, help_text=None):
         unsafe_allow_html=True
     )
 
-def render_kpi_block(kpi_values=None, cols_per_row=3):
+def render_kpi_block(kpi_values=None, cols_per_row=3, deltas=None):
     """
     Renderiza um bloco de KPIs com efeito glass.
     
     Args:
         kpi_values (dict): Dicionário com os valores dos KPIs
         cols_per_row (int): Número de colunas por linha (padrão: 3)
+        deltas (dict): Variações opcionais por KPI (ver format_kpi_delta)
     """
+    deltas = deltas or {}
     if kpi_values:
         # Calcular número de linhas necessárias
         num_kpis = len(kpi_values)
@@ -279,7 +426,7 @@ def render_kpi_block(kpi_values=None, cols_per_row=3):
             col = i % cols_per_row
             
             with cols[col]:
-                kpi_card(kpi_name, kpi_value)
+                kpi_card(kpi_name, kpi_value, delta=deltas.get(kpi_name))
 
 def render_kpi_block_title(title, cols_per_row=3):
     """
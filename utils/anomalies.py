@@ -0,0 +1,260 @@
+import warnings
+import pandas as pd
+import numpy as np
+import streamlit as st
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+from typing import Dict, Optional, Tuple
+from utils.cube import build_daily_cube, PrefixSumIndex
+
+# Métricas monitoradas: nome -> (numerador, denominador, rótulo, maior é melhor).
+# Sem denominador, a métrica é o total diário da medida.
+ANOMALY_METRICS = {
+    'receita': ('receita', None, 'Receita (R$)', True),
+    'pedidos': ('pedidos', None, 'Pedidos', True),
+    'taxa_cancelamento': ('linhas_canceladas', 'linhas', 'Taxa de Cancelamento', False),
+    'csat': ('review_sum', 'review_count', 'Satisfação Média', True),
+    'tempo_entrega': ('delivery_sum', 'delivery_count', 'Tempo de Entrega (dias)', False),
+}
+
+# Dimensões monitoradas além do total geral: coluna -> rótulo
+ANOMALY_DIMS = {
+    'product_category_name': 'Categoria',
+    'customer_state': 'Estado',
+}
+
+# Parâmetros dos detectores
+EWMA_ALPHA = 0.1          # Peso do dia mais recente na média exponencial
+ROBUST_WINDOW = 28        # Janela (dias) da mediana/MAD móvel
+SEASONAL_WEEKS = 8        # Semanas usadas no perfil do dia da semana
+WARMUP_DAYS = 28          # Dias iniciais sem alertas
+MIN_SUPPORT = 10          # Denominador mínimo no dia para avaliar taxas
+Z_THRESHOLD = 3.5         # |z| mínimo para um detector disparar
+MIN_DETECTORS = 2         # Detectores que precisam concordar para gerar alerta
+
+DETECTOR_LABELS = {
+    'ewma': 'EWMA',
+    'robust': 'Mediana/MAD',
+    'seasonal': 'Dia da semana',
+}
+
+def build_series_matrix(cubes: Dict[Optional[str], pd.DataFrame]):
+    """
+    Monta as séries diárias de todas as métricas e segmentos como matrizes dias x séries.
+
+    Cada coluna é uma combinação (segmento, métrica): o total geral e cada valor
+    das dimensões monitoradas. Cada dimensão vem de um cubo agrupado apenas por
+    ela (e o total geral do cubo sem dimensões), pois medidas não aditivas como
+    pedidos distintos contariam um pedido com itens em dois grupos uma vez por
+    grupo se um cubo conjunto fosse somado. As matrizes vêm das somas prefixadas
+    dos cubos, então dias sem vendas entram com zero.
+
+    Args:
+        cubes: Dimensão -> cubo diário agrupado só por ela (None -> cubo sem
+            dimensões); os cubos devem vir do mesmo DataFrame (ver build_anomaly_cubes)
+
+    Returns:
+        Tupla (dias, séries, numerador, peso), em que séries é um DataFrame com as
+        colunas dimensao, segmento e metrica, e numerador/peso são arrays dias x séries
+        (peso = denominador da taxa, ou 1 para métricas aditivas)
+    """
+    indexes = [(dim, PrefixSumIndex(cube, split_by=dim)) for dim, cube in cubes.items()]
+    days = indexes[0][1].days
+
+    labels, numerators, weights = [], [], []
+    for dim, index in indexes:
+        # Valores diários (dias x grupos x medidas) recuperados do array acumulado
+        daily = np.diff(index.prefix, axis=0)
+        if index.groups is None:
+            daily = daily[:, None, :]
+            segments = ['Todos']
+        else:
+            segments = list(index.groups)
+        measure_position = {name: i for i, name in enumerate(index.measures)}
+
+        for metric, (numerator, denominator, _, _) in ANOMALY_METRICS.items():
+            top = daily[:, :, measure_position[numerator]]
+            bottom = daily[:, :, measure_position[denominator]] if denominator else np.ones_like(top)
+            numerators.append(top)
+            weights.append(bottom)
+            labels.append(pd.DataFrame({
+                'dimensao': ANOMALY_DIMS.get(dim, 'Geral'),
+                'segmento': segments,
+                'metrica': metric
+            }))
+
+    series = pd.concat(labels, ignore_index=True)
+    return days, series, np.hstack(numerators), np.hstack(weights)
+
+def _series_values(numerator: np.ndarray, weight: np.ndarray, additive: np.ndarray) -> np.ndarray:
+    """Valor diário de cada série; taxas com denominador abaixo de MIN_SUPPORT ficam NaN."""
+    supported = additive | (weight >= MIN_SUPPORT)
+    return np.divide(numerator, weight, out=np.full(numerator.shape, np.nan), where=supported & (weight > 0))
+
+def ewma_scores(numerator: np.ndarray, weight: np.ndarray, values: np.ndarray, alpha: float = EWMA_ALPHA):
+    """
+    Escore z de cada dia contra a média e a variância exponenciais até o dia anterior.
+
+    As médias exponenciais são ponderadas pelo denominador (E[N] / E[W]), de modo que
+    dias com poucos pedidos pesam menos nas taxas. Os filtros são aplicados a todas
+    as colunas de uma vez com scipy.signal.lfilter.
+
+    Returns:
+        Tupla (z, esperado), arrays dias x séries
+    """
+    b, a = [alpha], [1, -(1 - alpha)]
+    smoothed_weight = lfilter(b, a, weight, axis=0)
+    smoothed_numerator = lfilter(b, a, numerator, axis=0)
+    squares = np.divide(numerator ** 2, weight, out=np.zeros(numerator.shape), where=weight > 0)
+    smoothed_squares = lfilter(b, a, squares, axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = smoothed_numerator / smoothed_weight
+        variance = smoothed_squares / smoothed_weight - mean ** 2
+
+    # A previsão de cada dia usa apenas o histórico até o dia anterior
+    expected = np.full(values.shape, np.nan)
+    std = np.full(values.shape, np.nan)
+    expected[1:] = mean[:-1]
+    std[1:] = np.sqrt(np.clip(variance[:-1], 0, None))
+    return _z_scores(values, expected, std), expected
+
+def robust_scores(values: np.ndarray, window: int = ROBUST_WINDOW):
+    """
+    Escore z robusto de cada dia contra a mediana e o MAD dos `window` dias anteriores.
+
+    Returns:
+        Tupla (z, esperado), arrays dias x séries
+    """
+    expected = np.full(values.shape, np.nan)
+    scale = np.full(values.shape, np.nan)
+    if len(values) > window:
+        # Janela k cobre os dias k..k+window-1 e serve de referência para o dia k+window
+        history = sliding_window_view(values, window, axis=0)[:-1]
+        expected[window:], scale[window:] = _median_and_mad(history, axis=-1, min_count=window // 2)
+    return _z_scores(values, expected, scale), expected
+
+def seasonal_scores(values: np.ndarray, weeks: int = SEASONAL_WEEKS):
+    """
+    Resíduo sazonal: compara cada dia com a mediana do mesmo dia da semana nas `weeks` semanas anteriores.
+
+    Returns:
+        Tupla (z, esperado), arrays dias x séries
+    """
+    n_days = len(values)
+    history = np.full((weeks,) + values.shape, np.nan)
+    for k in range(1, weeks + 1):
+        lag = 7 * k
+        if lag < n_days:
+            history[k - 1, lag:] = values[:-lag]
+    expected, scale = _median_and_mad(history, axis=0, min_count=weeks // 2)
+    return _z_scores(values, expected, scale), expected
+
+def _median_and_mad(history: np.ndarray, axis: int, min_count: int):
+    """Mediana e MAD (escalado para desvio padrão) ignorando NaN; exige `min_count` observações."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        median = np.nanmedian(history, axis=axis)
+        mad = 1.4826 * np.nanmedian(np.abs(history - np.expand_dims(median, axis)), axis=axis)
+    enough = np.sum(~np.isnan(history), axis=axis) >= min_count
+    return np.where(enough, median, np.nan), np.where(enough, mad, np.nan)
+
+def _z_scores(values: np.ndarray, expected: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Escore z; escala zero ou ausente resulta em NaN (série constante não gera alerta)."""
+    return np.divide(values - expected, scale, out=np.full(values.shape, np.nan), where=scale > 0)
+
+def build_anomaly_cubes(_df: pd.DataFrame, data_version: str,
+                        dims: Tuple[str, ...] = tuple(ANOMALY_DIMS)) -> Dict[Optional[str], pd.DataFrame]:
+    """Cubo sem dimensões (total geral) e um cubo por dimensão monitorada."""
+    cubes = {None: build_daily_cube(_df, data_version)}
+    for dim in dims:
+        cubes[dim] = build_daily_cube(_df, data_version, dims=(dim,))
+    return cubes
+
+def detect_anomalies(cubes: Dict[Optional[str], pd.DataFrame],
+                     threshold: float = Z_THRESHOLD, min_detectors: int = MIN_DETECTORS) -> pd.DataFrame:
+    """
+    Executa os detectores EWMA, mediana/MAD e sazonal em todas as séries de uma vez.
+
+    Args:
+        cubes: Cubos por dimensão (ver build_anomaly_cubes)
+        threshold: |z| mínimo para um detector disparar
+        min_detectors: Quantidade de detectores que precisam disparar no mesmo sentido
+
+    Returns:
+        Tabela de alertas com date, dimensao, segmento, metrica, valor, esperado, score,
+        detectores, direcao ('alta' ou 'queda') e impacto ('positivo' ou 'negativo'),
+        ordenada do alerta mais recente e mais forte para o mais antigo
+    """
+    days, series, numerator, weight = build_series_matrix(cubes)
+    additive = series['metrica'].map(lambda metric: ANOMALY_METRICS[metric][1] is None).to_numpy()
+    values = _series_values(numerator, weight, additive)
+
+    scores = {
+        'ewma': ewma_scores(numerator, weight, values),
+        'robust': robust_scores(values),
+        'seasonal': seasonal_scores(values),
+    }
+    z = np.stack([score for score, _ in scores.values()])
+    z[:, :WARMUP_DAYS] = np.nan
+
+    # Um alerta exige detectores suficientes concordando no sentido do desvio
+    with np.errstate(invalid='ignore'):
+        up = z >= threshold
+        down = z <= -threshold
+    rising_all = up.sum(axis=0) >= min_detectors
+    flagged = rising_all | (down.sum(axis=0) >= min_detectors)
+    day_idx, series_idx = np.nonzero(flagged)
+    rising = rising_all[day_idx, series_idx]
+
+    fired = np.where(rising_all, up, down)[:, day_idx, series_idx]
+    detector_names = np.array([DETECTOR_LABELS[name] for name in scores])
+    strongest = np.where(fired, np.abs(z[:, day_idx, series_idx]), 0).max(axis=0)
+    # Valor esperado reportado: mediana dos dias anteriores, ou o primeiro detector disponível
+    expected = np.full(len(day_idx), np.nan)
+    for name in ['robust', 'seasonal', 'ewma']:
+        expected = np.where(np.isnan(expected), scores[name][1][day_idx, series_idx], expected)
+
+    alerts = series.iloc[series_idx].reset_index(drop=True).assign(
+        date=days[day_idx],
+        valor=values[day_idx, series_idx],
+        esperado=expected,
+        score=strongest,
+        detectores=[', '.join(detector_names[column]) for column in fired.T]
+    )
+    higher_is_better = alerts['metrica'].map(lambda metric: ANOMALY_METRICS[metric][3])
+    alerts['direcao'] = np.where(rising, 'alta', 'queda')
+    alerts['impacto'] = np.where(rising == higher_is_better, 'positivo', 'negativo')
+    alerts['metrica'] = alerts['metrica'].map(lambda metric: ANOMALY_METRICS[metric][2])
+
+    columns = ['date', 'dimensao', 'segmento', 'metrica', 'valor', 'esperado', 'score', 'detectores', 'direcao', 'impacto']
+    return alerts[columns].sort_values(['date', 'score'], ascending=[False, False]).reset_index(drop=True)
+
+@st.cache_data
+def get_anomaly_alerts(_df: pd.DataFrame, data_version: str) -> pd.DataFrame:
+    """Tabela de alertas de todo o histórico, em cache por versão do dataset."""
+    return detect_anomalies(build_anomaly_cubes(_df, data_version))
+
+def filter_alerts(alerts: pd.DataFrame, date_range=None, last_days: int = 30,
+                  only_negative: bool = False) -> pd.DataFrame:
+    """
+    Seleciona os alertas do período filtrado (ou dos últimos `last_days` dias de dados).
+
+    Args:
+        alerts: Resultado de detect_anomalies
+        date_range: Lista [início, fim] ou None
+        last_days: Janela usada quando não há período selecionado
+        only_negative: Mantém apenas alertas de impacto negativo
+    """
+    if alerts.empty:
+        return alerts
+    if date_range:
+        start = pd.to_datetime(date_range[0]).normalize()
+        end = pd.to_datetime(date_range[1]).normalize()
+    else:
+        end = alerts['date'].max()
+        start = end - pd.Timedelta(days=last_days - 1)
+    selected = alerts[alerts['date'].between(start, end)]
+    if only_negative:
+        selected = selected[selected['impacto'] == 'negativo']
+    return selected
@@ -0,0 +1,190 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+# Estatísticas com intervalo de confiança: nome -> rótulo
+BOOTSTRAP_STATISTICS = {
+    'total_revenue': 'Receita Total',
+    'average_ticket': 'Ticket Médio',
+    'csat': 'Satisfação Média',
+    'cancellation_rate': 'Taxa de Cancelamento',
+    'ticket_vs_satisfaction': 'Correlação Ticket x Satisfação',
+    'repurchase_vs_satisfaction': 'Correlação Recompra x Satisfação',
+}
+
+DEFAULT_RESAMPLES = 1000
+# Memória máxima das matrizes de contagens somada entre os lotes em paralelo
+MAX_BATCH_BYTES = 256 * 1024 ** 2
+
+def prepare_order_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Reduz os dados a arrays por pedido, a unidade reamostrada no bootstrap.
+
+    As somas por pedido preservam o grão de linha dos KPIs de calculate_kpis, de
+    modo que a estimativa pontual de cada razão coincide com o KPI exibido; as
+    correlações usam o ticket do pedido (itens únicos) e a nota do pedido.
+
+    Args:
+        df: DataFrame com os dados filtrados
+
+    Returns:
+        Dict nome -> array com um valor por pedido
+    """
+    cancelled = df['pedido_cancelado'] == 1
+    rows = df.assign(
+        receita_liquida=df['price'].where(~cancelled, 0),
+        review_present=df['review_score'].notna().astype(int),
+        item_price=df['price'].where(~df.duplicated(['order_id', 'order_item_id']), 0)
+    )
+    orders = rows.groupby('order_id').agg(
+        customer=('customer_unique_id', 'first'),
+        revenue=('receita_liquida', 'sum'),
+        lines=('pedido_cancelado', 'size'),
+        cancelled_lines=('pedido_cancelado', 'sum'),
+        review_sum=('review_score', 'sum'),
+        review_count=('review_present', 'sum'),
+        ticket=('item_price', 'sum'),
+        review_score=('review_score', 'first')
+    )
+    # Cliente com mais de um pedido no período
+    repurchase = orders.groupby('customer')['revenue'].transform('size') > 1
+
+    return {
+        'revenue': orders['revenue'].to_numpy(dtype=float),
+        'lines': orders['lines'].to_numpy(dtype=float),
+        'cancelled_lines': orders['cancelled_lines'].to_numpy(dtype=float),
+        'review_sum': orders['review_sum'].to_numpy(dtype=float),
+        'review_count': orders['review_count'].to_numpy(dtype=float),
+        'ticket': orders['ticket'].to_numpy(dtype=float),
+        'review_score': orders['review_score'].to_numpy(dtype=float),
+        'repurchase': repurchase.to_numpy(dtype=float),
+    }
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Razão elemento a elemento com NaN quando o denominador é zero."""
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), np.nan), where=denominator > 0)
+
+def _pearson(n, sx, sy, sxx, syy, sxy) -> np.ndarray:
+    """Correlação de Pearson a partir das somas dos pares válidos."""
+    covariance = sxy - sx * sy / np.maximum(n, 1)
+    variance = (sxx - sx ** 2 / np.maximum(n, 1)) * (syy - sy ** 2 / np.maximum(n, 1))
+    return _ratio(covariance, np.sqrt(np.clip(variance, 0, None)))
+
+def _moment_columns(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Termos por pedido cujas somas determinam todas as estatísticas.
+
+    Somas, razões e correlações de uma reamostra dependem apenas de quantas vezes
+    cada pedido foi sorteado, então cada estatística sai do produto da matriz de
+    contagens por estes termos.
+    """
+    valid = ~np.isnan(arrays['review_score'])
+    score = np.where(valid, arrays['review_score'], 0)
+    ticket = np.where(valid, arrays['ticket'], 0)
+    repurchase = np.where(valid, arrays['repurchase'], 0)
+    return {
+        'revenue': arrays['revenue'],
+        'review_sum': np.nan_to_num(arrays['review_sum']),
+        'review_count': arrays['review_count'],
+        'cancelled_lines': arrays['cancelled_lines'],
+        'lines': arrays['lines'],
+        'valid': valid.astype(float),
+        'score': score,
+        'score_sq': score * score,
+        'ticket': ticket,
+        'ticket_sq': ticket * ticket,
+        'ticket_score': ticket * score,
+        'repurchase': repurchase,
+        'repurchase_sq': repurchase * repurchase,
+        'repurchase_score': repurchase * score,
+    }
+
+def compute_statistics(arrays: Dict[str, np.ndarray], counts: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Calcula as estatísticas de BOOTSTRAP_STATISTICS para cada linha da matriz de contagens.
+
+    Args:
+        arrays: Resultado de prepare_order_arrays
+        counts: Matriz reamostras x pedidos com quantas vezes cada pedido foi
+            sorteado (None = amostra original)
+
+    Returns:
+        Dict estatística -> array com um valor por reamostra
+    """
+    moments = _moment_columns(arrays)
+    terms = np.column_stack(list(moments.values()))
+    sums = terms.sum(axis=0)[None, :] if counts is None else counts @ terms
+    s = dict(zip(moments, sums.T))
+    n_orders = len(arrays['revenue'])
+
+    return {
+        'total_revenue': s['revenue'],
+        'average_ticket': s['revenue'] / n_orders if n_orders > 0 else np.full(len(sums), np.nan),
+        'csat': _ratio(s['review_sum'], s['review_count']),
+        'cancellation_rate': _ratio(s['cancelled_lines'], s['lines']),
+        'ticket_vs_satisfaction': _pearson(s['valid'], s['ticket'], s['score'], s['ticket_sq'], s['score_sq'], s['ticket_score']),
+        'repurchase_vs_satisfaction': _pearson(s['valid'], s['repurchase'], s['score'], s['repurchase_sq'], s['score_sq'], s['repurchase_score']),
+    }
+
+def _run_batch(arrays: Dict[str, np.ndarray], size: int, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Sorteia um lote de reamostras (matriz de contagens) e calcula as estatísticas."""
+    n_orders = len(arrays['revenue'])
+    rng = np.random.default_rng(seed)
+    # Uma reamostra por vez: apenas a matriz de contagens tem tamanho lote x pedidos
+    counts = np.empty((size, n_orders))
+    for row in counts:
+        row[:] = np.bincount(rng.integers(0, n_orders, n_orders), minlength=n_orders)
+    return compute_statistics(arrays, counts)
+
+def bootstrap_confidence_intervals(arrays: Dict[str, np.ndarray], n_resamples: int = DEFAULT_RESAMPLES,
+                                   confidence: float = 0.95, n_jobs: int = 1, seed: int = 42) -> pd.DataFrame:
+    """
+    Intervalos de confiança por bootstrap percentil, reamostrando pedidos.
+
+    Cada reamostra vira uma linha de contagens (quantas vezes cada pedido foi
+    sorteado) e todas as estatísticas saem de um único produto dessa matriz pelos
+    termos por pedido. Os lotes são dimensionados para que as matrizes de contagens
+    de todas as threads somem no máximo MAX_BATCH_BYTES; com n_jobs > 1 os lotes
+    rodam em um ThreadPoolExecutor (o NumPy libera o GIL no produto de matrizes).
+
+    Args:
+        arrays: Resultado de prepare_order_arrays
+        n_resamples: Número de reamostras
+        confidence: Nível de confiança do intervalo
+        n_jobs: Número de threads
+        seed: Semente para resultados reprodutíveis
+
+    Returns:
+        DataFrame indexado por estatística com as colunas label, estimate, lower e upper
+    """
+    n_orders = len(arrays['revenue'])
+    estimates = {name: values[0] for name, values in compute_statistics(arrays).items()}
+    if n_orders < 2:
+        samples = {name: np.array([np.nan]) for name in BOOTSTRAP_STATISTICS}
+    else:
+        workers = max(1, n_jobs)
+        batch_size = max(1, min(n_resamples, MAX_BATCH_BYTES // (workers * n_orders * np.dtype(float).itemsize)))
+        sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        if n_jobs > 1 and len(sizes) > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                batches = list(executor.map(lambda args: _run_batch(arrays, *args), zip(sizes, seeds)))
+        else:
+            batches = [_run_batch(arrays, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+        samples = {name: np.concatenate([batch[name] for batch in batches]) for name in BOOTSTRAP_STATISTICS}
+
+    alpha = (1 - confidence) / 2
+    rows = {}
+    for name, label in BOOTSTRAP_STATISTICS.items():
+        values = samples[name][~np.isnan(samples[name])]
+        lower, upper = np.quantile(values, [alpha, 1 - alpha]) if len(values) else (np.nan, np.nan)
+        rows[name] = {'label': label, 'estimate': estimates[name], 'lower': lower, 'upper': upper}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+@st.cache_data
+def get_bootstrap_intervals(_df: pd.DataFrame, data_version: str, date_range=None,
+                            n_resamples: int = DEFAULT_RESAMPLES, n_jobs: int = 1) -> pd.DataFrame:
+    """Intervalos de confiança em cache por versão do dataset, período e número de reamostras."""
+    return bootstrap_confidence_intervals(prepare_order_arrays(_df), n_resamples=n_resamples, n_jobs=n_jobs)
@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, Any, List, Optional
+from utils.insights import calculate_delivery_time, score_category_metrics
+
+# Agregados parciais por mês x categoria x estado: nome -> (coluna, agregação).
+# Todos são somáveis entre meses e estados, exceto 'unique_customers' (ver CategoryPerformanceIndex).
+CATEGORY_PARTIALS = {
+    'revenue_sum': ('price', 'sum'),
+    'price_count': ('price', 'count'),
+    'review_sum': ('review_score', 'sum'),
+    'review_count': ('review_score', 'count'),
+    'unique_orders': ('order_id', 'nunique'),
+    'unique_customers': ('customer_unique_id', 'nunique'),
+    'delivery_sum': ('delivery_time', 'sum'),
+    'delivery_count': ('delivery_time', 'count'),
+    'cancel_sum': ('pedido_cancelado', 'sum'),
+    'cancel_count': ('pedido_cancelado', 'count'),
+    'payment_sum': ('payment_value', 'sum'),
+    'payment_count': ('payment_value', 'count'),
+}
+
+def build_category_partials(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega as medidas das categorias por mês x categoria x estado do cliente em uma única passada.
+
+    Args:
+        df: DataFrame consolidado do Olist (não é alterado)
+
+    Returns:
+        DataFrame longo com as colunas month, category, customer_state e uma coluna por parcial
+    """
+    frame = df.assign(
+        month=pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M'),
+        delivery_time=calculate_delivery_time(df),
+        customer_state=df['customer_state'].fillna('desconhecido')
+    )
+    named_aggs = {name: pd.NamedAgg(column=column, aggfunc=func) for name, (column, func) in CATEGORY_PARTIALS.items()}
+    partials = frame.groupby(['month', 'product_category_name', 'customer_state']).agg(**named_aggs)
+    return partials.rename_axis(['month', 'category', 'customer_state']).reset_index()
+
+class CategoryPerformanceIndex:
+    """
+    Índice das parciais mensais das categorias para consultas por período e estado.
+
+    As parciais ficam em um array meses x categorias x estados x medidas acumulado
+    no eixo dos meses; os totais de um período são P[fim + 1] - P[início] somados
+    nos estados selecionados. A granularidade é mensal: um período que corta um
+    mês inclui o mês inteiro.
+
+    'unique_orders' é exato, pois cada pedido pertence a um único mês e estado.
+    'unique_customers' é aproximado: a soma conta mais de uma vez o cliente que
+    comprou a categoria em meses diferentes (limite superior do valor real).
+    """
+
+    def __init__(self, partials: pd.DataFrame):
+        self.measures = list(CATEGORY_PARTIALS)
+        self.months = pd.period_range(partials['month'].min(), partials['month'].max(), freq='M') if not partials.empty else pd.PeriodIndex([], freq='M')
+        self.categories = pd.Index(sorted(partials['category'].unique()))
+        self.states = pd.Index(sorted(partials['customer_state'].unique()))
+
+        values = np.zeros((len(self.months), len(self.categories), len(self.states), len(self.measures)))
+        values[
+            self.months.get_indexer(partials['month']),
+            self.categories.get_indexer(partials['category']),
+            self.states.get_indexer(partials['customer_state'])
+        ] = partials[self.measures].to_numpy(dtype=float)
+
+        self.prefix = np.zeros((len(self.months) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=self.prefix[1:])
+
+    def totals(self, date_range=None, states: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Soma das parciais por categoria no período e nos estados informados.
+
+        Args:
+            date_range: Lista [início, fim] ou None para todo o período
+            states: Estados a incluir (None ou vazio para todos)
+
+        Returns:
+            DataFrame categorias x medidas, apenas com categorias que tiveram itens no recorte
+        """
+        i, j = 0, len(self.months)
+        if date_range:
+            i = self.months.searchsorted(pd.Period(pd.to_datetime(date_range[0]), freq='M'), side='left')
+            j = self.months.searchsorted(pd.Period(pd.to_datetime(date_range[1]), freq='M'), side='right')
+        window = self.prefix[max(i, j)] - self.prefix[i]
+        if states:
+            window = window[:, self.states.get_indexer(self.states.intersection(states)), :]
+        totals = pd.DataFrame(window.sum(axis=1), index=self.categories, columns=self.measures)
+        return totals[totals['price_count'] > 0]
+
+@st.cache_resource
+def get_category_index(_df: pd.DataFrame, data_version: str) -> CategoryPerformanceIndex:
+    """Constrói (uma vez por versão do dataset) o índice de desempenho das categorias."""
+    return CategoryPerformanceIndex(build_category_partials(_df))
+
+def category_metrics_from_totals(totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deriva as métricas de analyze_category_performance a partir das parciais somadas.
+
+    Returns:
+        DataFrame com uma linha por categoria e as mesmas colunas de analyze_category_performance
+    """
+    def ratio(numerator: str, denominator: str) -> pd.Series:
+        return totals[numerator] / totals[denominator].where(totals[denominator] > 0)
+
+    category_metrics = pd.DataFrame({
+        'category': totals.index,
+        'total_revenue': totals['revenue_sum'],
+        'avg_ticket': ratio('revenue_sum', 'price_count'),
+        'total_items': totals['price_count'].astype(int),
+        'avg_satisfaction': ratio('review_sum', 'review_count'),
+        'total_reviews': totals['review_count'].astype(int),
+        'unique_orders': totals['unique_orders'].astype(int),
+        'unique_customers': totals['unique_customers'].astype(int),
+        'avg_delivery_time': ratio('delivery_sum', 'delivery_count'),
+        'cancellation_rate': ratio('cancel_sum', 'cancel_count'),
+        'total_payment': totals['payment_sum'],
+        'avg_payment': ratio('payment_sum', 'payment_count'),
+    }).reset_index(drop=True)
+
+    category_metrics['revenue_per_customer'] = category_metrics['total_revenue'] / category_metrics['unique_customers']
+    category_metrics['items_per_order'] = category_metrics['total_items'] / category_metrics['unique_orders']
+    category_metrics['review_rate'] = category_metrics['total_reviews'] / category_metrics['unique_orders']
+    return category_metrics
+
+def analyze_category_index(index: CategoryPerformanceIndex, date_range=None, states: Optional[List[str]] = None,
+                           weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Ranking das categorias para um período, estados e pesos, sem reler os dados brutos.
+
+    Args:
+        index: Índice de get_category_index
+        date_range: Lista [início, fim] ou None para todo o período
+        states: Estados a incluir (None ou vazio para todos)
+        weights: Pesos do score composto (padrão: CATEGORY_SCORE_WEIGHTS)
+
+    Returns:
+        Dict no formato de analyze_category_performance (compatível com render_category_recommendations)
+    """
+    category_metrics = category_metrics_from_totals(index.totals(date_range, states))
+    return score_category_metrics(category_metrics, weights)
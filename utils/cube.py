@@ -0,0 +1,216 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, List, Optional, Tuple
+from utils.kpi_planner import DERIVED_COLUMNS
+
+# Medidas aditivas do cubo diário: nome -> (coluna, agregação)
+CUBE_MEASURES = {
+    'receita': ('receita_liquida', 'sum'),
+    'receita_perdida': ('receita_cancelada', 'sum'),
+    'pedidos': ('order_id', 'nunique'),
+    'pedidos_cancelados': ('pedido_cancelado_id', 'nunique'),
+    'itens': ('item_unico', 'sum'),
+    'linhas': ('pedido_cancelado', 'size'),
+    'linhas_canceladas': ('pedido_cancelado', 'sum'),
+    'review_sum': ('review_score', 'sum'),
+    'review_count': ('review_score', 'count'),
+    'delivery_sum': ('delivery_time', 'sum'),
+    'delivery_count': ('delivery_time', 'count'),
+    'polarity_sum': ('review_polarity', 'sum'),
+    'polarity_count': ('review_polarity', 'count'),
+}
+
+# KPIs derivados das medidas do cubo: nome -> (numerador, denominador)
+CUBE_KPIS = {
+    'total_revenue': ('receita', None),
+    'lost_revenue': ('receita_perdida', None),
+    'total_orders': ('pedidos', None),
+    'average_ticket': ('receita', 'pedidos'),
+    'abandonment_rate': ('pedidos_cancelados', 'pedidos'),
+    'cancellation_rate': ('linhas_canceladas', 'linhas'),
+    'csat': ('review_sum', 'review_count'),
+    'avg_delivery_time': ('delivery_sum', 'delivery_count'),
+    'text_polarity': ('polarity_sum', 'polarity_count'),
+}
+
+def prepare_cube_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepara as colunas usadas pelas medidas do cubo sem alterar o DataFrame original.
+
+    Args:
+        df: DataFrame consolidado do Olist
+
+    Returns:
+        DataFrame com a coluna 'date' (dia da compra) e as colunas derivadas
+    """
+    frame = df.assign(
+        order_purchase_timestamp=pd.to_datetime(df['order_purchase_timestamp']),
+        order_delivered_customer_date=pd.to_datetime(df['order_delivered_customer_date'])
+    )
+    frame = frame.assign(**{name: fn(frame) for name, fn in DERIVED_COLUMNS.items()})
+    if 'review_polarity' not in frame:
+        # Polaridade do texto só existe em datasets gerados com o corpus de avaliações
+        frame = frame.assign(review_polarity=np.nan)
+    return frame.assign(
+        date=frame['order_purchase_timestamp'].dt.normalize(),
+        item_unico=(~frame.duplicated(['order_id', 'order_item_id'])).astype(int)
+    )
+
+@st.cache_data
+def build_daily_cube(_df: pd.DataFrame, data_version: str, dims: Tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Pré-agrega as medidas aditivas por dia (e dimensões opcionais) em uma única passada.
+
+    O cache é indexado pela versão do dataset e pelas dimensões; o DataFrame em si
+    não é hasheado.
+
+    Args:
+        _df: DataFrame consolidado do Olist
+        data_version: Versão do dataset (ver get_data_version)
+        dims: Dimensões adicionais, ex.: ('product_category_name', 'customer_state')
+
+    Returns:
+        DataFrame com uma linha por dia x dimensões e uma coluna por medida
+    """
+    frame = prepare_cube_frame(_df)
+    named_aggs = {name: pd.NamedAgg(column=column, aggfunc=func) for name, (column, func) in CUBE_MEASURES.items()}
+    cube = frame.groupby(['date'] + list(dims), dropna=False).agg(**named_aggs).reset_index()
+    return cube.sort_values(['date'] + list(dims)).reset_index(drop=True)
+
+class PrefixSumIndex:
+    """
+    Índice de somas prefixadas diárias das medidas aditivas do cubo.
+
+    O total de qualquer intervalo de datas é obtido com duas consultas ao array
+    acumulado: P[fim + 1] - P[início]. Opcionalmente o índice é separado por uma
+    dimensão do cubo (ex.: categoria ou estado), guardando um eixo por grupo.
+    """
+
+    def __init__(self, cube: pd.DataFrame, measures: Optional[List[str]] = None, split_by: Optional[str] = None):
+        self.measures = list(measures or CUBE_MEASURES)
+        self.split_by = split_by
+        start = cube['date'].min() if not cube.empty else pd.Timestamp.today().normalize()
+        end = cube['date'].max() if not cube.empty else start
+        self.days = pd.date_range(start, end, freq='D')
+
+        if split_by is None:
+            daily = cube.groupby('date')[self.measures].sum().reindex(self.days, fill_value=0)
+            values = daily.to_numpy(dtype=float)
+            self.groups = None
+        else:
+            keys = cube[split_by].fillna('desconhecido')
+            daily = cube.assign(**{split_by: keys}).groupby(['date', split_by])[self.measures].sum()
+            self.groups = pd.Index(sorted(keys.unique()))
+            full_index = pd.MultiIndex.from_product([self.days, self.groups], names=['date', split_by])
+            values = daily.reindex(full_index, fill_value=0).to_numpy(dtype=float)
+            values = values.reshape(len(self.days), len(self.groups), len(self.measures))
+
+        # Linha zero permite calcular qualquer intervalo como diferença de duas posições
+        self.prefix = np.zeros((len(self.days) + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=self.prefix[1:])
+
+    def bounds(self, start=None, end=None) -> Tuple[int, int]:
+        """Converte as datas em posições do array acumulado (intervalo fechado)."""
+        i = 0 if start is None else self.days.searchsorted(pd.to_datetime(start).normalize(), side='left')
+        j = len(self.days) if end is None else self.days.searchsorted(pd.to_datetime(end).normalize(), side='right')
+        return i, max(i, j)
+
+    def range_totals(self, start=None, end=None):
+        """
+        Soma das medidas entre `start` e `end` (inclusive).
+
+        Returns:
+            pd.Series por medida, ou pd.DataFrame grupos x medidas quando o índice é separado
+        """
+        i, j = self.bounds(start, end)
+        totals = self.prefix[j] - self.prefix[i]
+        if self.groups is None:
+            return pd.Series(totals, index=self.measures)
+        return pd.DataFrame(totals, index=self.groups, columns=self.measures)
+
+@st.cache_resource
+def get_prefix_index(_cube: pd.DataFrame, data_version: str, split_by: Optional[str] = None) -> PrefixSumIndex:
+    """Constrói (uma vez por versão do dataset) o índice de somas prefixadas do cubo."""
+    return PrefixSumIndex(_cube, split_by=split_by)
+
+def cube_kpis(totals: pd.Series) -> Dict[str, float]:
+    """Calcula os KPIs de CUBE_KPIS a partir das medidas somadas."""
+    kpis = {}
+    for name, (numerator, denominator) in CUBE_KPIS.items():
+        if denominator is None:
+            kpis[name] = totals[numerator]
+        else:
+            kpis[name] = totals[numerator] / totals[denominator] if totals[denominator] > 0 else np.nan
+    return kpis
+
+def comparison_ranges(date_range) -> Dict[str, Optional[Tuple[pd.Timestamp, pd.Timestamp]]]:
+    """
+    Calcula os intervalos do período atual, do período anterior e do mesmo período do ano anterior.
+
+    Args:
+        date_range: Lista [início, fim] ou None para todo o período
+
+    Returns:
+        Dict com as chaves 'current', 'previous' e 'yoy' ((início, fim) ou None)
+    """
+    if not date_range or len(date_range) != 2:
+        return {'current': None, 'previous': None, 'yoy': None}
+
+    start = pd.to_datetime(date_range[0]).normalize()
+    end = pd.to_datetime(date_range[1]).normalize()
+    length = end - start + pd.Timedelta(days=1)
+    return {
+        'current': (start, end),
+        'previous': (start - length, start - pd.Timedelta(days=1)),
+        'yoy': (start - pd.DateOffset(years=1), end - pd.DateOffset(years=1))
+    }
+
+def _relative_change(current, reference):
+    """Variação relativa entre dois valores (NaN quando não há referência)."""
+    if reference is None or pd.isna(reference) or reference == 0 or pd.isna(current):
+        return np.nan
+    return (current - reference) / abs(reference)
+
+def calculate_period_comparison(cube, date_range) -> Dict[str, Dict[str, float]]:
+    """
+    Calcula os KPIs do período atual, do período anterior e do ano anterior a partir do cubo diário.
+
+    Todas as comparações são consultas ao índice de somas prefixadas do cubo já
+    agregado, sem nova leitura dos dados brutos.
+
+    Args:
+        cube: Cubo diário sem dimensões (ver build_daily_cube) ou PrefixSumIndex
+        date_range: Lista [início, fim] ou None para todo o período
+
+    Returns:
+        Dict KPI -> {'current', 'previous', 'yoy', 'delta_previous', 'delta_yoy'}
+    """
+    index = cube if isinstance(cube, PrefixSumIndex) else PrefixSumIndex(cube)
+    ranges = comparison_ranges(date_range)
+    min_date = index.days[0] if len(index.days) > 0 else None
+
+    values = {}
+    for label, period in ranges.items():
+        if label == 'current':
+            start, end = period if period else (None, None)
+            values[label] = cube_kpis(index.range_totals(start, end))
+        elif period is not None and min_date is not None and period[0] >= min_date:
+            values[label] = cube_kpis(index.range_totals(*period))
+        else:
+            # Período de referência fora dos dados disponíveis
+            values[label] = None
+
+    comparison = {}
+    for name in CUBE_KPIS:
+        current = values['current'][name]
+        previous = values['previous'][name] if values['previous'] else np.nan
+        yoy = values['yoy'][name] if values['yoy'] else np.nan
+        comparison[name] = {
+            'current': current,
+            'previous': previous,
+            'yoy': yoy,
+            'delta_previous': _relative_change(current, previous),
+            'delta_yoy': _relative_change(current, yoy)
+        }
+    return comparison
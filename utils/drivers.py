@@ -0,0 +1,133 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, Any, Optional, Tuple
+from utils.cube import build_daily_cube, PrefixSumIndex, comparison_ranges
+
+# Dimensões analisadas: coluna -> rótulo
+DRIVER_DIMS = {
+    'product_category_name': 'Categoria',
+    'customer_state': 'Estado',
+    'seller_id': 'Vendedor',
+}
+
+# Efeitos da decomposição: coluna -> rótulo
+DRIVER_EFFECTS = {
+    'efeito_volume': 'Volume',
+    'efeito_mix': 'Mix',
+    'efeito_taxa': 'Ticket',
+}
+
+@st.cache_resource
+def get_driver_index(_df: pd.DataFrame, data_version: str, dim: str) -> PrefixSumIndex:
+    """Índice de somas prefixadas de receita e pedidos separado por `dim`, uma vez por versão do dataset."""
+    cube = build_daily_cube(_df, data_version, dims=(dim,))
+    return PrefixSumIndex(cube, measures=['receita', 'pedidos'], split_by=dim)
+
+def decompose_revenue_change(index: PrefixSumIndex, current: Tuple, previous: Tuple) -> pd.DataFrame:
+    """
+    Decompõe a variação da receita entre dois períodos por grupo em efeitos de volume, mix e ticket.
+
+    Com O = pedidos totais, s_g = participação do grupo nos pedidos e r_g = receita
+    por pedido do grupo, a receita é R = O * sum(s_g * r_g) e a variação de cada grupo é:
+    - volume: (O1 - O0) * s0_g * r0_g (crescimento geral dos pedidos)
+    - mix: O1 * (s1_g - s0_g) * r0_g (mudança de participação do grupo)
+    - ticket: O1 * s1_g * (r1_g - r0_g) (mudança da receita por pedido do grupo)
+    Os três efeitos somam exatamente a variação do grupo. Grupos sem pedidos em um
+    dos períodos usam o ticket do outro período (toda a variação vira mix). O total
+    de pedidos é a soma dos pedidos dos grupos, então um pedido com itens de duas
+    categorias ou vendedores conta em cada uma.
+
+    Args:
+        index: Índice separado pela dimensão analisada (ver get_driver_index)
+        current: (início, fim) do período atual
+        previous: (início, fim) do período de referência
+
+    Returns:
+        DataFrame por grupo com receita_atual, receita_anterior, pedidos_atual,
+        pedidos_anterior, variacao e os efeitos de DRIVER_EFFECTS
+    """
+    now = index.range_totals(*current)
+    before = index.range_totals(*previous)
+    revenue1, orders1 = now['receita'].to_numpy(), now['pedidos'].to_numpy()
+    revenue0, orders0 = before['receita'].to_numpy(), before['pedidos'].to_numpy()
+
+    total1, total0 = orders1.sum(), orders0.sum()
+    share1 = orders1 / total1 if total1 > 0 else np.zeros_like(orders1)
+    share0 = orders0 / total0 if total0 > 0 else np.zeros_like(orders0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate1 = np.where(orders1 > 0, revenue1 / orders1, np.nan)
+        rate0 = np.where(orders0 > 0, revenue0 / orders0, np.nan)
+    rate1, rate0 = np.where(np.isnan(rate1), rate0, rate1), np.where(np.isnan(rate0), rate1, rate0)
+    rate1, rate0 = np.nan_to_num(rate1), np.nan_to_num(rate0)
+
+    return pd.DataFrame({
+        'receita_atual': revenue1,
+        'receita_anterior': revenue0,
+        'pedidos_atual': orders1,
+        'pedidos_anterior': orders0,
+        'variacao': revenue1 - revenue0,
+        'efeito_volume': (total1 - total0) * share0 * rate0,
+        'efeito_mix': total1 * (share1 - share0) * rate0,
+        'efeito_taxa': total1 * share1 * (rate1 - rate0),
+    }, index=index.groups)
+
+def top_contributors(decomposition: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    """Seleciona os k grupos com maior variação absoluta (argpartition) em ordem decrescente."""
+    impact = np.abs(decomposition['variacao'].to_numpy())
+    if len(impact) > k:
+        selected = np.argpartition(-impact, k)[:k]
+    else:
+        selected = np.arange(len(impact))
+    selected = selected[np.argsort(-impact[selected])]
+    return decomposition.iloc[selected]
+
+def analyze_revenue_drivers(df: pd.DataFrame, data_version: str, date_range, reference: str = 'previous',
+                            k: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Principais contribuintes da variação da receita por categoria, estado e vendedor.
+
+    Args:
+        df: DataFrame consolidado do Olist
+        data_version: Versão do dataset (ver get_data_version)
+        date_range: Lista [início, fim] do período atual
+        reference: 'previous' (período anterior de mesmo tamanho) ou 'yoy' (ano anterior)
+        k: Número de contribuintes por dimensão
+
+    Returns:
+        Dict com 'current', 'previous' (intervalos), 'first_date' (início dos dados),
+        'reference_available', 'total_change' e 'drivers' (dimensão -> top
+        contribuintes), ou None quando não há período selecionado. Quando o período
+        de referência começa antes dos dados (como em calculate_period_comparison),
+        reference_available é False e total_change e drivers ficam None.
+    """
+    ranges = comparison_ranges(date_range)
+    if ranges['current'] is None:
+        return None
+
+    indexes = {dim: get_driver_index(df, data_version, dim) for dim in DRIVER_DIMS}
+    days = next(iter(indexes.values())).days
+    first_date = days[0] if len(days) > 0 else None
+    result = {
+        'current': ranges['current'],
+        'previous': ranges[reference],
+        'first_date': first_date,
+        'reference_available': first_date is not None and ranges[reference][0] >= first_date,
+        'total_change': None,
+        'drivers': None
+    }
+    if not result['reference_available']:
+        # Sem receita de referência, toda a receita atual apareceria como mix
+        return result
+
+    drivers = {}
+    total_change = None
+    for dim, index in indexes.items():
+        decomposition = decompose_revenue_change(index, ranges['current'], ranges[reference])
+        # A variação total é a mesma em qualquer dimensão
+        total_change = decomposition['variacao'].sum()
+        drivers[dim] = top_contributors(decomposition, k)
+
+    result['total_change'] = total_change
+    result['drivers'] = drivers
+    return result
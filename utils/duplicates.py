@@ -0,0 +1,175 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from typing import Dict, Any, Tuple
+
+# Assinaturas MinHash: NUM_PERM permutações divididas em BANDS bandas de ROWS linhas.
+# Com 8 bandas de 8 linhas, pares com similaridade de Jaccard ~0.77 têm 50% de chance
+# de cair no mesmo bucket em alguma banda; acima de 0.9 a chance passa de 99%.
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Similaridade estimada mínima para confirmar um par candidato
+SIMILARITY_THRESHOLD = 0.8
+# Avaliações curtas ("produto ótimo, recomendo") são legitimamente repetidas e ficam de fora
+MIN_TOKENS = 5
+# Primo de Mersenne 2^31 - 1: a * x + b cabe em uint64 sem estouro
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+# Shingles processados por bloco no cálculo das assinaturas
+SHINGLE_CHUNK = 100_000
+
+# Dimensões do relatório de duplicatas: coluna -> rótulo
+DUPLICATE_REPORT_DIMS = {
+    'seller_id': 'Vendedor',
+    'product_id': 'Produto',
+}
+
+def _shingle_hashes(tokens: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes dos shingles (pares de tokens consecutivos) de todas as avaliações.
+
+    Returns:
+        Tupla (hash de cada shingle, posição inicial dos shingles de cada avaliação)
+    """
+    lengths = tokens.map(len).to_numpy()
+    words = np.concatenate([np.asarray(review, dtype=object) for review in tokens])
+    doc = np.repeat(np.arange(len(tokens)), lengths)
+    word_hashes = pd.util.hash_array(words)
+    # Um shingle por par de tokens vizinhos dentro da mesma avaliação
+    same_doc = doc[1:] == doc[:-1]
+    hashes = word_hashes[:-1][same_doc] * np.uint64(0x9E3779B97F4A7C15) + word_hashes[1:][same_doc]
+    offsets = np.concatenate([[0], np.cumsum(lengths - 1)[:-1]])
+    return hashes, offsets
+
+def minhash_signatures(tokens: pd.Series, seed: int = 42) -> np.ndarray:
+    """
+    Assinaturas MinHash das avaliações (uma linha por avaliação, uma coluna por permutação).
+
+    As permutações são funções (a * x + b) mod p aplicadas a todos os shingles de
+    uma vez; o mínimo por avaliação sai de np.minimum.reduceat. Todas as avaliações
+    devem ter pelo menos dois tokens.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(MERSENNE_PRIME), NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, int(MERSENNE_PRIME), NUM_PERM, dtype=np.uint64)
+    hashes, offsets = _shingle_hashes(tokens)
+    values = hashes % MERSENNE_PRIME
+
+    signatures = np.empty((len(offsets), NUM_PERM), dtype=np.uint64)
+    ends = np.append(offsets[1:], len(values))
+    start_doc = 0
+    while start_doc < len(offsets):
+        # Bloco de avaliações inteiras com até SHINGLE_CHUNK shingles (ao menos uma avaliação)
+        end_doc = max(np.searchsorted(ends, offsets[start_doc] + SHINGLE_CHUNK, side='right'), start_doc + 1)
+        block = values[offsets[start_doc]:ends[end_doc - 1]]
+        permuted = (block[:, None] * a + b) % MERSENNE_PRIME
+        signatures[start_doc:end_doc] = np.minimum.reduceat(permuted, offsets[start_doc:end_doc] - offsets[start_doc], axis=0)
+        start_doc = end_doc
+    return signatures
+
+def lsh_candidate_pairs(signatures: np.ndarray, seed: int = 42) -> np.ndarray:
+    """
+    Pares candidatos: avaliações com a mesma chave em pelo menos uma banda.
+
+    Em cada banda as chaves são ordenadas e avaliações vizinhas com a mesma chave
+    viram um par, o que liga todos os membros de um bucket em cadeia sem gerar
+    todos os pares.
+
+    Returns:
+        Array (pares x 2) de posições, sem repetição
+    """
+    multipliers = np.random.default_rng(seed).integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    for band in range(BANDS):
+        keys = (signatures[:, band * ROWS:(band + 1) * ROWS] * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        same = keys[order][1:] == keys[order][:-1]
+        pairs.append(np.column_stack([order[:-1][same], order[1:][same]]))
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.sort(pairs, axis=1), axis=0)
+
+def find_near_duplicates(corpus: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrupa avaliações quase idênticas do corpus com MinHash e LSH.
+
+    Pares candidatos do LSH são confirmados pela similaridade estimada pelas
+    assinaturas (>= SIMILARITY_THRESHOLD) e os grupos são as componentes conexas
+    do grafo de pares. Em cada grupo a avaliação mais antiga é a original e as
+    demais são marcadas como duplicatas.
+
+    Args:
+        corpus: Corpus de avaliações (ver build_review_corpus)
+
+    Returns:
+        DataFrame com review_id, cluster, cluster_size e duplicate para cada
+        avaliação que pertence a um grupo
+    """
+    columns = ['review_id', 'cluster', 'cluster_size', 'duplicate']
+    eligible = corpus[corpus['tokens'].map(len).to_numpy() >= MIN_TOKENS]
+    if len(eligible) < 2:
+        return pd.DataFrame(columns=columns)
+
+    signatures = minhash_signatures(eligible['tokens'])
+    pairs = lsh_candidate_pairs(signatures)
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[similarity >= SIMILARITY_THRESHOLD]
+    if len(pairs) == 0:
+        return pd.DataFrame(columns=columns)
+
+    graph = sparse.coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(len(eligible),) * 2)
+    _, labels = connected_components(graph, directed=False)
+    sizes = np.bincount(labels)
+    members = np.flatnonzero(sizes[labels] > 1)
+
+    duplicates = pd.DataFrame({
+        'review_id': eligible['review_id'].to_numpy()[members],
+        'cluster': pd.factorize(labels[members])[0],
+        'cluster_size': sizes[labels[members]],
+        'created': pd.to_datetime(eligible['review_creation_date'].to_numpy()[members]),
+    }).sort_values(['cluster', 'created'], kind='stable')
+    duplicates['duplicate'] = duplicates.duplicated('cluster')
+    return duplicates[columns].reset_index(drop=True)
+
+@st.cache_data
+def get_near_duplicates(_corpus: pd.DataFrame, data_version: str) -> pd.DataFrame:
+    """Grupos de avaliações quase duplicadas, calculados uma vez por versão do dataset."""
+    return find_near_duplicates(_corpus)
+
+def duplicate_report(corpus: pd.DataFrame, duplicates: pd.DataFrame, by: str = 'seller_id', k: int = 20) -> pd.DataFrame:
+    """
+    Vendedores ou produtos com mais avaliações em grupos de quase duplicatas.
+
+    Args:
+        corpus: Corpus de avaliações
+        duplicates: Resultado de find_near_duplicates
+        by: Coluna de DUPLICATE_REPORT_DIMS
+        k: Número de linhas
+
+    Returns:
+        DataFrame por `by` com avaliacoes, em_grupos, grupos, participacao,
+        nota_media e nota_media_grupos, ordenado por em_grupos
+    """
+    frame = corpus[[by, 'review_id', 'review_score']].merge(
+        duplicates[['review_id', 'cluster']], on='review_id', how='left'
+    )
+    frame['clustered_score'] = frame['review_score'].where(frame['cluster'].notna())
+    report = frame.groupby(by).agg(
+        avaliacoes=('review_id', 'size'),
+        em_grupos=('cluster', 'count'),
+        grupos=('cluster', 'nunique'),
+        nota_media=('review_score', 'mean'),
+        nota_media_grupos=('clustered_score', 'mean'),
+    )
+    report = report[report['em_grupos'] > 0]
+    report['participacao'] = report['em_grupos'] / report['avaliacoes']
+    return report.sort_values(['em_grupos', 'participacao'], ascending=False).head(k)
+
+def duplicate_summary(duplicates: pd.DataFrame) -> Dict[str, Any]:
+    """Totais dos grupos de quase duplicatas."""
+    return {
+        'clusters': int(duplicates['cluster'].nunique()),
+        'clustered_reviews': int(len(duplicates)),
+        'duplicate_reviews': int(duplicates['duplicate'].sum()),
+    }
@@ -0,0 +1,168 @@
+import os
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, Optional
+
+GEOLOCATION_PATH = "dados/olist_geolocation_dataset.csv"
+CENTROIDS_PATH = "olist_zip_centroids.parquet"
+
+# Limites aproximados do Brasil, usados para descartar coordenadas inválidas
+BRAZIL_BOUNDS = {'lat': (-34.0, 5.5), 'lng': (-74.0, -34.0)}
+
+# Projeção equiretangular centrada no Brasil (km por grau)
+REFERENCE_LAT = -15.0
+KM_PER_DEGREE_LAT = 110.57
+KM_PER_DEGREE_LNG = 111.32 * np.cos(np.radians(REFERENCE_LAT))
+
+# Níveis de zoom: nome -> (tipo de célula, parâmetro)
+# 'zip': prefixo do CEP com N dígitos; 'hex': hexágono com raio em km
+ZOOM_LEVELS = {
+    'Região (CEP 2 dígitos)': ('zip', 2),
+    'Sub-região (CEP 3 dígitos)': ('zip', 3),
+    'Hexágonos de 100 km': ('hex', 100.0),
+    'Hexágonos de 25 km': ('hex', 25.0),
+    'Hexágonos de 5 km': ('hex', 5.0),
+}
+
+# Métricas agregadas por célula: nome -> rótulo
+GEO_METRICS = {
+    'revenue': 'Receita (R$)',
+    'csat': 'Satisfação Média',
+    'avg_delivery_time': 'Tempo Médio de Entrega (dias)',
+}
+
+def build_zip_centroids(geolocation: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula o centroide de cada prefixo de CEP a partir do dataset de geolocalização.
+
+    Args:
+        geolocation: Dataset olist_geolocation_dataset
+
+    Returns:
+        DataFrame com as colunas zip_prefix, lat e lng
+    """
+    lat = geolocation['geolocation_lat']
+    lng = geolocation['geolocation_lng']
+    valid = lat.between(*BRAZIL_BOUNDS['lat']) & lng.between(*BRAZIL_BOUNDS['lng'])
+    return (
+        geolocation[valid]
+        .groupby('geolocation_zip_code_prefix')
+        .agg(lat=('geolocation_lat', 'mean'), lng=('geolocation_lng', 'mean'))
+        .rename_axis('zip_prefix')
+        .reset_index()
+    )
+
+@st.cache_data
+def load_zip_centroids() -> Optional[pd.DataFrame]:
+    """Carrega os centroides gerados no ETL ou os calcula a partir do CSV de geolocalização."""
+    if os.path.exists(CENTROIDS_PATH):
+        return pd.read_parquet(CENTROIDS_PATH)
+    if os.path.exists(GEOLOCATION_PATH):
+        return build_zip_centroids(pd.read_csv(GEOLOCATION_PATH))
+    return None
+
+def prepare_geo_orders(df: pd.DataFrame, centroids: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduz os dados ao grão de pedido e associa cada pedido ao centroide do CEP do cliente.
+
+    Returns:
+        DataFrame por pedido com zip_prefix, lat, lng, receita, nota e tempo de entrega
+    """
+    items = df.drop_duplicates(['order_id', 'order_item_id'])
+    purchase = pd.to_datetime(items['order_purchase_timestamp'])
+    delivered = pd.to_datetime(items['order_delivered_customer_date'])
+    items = items.assign(
+        receita_liquida=items['price'].where(items['pedido_cancelado'] == 0, 0),
+        delivery_time=(delivered - purchase).dt.days
+    )
+    orders = items.groupby('order_id').agg(
+        zip_prefix=('customer_zip_code_prefix', 'first'),
+        revenue=('receita_liquida', 'sum'),
+        review_score=('review_score', 'first'),
+        delivery_time=('delivery_time', 'first')
+    )
+    return orders.merge(centroids, on='zip_prefix', how='inner')
+
+def _hex_cells(lat: np.ndarray, lng: np.ndarray, radius_km: float):
+    """
+    Atribui cada ponto a um hexágono (coordenadas axiais) e retorna os centros em lat/lng.
+    """
+    x = lng * KM_PER_DEGREE_LNG / radius_km
+    y = lat * KM_PER_DEGREE_LAT / radius_km
+
+    # Coordenadas axiais fracionárias de hexágonos "pointy-top"
+    q = np.sqrt(3) / 3 * x - y / 3
+    r = 2 / 3 * y
+    s = -q - r
+
+    # Arredondamento para o hexágono mais próximo
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    center_x = np.sqrt(3) * rq + np.sqrt(3) / 2 * rr
+    center_y = 1.5 * rr
+    cell = rq.astype(np.int64) * 1_000_003 + rr.astype(np.int64)
+    return cell, center_y * radius_km / KM_PER_DEGREE_LAT, center_x * radius_km / KM_PER_DEGREE_LNG
+
+def bin_geo_metrics(orders: pd.DataFrame, level: str) -> pd.DataFrame:
+    """
+    Agrega as métricas dos pedidos nas células de um nível de zoom.
+
+    Args:
+        orders: Resultado de prepare_geo_orders
+        level: Chave de ZOOM_LEVELS
+
+    Returns:
+        DataFrame com uma linha por célula: cell, lat, lng, orders, revenue, csat e avg_delivery_time
+    """
+    kind, parameter = ZOOM_LEVELS[level]
+    if kind == 'zip':
+        cell = orders['zip_prefix'].astype(int).astype(str).str.zfill(5).str[:parameter]
+        cells = orders.assign(cell=cell)
+    else:
+        cell, cell_lat, cell_lng = _hex_cells(orders['lat'].to_numpy(), orders['lng'].to_numpy(), parameter)
+        cells = orders.assign(cell=cell, cell_lat=cell_lat, cell_lng=cell_lng)
+
+    aggregations = {
+        'orders': ('revenue', 'size'),
+        'revenue': ('revenue', 'sum'),
+        'csat': ('review_score', 'mean'),
+        'avg_delivery_time': ('delivery_time', 'mean'),
+    }
+    if kind == 'zip':
+        # Centro da região: média dos centroides ponderada pelos pedidos
+        aggregations.update({'lat': ('lat', 'mean'), 'lng': ('lng', 'mean')})
+    else:
+        aggregations.update({'lat': ('cell_lat', 'first'), 'lng': ('cell_lng', 'first')})
+    return cells.groupby('cell').agg(**aggregations).reset_index()
+
+@st.cache_data
+def get_geo_layers(_df: pd.DataFrame, data_version: str, date_range=None) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Pré-agrega as células de todos os níveis de zoom, em cache por versão do dataset e período.
+
+    Returns:
+        Dict nível -> células agregadas, ou None se não houver dados de geolocalização
+    """
+    centroids = load_zip_centroids()
+    if centroids is None:
+        return None
+    orders = prepare_geo_orders(_df, centroids)
+    return {level: bin_geo_metrics(orders, level) for level in ZOOM_LEVELS}
+
+def color_scale(values: pd.Series, higher_is_better: bool = True) -> np.ndarray:
+    """Converte os valores em cores RGB (vermelho = pior, verde = melhor)."""
+    values = values.astype(float)
+    low, high = values.min(), values.max()
+    scaled = (values - low) / (high - low) if high > low else values * 0 + 0.5
+    scaled = scaled.fillna(0.5).to_numpy()
+    if not higher_is_better:
+        scaled = 1 - scaled
+    red = (255 * (1 - scaled)).astype(int)
+    green = (200 * scaled).astype(int)
+    return np.column_stack([red, green, np.full(len(scaled), 80), np.full(len(scaled), 180)])
@@ -5,12 +5,48 @@ import streamlit as st
 from utils.KPIs import render_kpi_block, render_plotly_glass_card
 import plotly.graph_objects as go
 
-def calculate_revenue_insights(df: pd.DataFrame) -> Dict[str, Any]:
+def calculate_delivery_time(df: pd.DataFrame) -> pd.Series:
+    """Tempo de entrega em dias de cada linha, sem alterar o DataFrame."""
+    return (pd.to_datetime(df['order_delivered_customer_date']) - 
+            pd.to_datetime(df['order_purchase_timestamp'])).dt.days
+
+def calculate_monthly_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula as métricas mensais usadas pelos insights da visão geral em uma única passada.
+    
+    Args:
+        df: DataFrame com os dados filtrados (não é alterado)
+        
+    Returns:
+        DataFrame com uma linha por mês e as colunas:
+        - order_purchase_timestamp: Mês (texto no formato AAAA-MM)
+        - price: Receita do mês
+        - review_score: Nota média do mês
+        - pedido_cancelado: Taxa de cancelamento do mês
+        - delivery_time: Tempo médio de entrega do mês
+    """
+    month = pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M')
+    monthly_metrics = pd.DataFrame({
+        'price': df['price'],
+        'review_score': df['review_score'],
+        'pedido_cancelado': df['pedido_cancelado'],
+        'delivery_time': calculate_delivery_time(df)
+    }).groupby(month).agg(
+        price=('price', 'sum'),
+        review_score=('review_score', 'mean'),
+        pedido_cancelado=('pedido_cancelado', 'mean'),
+        delivery_time=('delivery_time', 'mean')
+    ).reset_index()
+    monthly_metrics['order_purchase_timestamp'] = monthly_metrics['order_purchase_timestamp'].astype(str)
+    return monthly_metrics
+
+def calculate_revenue_insights(df: pd.DataFrame, monthly_metrics: pd.DataFrame = None) -> Dict[str, Any]:
     """
     Calcula insights relacionados à receita.
     
     Args:
         df: DataFrame com os dados filtrados
+        monthly_metrics: Métricas mensais já calculadas (ver calculate_monthly_metrics)
         
     Returns:
         Dict com insights sobre receita, incluindo:
@@ -20,9 +56,10 @@ def calculate_revenue_insights(df: pd.DataFrame) -> Dict[str, Any]:
         - trend: Tendência (crescimento, estável, queda)
         - monthly_revenue: DataFrame com receita mensal
     """
-    # Calcular receita mensal
-    monthly_revenue = df.groupby(pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M'))['price'].sum().reset_index()
-    monthly_revenue['order_purchase_timestamp'] = monthly_revenue['order_purchase_timestamp'].astype(str)
+    # Receita mensal
+    if monthly_metrics is None:
+        monthly_metrics = calculate_monthly_metrics(df)
+    monthly_revenue = monthly_metrics[['order_purchase_timestamp', 'price']].copy()
     
     # Calcular crescimento
     if len(monthly_revenue) >= 2:
@@ -58,12 +95,13 @@ def calculate_revenue_insights(df: pd.DataFrame) -> Dict[str, Any]:
         "monthly_revenue": monthly_revenue
     }
 
-def calculate_satisfaction_insights(df: pd.DataFrame) -> Dict[str, Any]:
+def calculate_satisfaction_insights(df: pd.DataFrame, monthly_metrics: pd.DataFrame = None) -> Dict[str, Any]:
     """
     Calcula insights relacionados à satisfação do cliente.
     
     Args:
         df: DataFrame com os dados filtrados
+        monthly_metrics: Métricas mensais já calculadas (ver calculate_monthly_metrics)
         
     Returns:
         Dict com insights sobre satisfação, incluindo:
@@ -72,9 +110,10 @@ def calculate_satisfaction_insights(df: pd.DataFrame) -> Dict[str, Any]:
         - distribution: Distribuição das avaliações
         - monthly_satisfaction: DataFrame com satisfação mensal
     """
-    # Calcular satisfação mensal
-    monthly_satisfaction = df.groupby(pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M'))['review_score'].mean().reset_index()
-    monthly_satisfaction['order_purchase_timestamp'] = monthly_satisfaction['order_purchase_timestamp'].astype(str)
+    # Satisfação mensal
+    if monthly_metrics is None:
+        monthly_metrics = calculate_monthly_metrics(df)
+    monthly_satisfaction = monthly_metrics[['order_purchase_timestamp', 'review_score']].copy()
     
     # Calcular média geral
     avg_satisfaction = df['review_score'].mean()
@@ -113,12 +152,13 @@ def calculate_satisfaction_insights(df: pd.DataFrame) -> Dict[str, Any]:
         "lowest_score_percentage": satisfaction_distribution.get(1, 0)
     }
 
-def calculate_cancellation_insights(df: pd.DataFrame) -> Dict[str, Any]:
+def calculate_cancellation_insights(df: pd.DataFrame, monthly_metrics: pd.DataFrame = None) -> Dict[str, Any]:
     """
     Calcula insights relacionados a cancelamentos.
     
     Args:
         df: DataFrame com os dados filtrados
+        monthly_metrics: Métricas mensais já calculadas (ver calculate_monthly_metrics)
         
     Returns:
         Dict com insights sobre cancelamentos, incluindo:
@@ -127,9 +167,10 @@ def calculate_cancellation_insights(df: pd.DataFrame) -> Dict[str, Any]:
         - lost_revenue: Receita perdida
         - monthly_cancellation: DataFrame com cancelamentos mensais
     """
-    # Calcular taxa de cancelamento mensal
-    monthly_cancellation = df.groupby(pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M'))['pedido_cancelado'].mean().reset_index()
-    monthly_cancellation['order_purchase_timestamp'] = monthly_cancellation['order_purchase_timestamp'].astype(str)
+    # Taxa de cancelamento mensal
+    if monthly_metrics is None:
+        monthly_metrics = calculate_monthly_metrics(df)
+    monthly_cancellation = monthly_metrics[['order_purchase_timestamp', 'pedido_cancelado']].copy()
     
     # Calcular métricas gerais
     cancellation_rate = df['pedido_cancelado'].mean()
@@ -166,12 +207,13 @@ def calculate_cancellation_insights(df: pd.DataFrame) -> Dict[str, Any]:
         "monthly_cancellation": monthly_cancellation
     }
 
-def calculate_delivery_insights(df: pd.DataFrame) -> Dict[str, Any]:
+def calculate_delivery_insights(df: pd.DataFrame, monthly_metrics: pd.DataFrame = None) -> Dict[str, Any]:
     """
     Calcula insights relacionados a entregas.
     
     Args:
-        df: DataFrame com os dados filtrados
+        df: DataFrame com os dados filtrados (não é alterado)
+        monthly_metrics: Métricas mensais já calculadas (ver calculate_monthly_metrics)
         
     Returns:
         Dict com insights sobre entregas, incluindo:
@@ -180,24 +222,24 @@ def calculate_delivery_insights(df: pd.DataFrame) -> Dict[str, Any]:
         - delivery_stats: Estatísticas de entrega
     """
     # Calcular tempo de entrega
-    df['delivery_time'] = (pd.to_datetime(df['order_delivered_customer_date']) - 
-                         pd.to_datetime(df['order_purchase_timestamp'])).dt.days
+    delivery_time = calculate_delivery_time(df)
     
-    # Calcular médias mensais
-    monthly_delivery = df.groupby(pd.to_datetime(df['order_purchase_timestamp']).dt.to_period('M'))['delivery_time'].mean().reset_index()
-    monthly_delivery['order_purchase_timestamp'] = monthly_delivery['order_purchase_timestamp'].astype(str)
+    # Médias mensais
+    if monthly_metrics is None:
+        monthly_metrics = calculate_monthly_metrics(df)
+    monthly_delivery = monthly_metrics[['order_purchase_timestamp', 'delivery_time']].copy()
     
     # Calcular métricas gerais
-    avg_delivery_time = df['delivery_time'].mean()
+    avg_delivery_time = delivery_time.mean()
     
     # Definir limites para classificação de entregas
     FAST_DELIVERY = 7  # Entregas em até 7 dias são consideradas rápidas
     NORMAL_DELIVERY = 15  # Entregas em até 15 dias são consideradas normais
     
     # Calcular distribuição das entregas
-    fast_deliveries = df[df['delivery_time'] <= FAST_DELIVERY]['order_id'].count()
-    normal_deliveries = df[(df['delivery_time'] > FAST_DELIVERY) & (df['delivery_time'] <= NORMAL_DELIVERY)]['order_id'].count()
-    slow_deliveries = df[df['delivery_time'] > NORMAL_DELIVERY]['order_id'].count()
+    fast_deliveries = df[delivery_time <= FAST_DELIVERY]['order_id'].count()
+    normal_deliveries = df[(delivery_time > FAST_DELIVERY) & (delivery_time <= NORMAL_DELIVERY)]['order_id'].count()
+    slow_deliveries = df[delivery_time > NORMAL_DELIVERY]['order_id'].count()
     total_deliveries = df['order_id'].count()
     
     # Calcular percentuais
@@ -295,10 +337,13 @@ def generate_overview_insights(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dict com todos os insights organizados por categoria
     """
-    revenue_insights = calculate_revenue_insights(df)
-    satisfaction_insights = calculate_satisfaction_insights(df)
-    cancellation_insights = calculate_cancellation_insights(df)
-    delivery_insights = calculate_delivery_insights(df)
+    # Frame mensal compartilhado por todos os cálculos de tendência
+    monthly_metrics = calculate_monthly_metrics(df)
+    
+    revenue_insights = calculate_revenue_insights(df, monthly_metrics)
+    satisfaction_insights = calculate_satisfaction_insights(df, monthly_metrics)
+    cancellation_insights = calculate_cancellation_insights(df, monthly_metrics)
+    delivery_insights = calculate_delivery_insights(df, monthly_metrics)
     
     # Identificar principais oportunidades de melhoria
     improvement_opportunities = []
@@ -738,12 +783,68 @@ def render_customer_behavior_insights(df: pd.DataFrame) -> None:
     
     st.markdown(conclusions)
 
-def analyze_category_performance(df: pd.DataFrame) -> Dict[str, Any]:
+# Pesos padrão do score composto das categorias: métrica -> (rótulo, peso)
+CATEGORY_SCORE_WEIGHTS = {
+    'total_revenue': ('Receita Total', 0.20),
+    'avg_ticket': ('Ticket Médio', 0.15),
+    'avg_satisfaction': ('Satisfação Média', 0.20),
+    'unique_orders': ('Pedidos Únicos', 0.10),
+    'unique_customers': ('Clientes Únicos', 0.10),
+    'revenue_per_customer': ('Receita por Cliente', 0.10),
+    'items_per_order': ('Itens por Pedido', 0.05),
+    'review_rate': ('Taxa de Avaliação', 0.05),
+    'avg_payment': ('Pagamento Médio', 0.05)
+}
+
+def score_category_metrics(category_metrics: pd.DataFrame, weights: Dict[str, float] = None) -> Dict[str, Any]:
+    """
+    Normaliza as métricas das categorias e calcula o score composto.
+    
+    Args:
+        category_metrics: DataFrame com uma linha por categoria (coluna 'category')
+        weights: Peso de cada métrica (padrão: CATEGORY_SCORE_WEIGHTS); o score é
+            a média ponderada das métricas normalizadas
+        
+    Returns:
+        Dict com top_categories, bottom_categories e category_metrics
+    """
+    if weights is None:
+        weights = {metric: weight for metric, (_, weight) in CATEGORY_SCORE_WEIGHTS.items()}
+    category_metrics = category_metrics.copy()
+    
+    # Criar colunas de score normalizadas (min-max)
+    for metric in CATEGORY_SCORE_WEIGHTS:
+        min_val = category_metrics[metric].min()
+        max_val = category_metrics[metric].max()
+        range_val = max_val - min_val
+        if range_val > 0:  # Evitar divisão por zero
+            category_metrics[f'{metric}_score'] = (category_metrics[metric] - min_val) / range_val
+        else:
+            category_metrics[f'{metric}_score'] = 0.5  # Valor neutro quando não há variação
+    
+    # Calcular score composto usando as colunas de score normalizadas
+    total_weight = sum(weights.values())
+    category_metrics['composite_score'] = sum(
+        category_metrics[f'{metric}_score'] * weight
+        for metric, weight in weights.items()
+    ) / (total_weight if total_weight > 0 else 1)
+    
+    return {
+        'top_categories': category_metrics.nlargest(5, 'composite_score'),
+        'bottom_categories': category_metrics.nsmallest(5, 'composite_score'),
+        'category_metrics': category_metrics
+    }
+
+def analyze_category_performance(df: pd.DataFrame, weights: Dict[str, float] = None) -> Dict[str, Any]:
     """
     Analisa o desempenho das categorias com base em múltiplas métricas.
     
+    Para filtros de período e estado repetidos, prefira o índice de
+    utils.categories, que responde a partir de agregados mensais.
+    
     Args:
-        df: DataFrame com os dados filtrados
+        df: DataFrame com os dados filtrados (não é alterado)
+        weights: Pesos do score composto (padrão: CATEGORY_SCORE_WEIGHTS)
         
     Returns:
         Dict com insights sobre categorias, incluindo:
@@ -751,14 +852,8 @@ def analyze_category_performance(df: pd.DataFrame) -> Dict[str, Any]:
         - bottom_categories: Categorias que precisam de atenção
         - category_metrics: Métricas detalhadas por categoria
     """
-    # Calcular tempo de entrega
-    df['delivery_time'] = (
-        pd.to_datetime(df['order_delivered_customer_date']) - 
-        pd.to_datetime(df['order_purchase_timestamp'])
-    ).dt.days
-    
     # Agrupar dados por categoria
-    category_metrics = df.groupby('product_category_name').agg({
+    category_metrics = df.assign(delivery_time=calculate_delivery_time(df)).groupby('product_category_name').agg({
         'price': ['sum', 'mean', 'count'],  # Receita total, ticket médio, número de pedidos
         'review_score': ['mean', 'count'],  # Satisfação média, número de avaliações
         'order_id': 'nunique',  # Número de pedidos únicos
@@ -789,59 +884,7 @@ def analyze_category_performance(df: pd.DataFrame) -> Dict[str, Any]:
     category_metrics['items_per_order'] = category_metrics['total_items'] / category_metrics['unique_orders']
     category_metrics['review_rate'] = category_metrics['total_reviews'] / category_metrics['unique_orders']
     
-    # Normalizar métricas para ranking
-    metrics_to_normalize = [
-        'total_revenue',
-        'avg_ticket',
-        'avg_satisfaction',
-        'unique_orders',
-        'unique_customers',
-        'revenue_per_customer',
-        'items_per_order',
-        'review_rate',
-        'avg_payment'
-    ]
-    
-    # Criar colunas de score normalizadas
-    for metric in metrics_to_normalize:
-        min_val = category_metrics[metric].min()
-        max_val = category_metrics[metric].max()
-        range_val = max_val - min_val
-        if range_val > 0:  # Evitar divisão por zero
-            category_metrics[f'{metric}_score'] = (category_metrics[metric] - min_val) / range_val
-        else:
-            category_metrics[f'{metric}_score'] = 0.5  # Valor neutro quando não há variação
-    
-    # Calcular score composto
-    weights = {
-        'total_revenue': 0.20,
-        'avg_ticket': 0.15,
-        'avg_satisfaction': 0.20,
-        'unique_orders': 0.10,
-        'unique_customers': 0.10,
-        'revenue_per_customer': 0.10,
-        'items_per_order': 0.05,
-        'review_rate': 0.05,
-        'avg_payment': 0.05
-    }
-    
-    # Calcular score composto usando as colunas de score normalizadas
-    category_metrics['composite_score'] = sum(
-        category_metrics[f'{metric}_score'] * weight
-        for metric, weight in weights.items()
-    )
-    
-    # Identificar categorias em destaque (top 5)
-    top_categories = category_metrics.nlargest(5, 'composite_score')
-    
-    # Identificar categorias que precisam de atenção (bottom 5)
-    bottom_categories = category_metrics.nsmallest(5, 'composite_score')
-    
-    return {
-        'top_categories': top_categories,
-        'bottom_categories': bottom_categories,
-        'category_metrics': category_metrics
-    }
+    return score_category_metrics(category_metrics, weights)
 
 def render_category_recommendations(analysis: Dict[str, Any]) -> None:
     """
@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from typing import Dict, Any, List
+from utils.kpi_planner import GRAIN_FRAMES, GRAIN_COLUMNS, _ratio
+
+KPI_DEFINITIONS_PATH = "kpi_definitions.json"
+
+# Agregações aceitas nas medidas ('distinct': true equivale a 'nunique')
+SUPPORTED_AGGS = ('sum', 'mean', 'count', 'nunique', 'size', 'min', 'max', 'median')
+
+# Operadores de filtro: nome -> função (série, valor) -> máscara booleana
+FILTER_OPERATORS = {
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v),
+    'isna': lambda s, v: s.isna(),
+    'notna': lambda s, v: s.notna(),
+}
+
+# Formatos de exibição: nome -> função de formatação
+KPI_FORMATS = {
+    'number': lambda v: f"{v:,.2f}",
+    'integer': lambda v: f"{int(v):,}",
+    'currency': lambda v: f"R$ {v:,.2f}",
+    'percent': lambda v: f"{v * 100:.2f}%",
+}
+
+# Registros compilados por hash da definição
+_COMPILED_CACHE: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+def definition_hash(definitions: Dict[str, Any]) -> str:
+    """Hash estável de um conjunto de definições (independe da ordem das chaves)."""
+    return hashlib.sha256(json.dumps(definitions, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def load_kpi_definitions(path: str = KPI_DEFINITIONS_PATH) -> Dict[str, Any]:
+    """
+    Lê as definições de KPIs personalizados de um arquivo JSON ou YAML.
+
+    YAML exige o pacote PyYAML, que é opcional.
+
+    Returns:
+        Dict nome do KPI -> definição (vazio se o arquivo não existir)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("Instale o PyYAML para usar definições de KPIs em YAML") from e
+            content = yaml.safe_load(f) or {}
+        else:
+            content = json.load(f)
+    return content.get('kpis', {})
+
+def _build_mask(frame: pd.DataFrame, filters: List[Dict[str, Any]]) -> pd.Series:
+    """Combina os filtros com E lógico em uma única máscara booleana."""
+    mask = pd.Series(True, index=frame.index)
+    for condition in filters:
+        mask &= FILTER_OPERATORS[condition['op']](frame[condition['column']], condition.get('value')).fillna(False).astype(bool)
+    return mask
+
+def _validate_filters(name: str, filters: List[Dict[str, Any]]) -> None:
+    """Valida a estrutura dos filtros de uma definição."""
+    for condition in filters:
+        if 'column' not in condition or condition.get('op') not in FILTER_OPERATORS:
+            raise ValueError(f"KPI '{name}': filtro inválido {condition} (operadores: {', '.join(FILTER_OPERATORS)})")
+
+def _validate_columns(name: str, grain: str, columns: List[str]) -> None:
+    """Verifica se as colunas usadas existem no frame da granularidade (quando ele é restrito)."""
+    available = GRAIN_COLUMNS.get(grain)
+    if available is None:
+        return
+    missing = [column for column in columns if column not in available]
+    if missing:
+        raise ValueError(
+            f"KPI '{name}': coluna(s) {', '.join(missing)} indisponível(is) na granularidade '{grain}' "
+            f"(use {', '.join(available)} ou a granularidade 'item')"
+        )
+
+def _compile_measure(name: str, measure: Dict[str, Any], grain: str, shared_filters: List[Dict[str, Any]]):
+    """
+    Converte uma medida (numerador ou denominador) em uma agregação parcial do planejador.
+
+    Medidas com filtro viram uma coluna sob demanda com os valores fora do filtro
+    anulados (NaN não entra em sum/mean/count/nunique). Medidas iguais em KPIs
+    diferentes geram o mesmo nome de parcial e são calculadas uma única vez.
+
+    Returns:
+        Tupla (nome da parcial, (coluna, agregação), colunas sob demanda nome -> função)
+    """
+    agg = 'nunique' if measure.get('distinct') else measure.get('agg', 'sum')
+    if agg not in SUPPORTED_AGGS:
+        raise ValueError(f"KPI '{name}': agregação '{agg}' não suportada (use {', '.join(SUPPORTED_AGGS)})")
+    column = measure.get('column', 'order_id')
+    filters = shared_filters + measure.get('filters', [])
+    _validate_filters(name, filters)
+    _validate_columns(name, grain, [column] + [condition['column'] for condition in filters])
+
+    key = definition_hash({'grain': grain, 'column': column, 'agg': agg, 'filters': filters})[:12]
+    columns = {}
+    if filters:
+        filtered_column = f"_filtro_{key}"
+        if agg == 'size':
+            # Contagem de linhas que passam no filtro
+            columns[filtered_column] = lambda frame: _build_mask(frame, filters).astype(int)
+            column, agg = filtered_column, 'sum'
+        else:
+            columns[filtered_column] = lambda frame, source=column: frame[source].where(_build_mask(frame, filters))
+            column = filtered_column
+    return f"personalizado_{key}", (column, agg), columns
+
+def compile_kpi_definitions(definitions: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compila definições declarativas em entradas do registro do planejador de KPIs.
+
+    Formato de cada definição:
+        label: Rótulo exibido (padrão: nome do KPI)
+        pages: Páginas em que o KPI aparece
+        grain: 'linha', 'item' ou 'pedido' (padrão: 'linha')
+        numerator / denominator: {column, agg ou distinct, filters}
+        filters: Filtros aplicados ao numerador e ao denominador
+        format: 'number', 'integer', 'currency' ou 'percent'
+
+    Na granularidade 'pedido' só existem as colunas de GRAIN_COLUMNS['pedido'];
+    medidas e filtros com outras colunas são rejeitados aqui.
+
+    Filtros são listas de {column, op, value}. O resultado é guardado por hash da
+    definição, então recompilar o mesmo arquivo a cada rerun não tem custo.
+
+    Returns:
+        Dict nome -> entrada no formato de KPI_REGISTRY (com label, pages, format e as
+        colunas sob demanda das medidas filtradas em columns)
+    """
+    digest = definition_hash(definitions)
+    if digest in _COMPILED_CACHE:
+        return _COMPILED_CACHE[digest]
+
+    registry = {}
+    for name, definition in definitions.items():
+        grain = definition.get('grain', 'linha')
+        if grain not in GRAIN_FRAMES:
+            raise ValueError(f"KPI '{name}': granularidade '{grain}' inválida (use {', '.join(GRAIN_FRAMES)})")
+        if 'numerator' not in definition:
+            raise ValueError(f"KPI '{name}': 'numerator' é obrigatório")
+        fmt = definition.get('format', 'number')
+        if fmt not in KPI_FORMATS:
+            raise ValueError(f"KPI '{name}': formato '{fmt}' inválido (use {', '.join(KPI_FORMATS)})")
+
+        shared_filters = definition.get('filters', [])
+        numerator, numerator_agg, columns = _compile_measure(name, definition['numerator'], grain, shared_filters)
+        aggs = {numerator: numerator_agg}
+        if definition.get('denominator'):
+            denominator, denominator_agg, denominator_columns = _compile_measure(name, definition['denominator'], grain, shared_filters)
+            aggs[denominator] = denominator_agg
+            columns = {**columns, **denominator_columns}
+            formula = lambda p, params, n=numerator, d=denominator: _ratio(p[n], p[d])
+        else:
+            formula = lambda p, params, n=numerator: p[n]
+
+        registry[name] = {
+            'grain': grain, 'by': None,
+            'aggs': aggs,
+            'columns': columns,
+            'formula': formula,
+            'label': definition.get('label', name),
+            'pages': list(definition.get('pages', [])),
+            'format': fmt,
+        }
+
+    _COMPILED_CACHE[digest] = registry
+    return registry
+
+def get_custom_kpis(path: str = KPI_DEFINITIONS_PATH) -> Dict[str, Dict[str, Any]]:
+    """Carrega e compila os KPIs personalizados do arquivo de definições."""
+    return compile_kpi_definitions(load_kpi_definitions(path))
+
+def format_kpi_value(value, fmt: str = 'number') -> str:
+    """Formata o valor de um KPI personalizado ('-' quando ausente)."""
+    if value is None or pd.isna(value):
+        return "-"
+    return KPI_FORMATS[fmt](value)
@@ -0,0 +1,299 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+# Colunas derivadas calculadas uma única vez por rerun
+DERIVED_COLUMNS = {
+    'receita_liquida': lambda df: df['price'].where(df['pedido_cancelado'] == 0, 0),
+    'receita_cancelada': lambda df: df['price'].where(df['pedido_cancelado'] == 1, 0),
+    'pedido_cancelado_id': lambda df: df['order_id'].where(df['pedido_cancelado'] == 1),
+    'delivery_time': lambda df: (df['order_delivered_customer_date'] - df['order_purchase_timestamp']).dt.days,
+}
+
+# Granularidade -> intermediário que serve de base para as agregações
+GRAIN_FRAMES = {
+    'linha': 'rows',
+    'item': 'items',
+    'pedido': 'orders',
+}
+
+# Colunas do frame por pedido; 'linha' e 'item' têm todas as colunas do dataset
+# mais DERIVED_COLUMNS
+ORDER_COLUMNS = ('customer_unique_id', 'order_id', 'order_purchase_timestamp', 'order_rank', 'time_to_second')
+GRAIN_COLUMNS = {
+    'pedido': ORDER_COLUMNS,
+}
+
+# Registro declarativo de KPIs.
+# Cada KPI informa a granularidade, as chaves de agrupamento, as agregações parciais
+# (nome -> (coluna, função)) e a fórmula final sobre essas parciais. Parciais com o
+# mesmo nome são compartilhadas entre KPIs e calculadas uma única vez.
+KPI_REGISTRY = {
+    'total_revenue': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'receita': ('receita_liquida', 'sum')},
+        'formula': lambda p, params: p['receita']
+    },
+    'total_orders': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'pedidos': ('order_id', 'nunique')},
+        'formula': lambda p, params: p['pedidos']
+    },
+    'total_customers': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'clientes': ('customer_unique_id', 'nunique')},
+        'formula': lambda p, params: p['clientes']
+    },
+    'total_products': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'produtos': ('product_id', 'nunique')},
+        'formula': lambda p, params: p['produtos']
+    },
+    'unique_categories': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'categorias': ('product_category_name', 'nunique')},
+        'formula': lambda p, params: p['categorias']
+    },
+    'abandonment_rate': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'pedidos_cancelados': ('pedido_cancelado_id', 'nunique'), 'pedidos': ('order_id', 'nunique')},
+        'formula': lambda p, params: _ratio(p['pedidos_cancelados'], p['pedidos'])
+    },
+    'csat': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'nota_media': ('review_score', 'mean')},
+        'formula': lambda p, params: p['nota_media']
+    },
+    'average_ticket': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'receita': ('receita_liquida', 'sum'), 'pedidos': ('order_id', 'nunique')},
+        'formula': lambda p, params: _ratio(p['receita'], p['pedidos'])
+    },
+    'avg_delivery_time': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'tempo_entrega_medio': ('delivery_time', 'mean')},
+        'formula': lambda p, params: p['tempo_entrega_medio']
+    },
+    'cancellation_rate': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'taxa_cancelamento': ('pedido_cancelado', 'mean')},
+        'formula': lambda p, params: p['taxa_cancelamento']
+    },
+    'lost_revenue': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'receita_perdida': ('receita_cancelada', 'sum')},
+        'formula': lambda p, params: p['receita_perdida']
+    },
+    'total_new_customers': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'clientes': ('customer_unique_id', 'nunique')},
+        'formula': lambda p, params: p['clientes']
+    },
+    'cac': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'clientes': ('customer_unique_id', 'nunique')},
+        'formula': lambda p, params: _ratio(params.get('marketing_spend', 50000), p['clientes'])
+    },
+    'ltv': {
+        'grain': 'linha', 'by': None,
+        'aggs': {'receita': ('receita_liquida', 'sum'), 'clientes': ('customer_unique_id', 'nunique')},
+        'formula': lambda p, params: _ratio(p['receita'], p['clientes'])
+    },
+    'repurchase_rate': {
+        'grain': 'pedido', 'by': ['customer_unique_id'],
+        'aggs': {'pedidos_cliente': ('order_id', 'count')},
+        'formula': lambda p, params: (p['pedidos_cliente'] > 1).mean() if len(p) > 0 else 0
+    },
+    'avg_time_to_second': {
+        # Dias entre o primeiro e o segundo pedido distintos de cada cliente
+        'grain': 'pedido', 'by': ['customer_unique_id'],
+        'aggs': {'dias_ate_segunda': ('time_to_second', 'max')},
+        'formula': lambda p, params: _positive_mean(p['dias_ate_segunda'])
+    },
+}
+
+# KPIs exibidos por cada página do dashboard
+PAGE_KPIS = {
+    'Visão Geral': [
+        'total_revenue', 'total_orders', 'total_customers', 'csat', 'avg_delivery_time',
+        'cancellation_rate', 'abandonment_rate', 'lost_revenue', 'average_ticket'
+    ],
+    'Aquisição e Retenção': [
+        'total_new_customers', 'repurchase_rate', 'avg_time_to_second', 'cac', 'ltv'
+    ],
+    'Comportamento do Cliente': [
+        'abandonment_rate', 'csat', 'repurchase_rate', 'avg_delivery_time',
+        'avg_time_to_second', 'average_ticket'
+    ],
+    'Produtos e Categorias': [
+        'total_revenue', 'total_orders', 'total_customers', 'average_ticket'
+    ],
+    'Análise Estratégica': [
+        'total_revenue', 'average_ticket', 'total_customers'
+    ],
+}
+
+def _ratio(numerator, denominator):
+    """Divisão segura usada pelas fórmulas dos KPIs."""
+    return numerator / denominator if denominator and denominator > 0 else 0
+
+def _positive_mean(values: pd.Series) -> float:
+    """Média apenas dos valores positivos (0 quando não há valores)."""
+    values = values.dropna()
+    values = values[values > 0]
+    return values.mean() if not values.empty else 0
+
+def _build_rows(ctx: 'RerunContext') -> pd.DataFrame:
+    """Frame por linha com datas convertidas e colunas derivadas."""
+    frame = ctx.get('frame')
+    return frame.assign(**{name: fn(frame) for name, fn in DERIVED_COLUMNS.items()})
+
+def _build_items(ctx: 'RerunContext') -> pd.DataFrame:
+    """Frame por item do pedido (remove a repetição causada por múltiplos pagamentos)."""
+    return ctx.get('rows').drop_duplicates(['order_id', 'order_item_id'])
+
+def _build_orders(ctx: 'RerunContext') -> pd.DataFrame:
+    """Frame por pedido com a posição de cada pedido na história do cliente."""
+    frame = ctx.get('frame')
+    orders = (
+        frame[['customer_unique_id', 'order_id', 'order_purchase_timestamp']]
+        .drop_duplicates(['customer_unique_id', 'order_id'])
+        .sort_values(['customer_unique_id', 'order_purchase_timestamp'], kind='mergesort')
+    )
+    by_customer = orders.groupby('customer_unique_id', sort=False)['order_purchase_timestamp']
+    order_rank = by_customer.cumcount()
+    days_since_first = (orders['order_purchase_timestamp'] - by_customer.transform('min')).dt.days
+    return orders.assign(
+        order_rank=order_rank,
+        time_to_second=days_since_first.where(order_rank == 1)
+    )[list(ORDER_COLUMNS)]
+
+# Intermediários compartilhados entre KPIs (e entre funções da página)
+INTERMEDIATES = {
+    'rows': _build_rows,
+    'items': _build_items,
+    'orders': _build_orders,
+}
+
+class RerunContext:
+    """
+    Memoiza intermediários compartilhados dentro de um rerun do Streamlit.
+
+    O DataFrame recebido não é alterado: as conversões de data são feitas uma
+    única vez em uma cópia, disponível em `frame` para as demais funções da página.
+    """
+
+    def __init__(self, df: pd.DataFrame, params: Optional[Dict[str, Any]] = None):
+        self.params = params or {}
+        self._cache = {}
+        self._cache['frame'] = df.assign(
+            order_purchase_timestamp=pd.to_datetime(df['order_purchase_timestamp']),
+            order_delivered_customer_date=pd.to_datetime(df['order_delivered_customer_date'])
+        )
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """DataFrame do rerun com as colunas de data já convertidas."""
+        return self._cache['frame']
+
+    def get(self, name: str, builder: Optional[Callable[['RerunContext'], Any]] = None) -> Any:
+        """Retorna o intermediário `name`, calculando-o apenas na primeira chamada."""
+        if name not in self._cache:
+            builder = builder or INTERMEDIATES[name]
+            self._cache[name] = builder(self)
+        return self._cache[name]
+
+def plan_kpis(kpi_names: List[str], registry: Dict[str, Dict[str, Any]] = None) -> Dict[Tuple[str, Tuple[str, ...]], Dict[str, Tuple[str, str]]]:
+    """
+    Agrupa os KPIs por granularidade e chaves de agrupamento.
+
+    Args:
+        kpi_names: Nomes dos KPIs solicitados
+        registry: Registro de KPIs (padrão: KPI_REGISTRY)
+
+    Returns:
+        Dict (granularidade, chaves) -> agregações parciais a executar em uma passada
+    """
+    registry = registry or KPI_REGISTRY
+    plan = {}
+    for name in kpi_names:
+        spec = registry[name]
+        key = (spec['grain'], tuple(spec.get('by') or ()))
+        aggs = plan.setdefault(key, {})
+        for partial, definition in spec['aggs'].items():
+            if partial in aggs and aggs[partial] != tuple(definition):
+                raise ValueError(f"Agregação parcial '{partial}' definida de formas diferentes")
+            aggs[partial] = tuple(definition)
+    return plan
+
+def execute_plan(ctx: RerunContext, plan: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Tuple[str, str]]],
+                 columns: Optional[Dict[str, Callable[[pd.DataFrame], pd.Series]]] = None) -> Dict[Tuple[str, Tuple[str, ...]], Any]:
+    """
+    Executa cada grupo do plano com um único groupby.
+
+    Args:
+        ctx: Contexto do rerun
+        plan: Resultado de plan_kpis
+        columns: Colunas sob demanda (nome -> função do frame), como as medidas filtradas
+            de KPIs personalizados; entram no frame da granularidade apenas quando
+            alguma agregação do grupo as usa
+
+    Returns:
+        Dict (granularidade, chaves) -> dict de parciais (sem chaves) ou DataFrame (com chaves)
+    """
+    columns = columns or {}
+    results = {}
+    for (grain, by), aggs in plan.items():
+        frame = ctx.get(GRAIN_FRAMES[grain])
+        on_demand = sorted({column for column, _ in aggs.values() if column not in frame.columns and column in columns})
+        if on_demand:
+            frame = frame.assign(**{column: columns[column](frame) for column in on_demand})
+        named_aggs = {name: pd.NamedAgg(column=column, aggfunc=func) for name, (column, func) in aggs.items()}
+        if by:
+            results[(grain, by)] = frame.groupby(list(by), sort=False).agg(**named_aggs)
+        else:
+            row = frame.groupby(np.zeros(len(frame), dtype=int)).agg(**named_aggs).reindex([0])
+            partials = {name: row[name].iloc[0] for name in aggs}
+            for name, (_, func) in aggs.items():
+                if func in ('sum', 'count', 'nunique', 'size') and pd.isna(partials[name]):
+                    partials[name] = 0
+            results[(grain, by)] = partials
+    return results
+
+def compute_kpis(ctx: RerunContext, kpi_names: List[str], registry: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Calcula um conjunto de KPIs com o menor número possível de passadas.
+
+    Args:
+        ctx: Contexto do rerun com os intermediários memoizados
+        kpi_names: Nomes dos KPIs a calcular
+        registry: Registro de KPIs (padrão: KPI_REGISTRY)
+
+    Returns:
+        Dict com o valor de cada KPI
+    """
+    registry = registry or KPI_REGISTRY
+    plan = plan_kpis(kpi_names, registry)
+    columns = {column: fn for name in kpi_names for column, fn in registry[name].get('columns', {}).items()}
+    partials = ctx.get(('partials', tuple(sorted(kpi_names))), lambda c: execute_plan(c, plan, columns))
+    kpis = {}
+    for name in kpi_names:
+        spec = registry[name]
+        key = (spec['grain'], tuple(spec.get('by') or ()))
+        kpis[name] = spec['formula'](partials[key], ctx.params)
+    return kpis
+
+def compute_page_kpis(page: str, ctx: RerunContext, custom_registry: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Calcula todos os KPIs declarados para a página em PAGE_KPIS.
+
+    Args:
+        page: Nome da página
+        ctx: Contexto do rerun
+        custom_registry: KPIs personalizados compilados (ver utils.kpi_definitions); os
+            que listam a página em 'pages' entram no mesmo plano dos KPIs padrão
+    """
+    if not custom_registry:
+        return compute_kpis(ctx, PAGE_KPIS[page])
+    custom_names = [name for name, spec in custom_registry.items() if page in spec.get('pages', ())]
+    return compute_kpis(ctx, PAGE_KPIS[page] + custom_names, {**KPI_REGISTRY, **custom_registry})
@@ -1,35 +1,54 @@
 import pandas as pd
 import numpy as np
+import streamlit as st
 import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from nltk.corpus import stopwords, wordnet
 from nltk.stem import WordNetLemmatizer
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from sklearn.decomposition import LatentDirichletAllocation, NMF
+from cachetools import LRUCache
+from io import BytesIO
 import re
 import os
+import threading
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from utils.topics import train_topic_models, summarize_topics
+from utils.term_frequency import TermFrequencyIndex
+from utils.sentiment import score_reviews
 
-# Download required NLTK data if not already downloaded
-def download_nltk_data():
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords')
-    
-    try:
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        nltk.download('wordnet')
+# NLTK resources are loaded from the project's bundled directory, never downloaded at import
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data")
+if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
 
-# Download NLTK data
-download_nltk_data()
+# Resources used by the module: path inside nltk_data -> package name
+NLTK_RESOURCES = {
+    'corpora/stopwords': 'stopwords',
+    'corpora/wordnet': 'wordnet',
+}
+
+def download_nltk_data(download_dir=NLTK_DATA_DIR):
+    """Download the missing NLTK resources into the bundled directory (needs network access)."""
+    for resource, package in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource, paths=[download_dir])
+        except LookupError:
+            nltk.download(package, download_dir=download_dir, quiet=True)
+
+@lru_cache(maxsize=1)
+def ensure_nltk_resources():
+    """Check once per process that the NLTK resources are available, without downloading."""
+    missing = []
+    for resource in NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(resource)
+    if missing:
+        raise LookupError(
+            f"NLTK resources not found: {', '.join(missing)}. "
+            f"Run `python download_nltk_data.py` to bundle them in {NLTK_DATA_DIR}."
+        )
 
 # Custom Portuguese stop words for e-commerce context
 CUSTOM_STOP_WORDS = {
@@ -38,161 +57,312 @@ CUSTOM_STOP_WORDS = {
     'site', 'contato', 'pedido', 'veio', 'foi', 'ser', 'estar', 'ter'
 }
 
+# Precompiled pattern: drop everything except letters (with Portuguese accents) and whitespace
+NON_LETTER_PATTERN = re.compile(r'[^a-záéíóúâêîôûãõçà\s]')
+
+# Number of reviews sent to each worker by preprocess_texts
+PREPROCESS_CHUNK_SIZE = 2000
+
+# NLTK's lazy corpus loaders are not thread-safe; the background warmup and a
+# request thread must not trigger the first load at the same time
+_NLTK_LOAD_LOCK = threading.Lock()
+
+@lru_cache(maxsize=1)
+def get_stop_words():
+    """Frozen set of Portuguese + custom stop words, built once per process."""
+    ensure_nltk_resources()
+    with _NLTK_LOAD_LOCK:
+        return frozenset(stopwords.words('portuguese')).union(CUSTOM_STOP_WORDS)
+
+@lru_cache(maxsize=1)
+def get_lemmatizer():
+    """Shared WordNet lemmatizer, created once per process (WordNet is loaded here)."""
+    ensure_nltk_resources()
+    with _NLTK_LOAD_LOCK:
+        wordnet.ensure_loaded()
+    return WordNetLemmatizer()
+
+@lru_cache(maxsize=None)
+def lemmatize_token(token):
+    """Lemmatize a token, memoized since the review vocabulary is small and repetitive."""
+    return get_lemmatizer().lemmatize(token)
+
+# Text polarity below -threshold / above threshold counts as negative / positive
+POLARITY_THRESHOLD = 0.3
+
+def normalize_words(text):
+    """Lowercase a review and split it into words, keeping stop words."""
+    if not isinstance(text, str):
+        return []
+    # Only letters and whitespace remain, so a whitespace split matches word_tokenize
+    return NON_LETTER_PATTERN.sub('', text.lower()).split()
+
+def warm_up_nlp():
+    """Load stop words and WordNet ahead of the first request."""
+    get_stop_words()
+    get_lemmatizer()
+
+def tokenize_text(text):
+    """Normalize a single review into a list of tokens."""
+    stop_words = get_stop_words()
+    return [lemmatize_token(token) for token in normalize_words(text) if token not in stop_words]
+
 def preprocess_text(text):
     """Preprocess text for NLP analysis."""
-    if not isinstance(text, str):
-        return ""
-    
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove special characters and numbers, but keep letters with accents
-    text = re.sub(r'[^a-záéíóúâêîôûãõçà\s]', '', text)
-    
-    # Tokenize
-    tokens = word_tokenize(text)
-    
-    # Remove stopwords (Portuguese + custom)
-    stop_words = set(stopwords.words('portuguese')).union(CUSTOM_STOP_WORDS)
-    tokens = [token for token in tokens if token not in stop_words]
-    
-    # Lemmatize
-    lemmatizer = WordNetLemmatizer()
-    tokens = [lemmatizer.lemmatize(token) for token in tokens]
-    
-    return ' '.join(tokens)
+    return ' '.join(tokenize_text(text))
+
+def _tokenize_chunk(texts):
+    """Tokenize a chunk of reviews (runs inside the worker processes)."""
+    return [tokenize_text(text) for text in texts]
+
+def preprocess_texts(texts, n_jobs=1, chunk_size=PREPROCESS_CHUNK_SIZE):
+    """
+    Tokenize a batch of reviews and return one token list per review.
+
+    With n_jobs > 1 the reviews are split into chunks and dispatched to a process
+    pool; each worker builds its stop word set and lemmatizer cache only once.
+    """
+    texts = list(texts)
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    if n_jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_tokenize_chunk, chunks))
+    else:
+        results = [_tokenize_chunk(chunk) for chunk in chunks]
+    return [tokens for chunk in results for tokens in chunk]
+
+# Pre-tokenized review corpus written by the ETL (JuntandoTabelas.py)
+REVIEW_CORPUS_PATH = "olist_review_corpus.parquet"
+REVIEW_CORPUS_COLUMNS = [
+    'review_id', 'order_id', 'review_score', 'date', 'review_creation_date', 'product_category_name',
+    'product_id', 'seller_id', 'review_comment_message', 'tokens', 'polarity'
+]
+
+def build_review_corpus(df, n_jobs=1):
+    """
+    Build the review corpus: one row per review_id with its tokens, text polarity,
+    score and dates.
+
+    The merged frame repeats each review once per item and payment, so reviews are
+    deduplicated before tokenizing. Reviews shared by several orders keep the first one.
+    """
+    reviews = (
+        df[df['review_id'].notna()]
+        .sort_values(['review_id', 'order_id', 'order_item_id'])
+        .drop_duplicates('review_id')
+    )
+    corpus = pd.DataFrame({
+        'review_id': reviews['review_id'].to_numpy(),
+        'order_id': reviews['order_id'].to_numpy(),
+        'review_score': reviews['review_score'].to_numpy(),
+        'date': pd.to_datetime(reviews['order_purchase_timestamp']).dt.normalize().to_numpy(),
+        'review_creation_date': pd.to_datetime(reviews['review_creation_date']).to_numpy(),
+        'product_category_name': reviews['product_category_name'].to_numpy(),
+        'product_id': reviews['product_id'].to_numpy(),
+        'seller_id': reviews['seller_id'].to_numpy(),
+        'review_comment_message': reviews['review_comment_message'].to_numpy(),
+    })
+    # Only reviews with a comment carry tokens
+    with_text = np.flatnonzero(corpus['review_comment_message'].notna().to_numpy())
+    tokens = [[] for _ in range(len(corpus))]
+    for position, review_tokens in zip(with_text, preprocess_texts(corpus['review_comment_message'].iloc[with_text], n_jobs)):
+        tokens[position] = review_tokens
+    corpus['tokens'] = tokens
+    corpus['polarity'] = review_polarity(corpus['review_comment_message'])
+    return corpus
+
+def review_polarity(messages):
+    """Lexicon polarity of each review text (NaN for reviews without a comment)."""
+    messages = pd.Series(messages)
+    polarity = np.full(len(messages), np.nan)
+    with_text = np.flatnonzero(messages.notna().to_numpy())
+    polarity[with_text] = score_reviews([normalize_words(text) for text in messages.iloc[with_text]])
+    return polarity
+
+@st.cache_data
+def load_review_corpus(_df, data_version):
+    """Load the ETL review corpus, rebuilding it when missing or older than the merged dataset."""
+    data_path = "olist_merged_data.parquet"
+    if os.path.exists(REVIEW_CORPUS_PATH) and (
+        not os.path.exists(data_path) or os.path.getmtime(REVIEW_CORPUS_PATH) >= os.path.getmtime(data_path)
+    ):
+        corpus = pd.read_parquet(REVIEW_CORPUS_PATH)
+        # Artifacts from older ETL versions lack some columns and are rebuilt
+        if set(REVIEW_CORPUS_COLUMNS).issubset(corpus.columns):
+            return corpus
+    return build_review_corpus(_df)
+
+def select_reviews(corpus, review_ids=None, date_range=None):
+    """Select corpus reviews by id and/or purchase date range without re-tokenizing."""
+    mask = np.ones(len(corpus), dtype=bool)
+    if review_ids is not None:
+        mask &= corpus['review_id'].isin(pd.unique(pd.Series(review_ids).dropna())).to_numpy()
+    if date_range:
+        mask &= (corpus['date'] >= pd.to_datetime(date_range[0]).normalize()).to_numpy()
+        mask &= (corpus['date'] <= pd.to_datetime(date_range[1])).to_numpy()
+    return corpus[mask]
 
-def generate_wordcloud(text, title, background_color='white'):
-    """Generate and return a wordcloud figure."""
+# Rendered wordclouds (PNG bytes) kept per (data version, filters, sentiment)
+WORDCLOUD_MAX_WORDS = 100
+WORDCLOUD_CACHE_SIZE = 64
+_WORDCLOUD_CACHE = LRUCache(maxsize=WORDCLOUD_CACHE_SIZE)
+
+def generate_wordcloud(frequencies, background_color='white', cache_key=None):
+    """
+    Render a wordcloud from a term -> count mapping and return it as PNG bytes.
+
+    Words come straight from the frequency table, so nothing is re-tokenized.
+    Images are cached (LRU) under `cache_key` when one is given; returns None
+    when there are no words.
+    """
+    if cache_key is not None and cache_key in _WORDCLOUD_CACHE:
+        return _WORDCLOUD_CACHE[cache_key]
+    frequencies = {word: count for word, count in dict(frequencies).items() if count > 0}
+    if not frequencies:
+        return None
     wordcloud = WordCloud(
         width=800,
         height=400,
         background_color=background_color,
-        max_words=100,
+        max_words=WORDCLOUD_MAX_WORDS,
         contour_width=3,
         contour_color='steelblue'
-    ).generate(text)
-    
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis('off')
-    ax.set_title(title)
-    return fig
-
-def extract_topics(text, n_topics=3, n_words=10, method='lda'):
-    """Extract topics using either LDA or NMF."""
-    # Create document-term matrix using CountVectorizer instead of TfidfVectorizer
-    # This is more suitable for our single-document case
-    vectorizer = CountVectorizer(
-        max_features=1000,
-        stop_words=list(CUSTOM_STOP_WORDS)
-    )
-    dtm = vectorizer.fit_transform([text])
-    
-    # Choose topic modeling method
-    if method == 'lda':
-        model = LatentDirichletAllocation(
-            n_components=n_topics,
-            random_state=42,
-            max_iter=10
-        )
-    else:  # NMF
-        model = NMF(
-            n_components=n_topics,
-            random_state=42,
-            max_iter=200
-        )
-    
-    # Fit model and extract topics
-    model.fit(dtm)
-    feature_names = vectorizer.get_feature_names_out()
-    topics = []
-    
-    for topic_idx, topic in enumerate(model.components_):
-        top_words_idx = topic.argsort()[:-n_words-1:-1]
-        top_words = [feature_names[i] for i in top_words_idx]
-        topics.append(f"Tópico {topic_idx + 1}: {', '.join(top_words)}")
+    ).generate_from_frequencies(frequencies)
     
-    return topics
+    buffer = BytesIO()
+    wordcloud.to_image().save(buffer, format='PNG')
+    image = buffer.getvalue()
+    if cache_key is not None:
+        _WORDCLOUD_CACHE[cache_key] = image
+    return image
 
-def analyze_sentiment_patterns(reviews):
-    """Analyze patterns in reviews to identify common sentiments."""
-    # Define sentiment patterns
-    positive_patterns = {
-        'qualidade': r'(boa|ótima|excelente)\s+qualidade',
-        'entrega': r'(entrega\s+rápida|chegou\s+antes)',
-        'recomendação': r'(recomendo|voltarei\s+a\s+comprar)',
-        'satisfação': r'(muito\s+satisfeito|adorei|gostei\s+muito)',
-        'preço': r'(bom\s+preço|preço\s+justo|custo\s+benefício)'
-    }
-    
-    negative_patterns = {
-        'atraso': r'(atrasado|não\s+chegou|demora)',
-        'qualidade': r'(má\s+qualidade|péssimo|ruim)',
-        'problema': r'(defeito|problema|quebrado)',
-        'atendimento': r'(péssimo\s+atendimento|sem\s+resposta)',
-        'preço': r'(caro|não\s+vale|preço\s+alto)'
+# Aspect patterns per polarity: category -> regex (non-capturing groups only)
+SENTIMENT_PATTERNS = {
+    'positive': {
+        'qualidade': r'(?:boa|ótima|excelente)\s+qualidade',
+        'entrega': r'(?:entrega\s+rápida|chegou\s+antes)',
+        'recomendação': r'(?:recomendo|voltarei\s+a\s+comprar)',
+        'satisfação': r'(?:muito\s+satisfeito|adorei|gostei\s+muito)',
+        'preço': r'(?:bom\s+preço|preço\s+justo|custo\s+benefício)'
+    },
+    'negative': {
+        'atraso': r'(?:atrasado|não\s+chegou|demora)',
+        'qualidade': r'(?:má\s+qualidade|péssimo|ruim)',
+        'problema': r'(?:defeito|problema|quebrado)',
+        'atendimento': r'(?:péssimo\s+atendimento|sem\s+resposta)',
+        'preço': r'(?:caro|não\s+vale|preço\s+alto)'
     }
-    
-    patterns_found = {
-        'positive': {k: 0 for k in positive_patterns},
-        'negative': {k: 0 for k in negative_patterns}
+}
+
+def build_pattern_matcher(patterns=SENTIMENT_PATTERNS):
+    """
+    Compile the aspect patterns once.
+
+    Returns a single alternation of all patterns, used to discard reviews that match
+    nothing in one pass, the compiled pattern of each (polarity, category) column,
+    and the column index of the match matrix.
+    """
+    columns = [(polarity, category) for polarity, categories in patterns.items() for category in categories]
+    combined = re.compile('|'.join(patterns[polarity][category] for polarity, category in columns))
+    compiled = [re.compile(patterns[polarity][category]) for polarity, category in columns]
+    return combined, compiled, pd.MultiIndex.from_tuples(columns, names=['polarity', 'category'])
+
+SENTIMENT_PATTERN_ANY, SENTIMENT_PATTERN_REGEXES, SENTIMENT_PATTERN_COLUMNS = build_pattern_matcher()
+
+def match_sentiment_patterns(reviews):
+    """
+    Match every aspect pattern against every review, vectorized over the column.
+
+    Returns a boolean DataFrame (review x (polarity, category)) aligned with `reviews`,
+    which can be aggregated by any grouping of the reviews.
+    """
+    reviews = pd.Series(reviews, dtype=object)
+    rows = np.flatnonzero(reviews.map(lambda review: isinstance(review, str)).to_numpy())
+    texts = pd.Series(reviews.to_numpy()[rows], dtype=object).str.lower()
+    # Only reviews matching the combined alternation are tested pattern by pattern
+    candidates = texts.str.contains(SENTIMENT_PATTERN_ANY).to_numpy()
+    rows, texts = rows[candidates], texts[candidates]
+    matches = np.zeros((len(reviews), len(SENTIMENT_PATTERN_COLUMNS)), dtype=bool)
+    for column, pattern in enumerate(SENTIMENT_PATTERN_REGEXES):
+        matches[rows, column] = texts.str.contains(pattern).to_numpy()
+    return pd.DataFrame(matches, index=reviews.index, columns=SENTIMENT_PATTERN_COLUMNS)
+
+def pattern_counts(matches):
+    """Convert the summed matches of a set of reviews into {polarity: {category: count}}."""
+    counts = matches.sum(axis=0)
+    return {
+        polarity: {category: int(counts[(polarity, category)]) for category in categories}
+        for polarity, categories in SENTIMENT_PATTERNS.items()
     }
-    
-    # Count pattern occurrences
-    for review in reviews:
-        if isinstance(review, str):
-            review = review.lower()
-            for category, pattern in positive_patterns.items():
-                if re.search(pattern, review):
-                    patterns_found['positive'][category] += 1
-            
-            for category, pattern in negative_patterns.items():
-                if re.search(pattern, review):
-                    patterns_found['negative'][category] += 1
-    
-    return patterns_found
 
-def analyze_reviews(df):
-    """Analyze customer reviews and return insights."""
-    # Separate positive, neutral and negative reviews
-    positive_reviews = df[df['review_score'] >= 4]['review_comment_message'].dropna()
-    neutral_reviews = df[df['review_score'] == 3]['review_comment_message'].dropna()
-    negative_reviews = df[df['review_score'] <= 2]['review_comment_message'].dropna()
-    
-    # Preprocess reviews
-    positive_text = ' '.join(positive_reviews.apply(preprocess_text))
-    neutral_text = ' '.join(neutral_reviews.apply(preprocess_text))
-    negative_text = ' '.join(negative_reviews.apply(preprocess_text))
+def analyze_sentiment_patterns(reviews):
+    """Analyze patterns in reviews to identify common sentiments."""
+    return pattern_counts(match_sentiment_patterns(reviews))
+
+def analyze_reviews(df, n_jobs=1, corpus=None, topic_models=None, term_index=None, date_range=None,
+                    cache_key=None):
+    """
+    Analyze customer reviews and return insights.
+
+    Each review is counted once (by review_id). When the pre-tokenized corpus is
+    given, the reviews of `df` are selected from it instead of being tokenized again.
+    Topics come from per-review models (see utils.topics); without `topic_models`
+    they are trained on the selected reviews. Word frequencies come from
+    `term_index` restricted to `date_range` (see utils.term_frequency), or from an
+    index over the selected reviews when it is not given. Wordclouds are PNG
+    bytes, cached per sentiment under `cache_key` (e.g. data version and filters).
+    """
+    if corpus is not None:
+        reviews = select_reviews(corpus, review_ids=df['review_id'])
+    else:
+        reviews = build_review_corpus(df, n_jobs)
+    reviews = reviews[reviews['review_comment_message'].notna()]
     
-    # Generate wordclouds with different colors
-    positive_wordcloud = generate_wordcloud(positive_text, "Palavras mais frequentes em avaliações positivas", 'white')
-    neutral_wordcloud = generate_wordcloud(neutral_text, "Palavras mais frequentes em avaliações neutras", '#f0f0f0')
-    negative_wordcloud = generate_wordcloud(negative_text, "Palavras mais frequentes em avaliações negativas", '#ffeded')
+    # Separate positive, neutral and negative reviews
+    positive = reviews[reviews['review_score'] >= 4]
+    neutral = reviews[reviews['review_score'] == 3]
+    negative = reviews[reviews['review_score'] <= 2]
+    positive_reviews = positive['review_comment_message']
+    neutral_reviews = neutral['review_comment_message']
+    negative_reviews = negative['review_comment_message']
     
     # Calculate word frequencies
-    def get_word_frequencies(text):
-        words = text.split()
-        freq = pd.Series(words).value_counts().head(20)
-        return freq
+    if term_index is None:
+        term_index, date_range = TermFrequencyIndex(reviews), None
     
-    positive_freq = get_word_frequencies(positive_text)
-    neutral_freq = get_word_frequencies(neutral_text)
-    negative_freq = get_word_frequencies(negative_text)
+    def wordcloud_for(sentiment, background_color):
+        frequencies = term_index.top_terms(WORDCLOUD_MAX_WORDS, date_range, sentiments=[sentiment])
+        return generate_wordcloud(frequencies, background_color, None if cache_key is None else (cache_key, sentiment))
+    
+    # Generate wordclouds with different colors
+    positive_wordcloud = wordcloud_for('positive', 'white')
+    neutral_wordcloud = wordcloud_for('neutral', '#f0f0f0')
+    negative_wordcloud = wordcloud_for('negative', '#ffeded')
     
-    # Extract topics using both LDA and NMF
-    positive_topics_lda = extract_topics(positive_text, method='lda')
-    neutral_topics_lda = extract_topics(neutral_text, method='lda')
-    negative_topics_lda = extract_topics(negative_text, method='lda')
+    positive_freq = term_index.top_terms(20, date_range, sentiments=['positive'])
+    neutral_freq = term_index.top_terms(20, date_range, sentiments=['neutral'])
+    negative_freq = term_index.top_terms(20, date_range, sentiments=['negative'])
     
-    positive_topics_nmf = extract_topics(positive_text, method='nmf')
-    neutral_topics_nmf = extract_topics(neutral_text, method='nmf')
-    negative_topics_nmf = extract_topics(negative_text, method='nmf')
+    # Topic shares of each sentiment, using both LDA and NMF
+    if topic_models is None and len(reviews) > 0:
+        topic_models = train_topic_models(reviews['tokens'], reviews['review_id'])
+    if topic_models is None:
+        positive_topics_lda = neutral_topics_lda = negative_topics_lda = []
+        positive_topics_nmf = neutral_topics_nmf = negative_topics_nmf = []
+    else:
+        positive_topics_lda = summarize_topics(topic_models, positive, method='lda')
+        neutral_topics_lda = summarize_topics(topic_models, neutral, method='lda')
+        negative_topics_lda = summarize_topics(topic_models, negative, method='lda')
+        
+        positive_topics_nmf = summarize_topics(topic_models, positive, method='nmf')
+        neutral_topics_nmf = summarize_topics(topic_models, neutral, method='nmf')
+        negative_topics_nmf = summarize_topics(topic_models, negative, method='nmf')
     
-    # Analyze sentiment patterns
-    positive_patterns = analyze_sentiment_patterns(positive_reviews)
-    neutral_patterns = analyze_sentiment_patterns(neutral_reviews)
-    negative_patterns = analyze_sentiment_patterns(negative_reviews)
+    # Analyze sentiment patterns: one pass over all reviews, then aggregate per bucket
+    matches = match_sentiment_patterns(reviews['review_comment_message'])
+    positive_patterns = pattern_counts(matches.loc[positive.index])
+    neutral_patterns = pattern_counts(matches.loc[neutral.index])
+    negative_patterns = pattern_counts(matches.loc[negative.index])
     
     # Calculate additional metrics
     sentiment_metrics = {
@@ -202,6 +372,12 @@ def analyze_reviews(df):
         'positive_count': len(positive_reviews),
         'neutral_count': len(neutral_reviews),
         'negative_count': len(negative_reviews),
+        'avg_positive_polarity': positive['polarity'].mean(),
+        'avg_neutral_polarity': neutral['polarity'].mean(),
+        'avg_negative_polarity': negative['polarity'].mean(),
+        # High scores whose text reads negative, and low scores whose text reads positive
+        'positive_score_negative_text': int((positive['polarity'] < -POLARITY_THRESHOLD).sum()),
+        'negative_score_positive_text': int((negative['polarity'] > POLARITY_THRESHOLD).sum()),
     }
     
     return {
@@ -0,0 +1,133 @@
+import os
+import json
+from io import StringIO
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, Any, Optional
+from utils.KPIs import (
+    calculate_kpis, calculate_acquisition_retention_kpis, filter_by_date_range,
+    get_standard_date_range, STANDARD_PERIODS
+)
+from utils.insights import generate_overview_insights
+from utils.kpi_planner import RerunContext, compute_page_kpis
+from utils.bootstrap import prepare_order_arrays, bootstrap_confidence_intervals, DEFAULT_RESAMPLES
+
+PRECOMPUTED_DIR = "precomputed"
+MANIFEST_NAME = "manifest.json"
+# Incrementar quando o formato do payload mudar (artefatos antigos deixam de ser usados)
+SCHEMA_VERSION = 1
+DEFAULT_MARKETING_SPEND = 50000
+
+def artifact_dir(data_version: str, base_dir: str = PRECOMPUTED_DIR) -> str:
+    """Diretório do artefato de uma versão do dataset."""
+    return os.path.join(base_dir, data_version)
+
+def period_slug(periodo: str) -> str:
+    """Nome de arquivo estável para um período padrão."""
+    return f"periodo_{list(STANDARD_PERIODS).index(periodo)}"
+
+def compute_period_payload(df: pd.DataFrame, periodo: str, max_date, marketing_spend: float = DEFAULT_MARKETING_SPEND) -> Dict[str, Any]:
+    """
+    Calcula os dados de todas as páginas para um período padrão.
+
+    Args:
+        df: DataFrame consolidado do Olist
+        periodo: Chave de STANDARD_PERIODS
+        max_date: Data mais recente do dataset (referência dos períodos)
+        marketing_spend: Gasto com marketing usado nos KPIs de aquisição
+
+    Returns:
+        Dict com kpis, acquisition_kpis, overview_insights, customer_kpis e bootstrap
+    """
+    date_range = get_standard_date_range(periodo, max_date)
+    filtered_df = filter_by_date_range(df, date_range)
+    rerun_context = RerunContext(filtered_df, params={'marketing_spend': marketing_spend})
+    return {
+        'kpis': calculate_kpis(filtered_df, marketing_spend, date_range),
+        'acquisition_kpis': calculate_acquisition_retention_kpis(filtered_df.copy(), marketing_spend, date_range),
+        'overview_insights': generate_overview_insights(filtered_df),
+        'customer_kpis': compute_page_kpis("Comportamento do Cliente", rerun_context),
+        'bootstrap': bootstrap_confidence_intervals(prepare_order_arrays(filtered_df), DEFAULT_RESAMPLES),
+    }
+
+def encode_payload(obj):
+    """Converte o payload em estruturas serializáveis em JSON (DataFrames em formato 'split')."""
+    if isinstance(obj, pd.DataFrame):
+        return {'__dataframe__': obj.to_json(orient='split', date_format='iso')}
+    if isinstance(obj, pd.Series):
+        return {'__series__': obj.to_json(orient='split', date_format='iso')}
+    if isinstance(obj, dict):
+        return {str(key): encode_payload(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [encode_payload(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
+
+def decode_payload(obj):
+    """Operação inversa de encode_payload."""
+    if isinstance(obj, dict):
+        if '__dataframe__' in obj:
+            return pd.read_json(StringIO(obj['__dataframe__']), orient='split', convert_dates=False)
+        if '__series__' in obj:
+            return pd.read_json(StringIO(obj['__series__']), orient='split', typ='series', convert_dates=False)
+        return {key: decode_payload(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [decode_payload(value) for value in obj]
+    return np.nan if obj is None else obj
+
+def write_artifact(payloads: Dict[str, Dict[str, Any]], data_version: str, max_date, marketing_spend: float,
+                   base_dir: str = PRECOMPUTED_DIR) -> str:
+    """
+    Grava um arquivo JSON por período e o manifesto do artefato.
+
+    O manifesto é gravado por último, então um artefato incompleto nunca é lido.
+
+    Returns:
+        Caminho do diretório do artefato
+    """
+    directory = artifact_dir(data_version, base_dir)
+    os.makedirs(directory, exist_ok=True)
+    periods = {}
+    for periodo, payload in payloads.items():
+        filename = f"{period_slug(periodo)}.json"
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            json.dump(encode_payload(payload), f, ensure_ascii=False)
+        periods[periodo] = filename
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'data_version': data_version,
+        'max_date': pd.Timestamp(max_date).isoformat(),
+        'marketing_spend': marketing_spend,
+        'created_at': pd.Timestamp.now().isoformat(),
+        'periods': periods,
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return directory
+
+@st.cache_data
+def load_precomputed(data_version: str, periodo: str, marketing_spend: float,
+                     base_dir: str = PRECOMPUTED_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Carrega o payload pré-calculado de um período padrão.
+
+    Returns:
+        Payload de compute_period_payload, ou None quando não há artefato para a
+        versão do dataset, o período não é padrão ou o gasto com marketing difere
+        do usado no pré-cálculo (o chamador deve calcular ao vivo)
+    """
+    manifest_path = os.path.join(artifact_dir(data_version, base_dir), MANIFEST_NAME)
+    if periodo not in STANDARD_PERIODS or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if (manifest.get('schema_version') != SCHEMA_VERSION or periodo not in manifest['periods']
+            or manifest['marketing_spend'] != marketing_spend):
+        return None
+    with open(os.path.join(artifact_dir(data_version, base_dir), manifest['periods'][periodo]), encoding='utf-8') as f:
+        return decode_payload(json.load(f))
@@ -0,0 +1,153 @@
+import os
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import List, Optional, Tuple
+
+SKETCHES_PATH = "olist_quantile_sketches.parquet"
+
+# Erro relativo máximo dos quantis estimados (1%)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+
+# Bucket reservado para valores <= 0 (ex.: entregas no mesmo dia)
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+SKETCH_DIMS = ['date', 'customer_state', 'product_category_name']
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+def value_to_bucket(values: np.ndarray) -> np.ndarray:
+    """Mapeia valores para buckets logarítmicos de razão GAMMA."""
+    values = np.asarray(values, dtype=float)
+    buckets = np.full(values.shape, ZERO_BUCKET, dtype=np.int32)
+    positive = values > 0
+    buckets[positive] = np.ceil(np.log(values[positive]) / LOG_GAMMA).astype(np.int32)
+    return buckets
+
+def bucket_to_value(buckets: np.ndarray) -> np.ndarray:
+    """Valor representativo de cada bucket (erro relativo <= RELATIVE_ACCURACY)."""
+    buckets = np.asarray(buckets)
+    values = np.zeros(buckets.shape, dtype=float)
+    positive = buckets != ZERO_BUCKET
+    values[positive] = 2 * GAMMA ** buckets[positive].astype(float) / (GAMMA + 1)
+    return values
+
+def build_quantile_sketches(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Constrói os sketches de quantis por dia x estado x categoria.
+
+    Cada sketch é um histograma em buckets logarítmicos (no estilo DDSketch): somar
+    as contagens de vários sketches é uma fusão exata, então qualquer combinação
+    de dias, estados e categorias é atendida somando linhas. Os valores são
+    registrados por pedido, na categoria do primeiro item do pedido.
+
+    Args:
+        df: DataFrame consolidado do Olist
+
+    Returns:
+        DataFrame longo com as colunas date, customer_state, product_category_name,
+        metric ('delivery_time' ou 'ticket'), bucket e count
+    """
+    items = df.drop_duplicates(['order_id', 'order_item_id'])
+    purchase = pd.to_datetime(items['order_purchase_timestamp'])
+    delivered = pd.to_datetime(items['order_delivered_customer_date'])
+    items = items.assign(
+        date=purchase.dt.normalize(),
+        delivery_time=(delivered - purchase).dt.days
+    )
+
+    # Um registro por pedido, na categoria do primeiro item
+    orders = items.sort_values(['order_id', 'order_item_id']).groupby('order_id', sort=False).agg(
+        date=('date', 'first'),
+        customer_state=('customer_state', 'first'),
+        product_category_name=('product_category_name', 'first'),
+        delivery_time=('delivery_time', 'first'),
+        ticket=('price', 'sum')
+    )
+    orders['customer_state'] = orders['customer_state'].fillna('desconhecido')
+    orders['product_category_name'] = orders['product_category_name'].fillna('desconhecido')
+
+    sketches = []
+    for metric in ['delivery_time', 'ticket']:
+        valid = orders[orders[metric].notna()]
+        sketch = (
+            valid[SKETCH_DIMS]
+            .assign(metric=metric, bucket=value_to_bucket(valid[metric].to_numpy()))
+            .groupby(SKETCH_DIMS + ['metric', 'bucket'])
+            .size()
+            .rename('count')
+            .reset_index()
+        )
+        sketches.append(sketch)
+    return pd.concat(sketches, ignore_index=True)
+
+@st.cache_data
+def load_quantile_sketches(_df: pd.DataFrame, data_version: str) -> pd.DataFrame:
+    """
+    Carrega os sketches gerados no ETL, reconstruindo-os se estiverem ausentes ou desatualizados.
+
+    Args:
+        _df: DataFrame consolidado (usado apenas quando é preciso reconstruir)
+        data_version: Versão do dataset, usada como chave do cache
+    """
+    data_path = "olist_merged_data.parquet"
+    if os.path.exists(SKETCHES_PATH) and (
+        not os.path.exists(data_path) or os.path.getmtime(SKETCHES_PATH) >= os.path.getmtime(data_path)
+    ):
+        return pd.read_parquet(SKETCHES_PATH)
+    return build_quantile_sketches(_df)
+
+def _quantiles_from_counts(buckets: np.ndarray, counts: np.ndarray, quantiles: Tuple[float, ...]) -> List[float]:
+    """Extrai quantis de um histograma de buckets já fundido e ordenado."""
+    total = counts.sum()
+    if total == 0:
+        return [np.nan] * len(quantiles)
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(quantiles) * (total - 1)
+    positions = np.searchsorted(cumulative, ranks, side='right')
+    return list(bucket_to_value(buckets[positions]))
+
+def query_quantiles(sketches: pd.DataFrame, metric: str, quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+                    date_range=None, states: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+                    by: Optional[str] = None):
+    """
+    Funde os sketches selecionados e retorna os quantis pedidos.
+
+    Args:
+        sketches: Resultado de build_quantile_sketches
+        metric: 'delivery_time' ou 'ticket'
+        quantiles: Quantis desejados, ex.: (0.5, 0.9, 0.99)
+        date_range: Lista [início, fim] ou None para todo o período
+        states: Estados a incluir (None para todos)
+        categories: Categorias a incluir (None para todas)
+        by: Dimensão opcional ('customer_state' ou 'product_category_name') para quantis por grupo
+
+    Returns:
+        Dict 'p50', 'p90', ... -> valor, ou DataFrame com uma linha por grupo quando `by` é informado
+    """
+    mask = sketches['metric'] == metric
+    if date_range:
+        mask &= sketches['date'] >= pd.to_datetime(date_range[0]).normalize()
+        mask &= sketches['date'] <= pd.to_datetime(date_range[1]).normalize()
+    if states is not None:
+        mask &= sketches['customer_state'].isin(states)
+    if categories is not None:
+        mask &= sketches['product_category_name'].isin(categories)
+    selected = sketches.loc[mask]
+
+    labels = [f"p{int(round(q * 100))}" for q in quantiles]
+    if by is None:
+        merged = selected.groupby('bucket')['count'].sum()
+        values = _quantiles_from_counts(merged.index.to_numpy(), merged.to_numpy(), quantiles)
+        return dict(zip(labels, values))
+
+    merged = selected.groupby([by, 'bucket'])['count'].sum()
+    rows = {}
+    for group, histogram in merged.groupby(level=0):
+        buckets = histogram.index.get_level_values('bucket').to_numpy()
+        counts = histogram.to_numpy()
+        rows[group] = _quantiles_from_counts(buckets, counts, quantiles) + [counts.sum()]
+    result = pd.DataFrame.from_dict(rows, orient='index', columns=labels + ['pedidos'])
+    result.index.name = by
+    return result
@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Tuple
+from utils.cube import PrefixSumIndex
+
+# Métricas móveis: nome -> (medida do numerador, medida do denominador).
+# Sem denominador, a métrica é a média diária da medida na janela.
+ROLLING_METRICS = {
+    'receita': ('receita', None),
+    'pedidos': ('pedidos', None),
+    'taxa_cancelamento': ('linhas_canceladas', 'linhas'),
+    'csat': ('review_sum', 'review_count'),
+    'tempo_entrega': ('delivery_sum', 'delivery_count'),
+}
+
+# Rótulos usados nos gráficos
+ROLLING_LABELS = {
+    'receita': 'Receita Diária Média (R$)',
+    'pedidos': 'Pedidos por Dia',
+    'taxa_cancelamento': 'Taxa de Cancelamento',
+    'csat': 'Satisfação Média',
+    'tempo_entrega': 'Tempo Médio de Entrega (dias)',
+}
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+def calculate_rolling_metrics(index: PrefixSumIndex, windows: Tuple[int, ...] = DEFAULT_WINDOWS, start=None, end=None) -> pd.DataFrame:
+    """
+    Calcula as métricas móveis a partir das somas prefixadas do cubo diário.
+
+    Cada soma móvel é a diferença P[t + 1] - P[t + 1 - janela], então o custo é
+    linear no número de dias e não depende do tamanho da janela. As janelas podem
+    usar dias anteriores a `start`; dias sem histórico suficiente ficam como NaN.
+
+    Args:
+        index: Índice de somas prefixadas sem separação por dimensão
+        windows: Tamanhos das janelas em dias
+        start: Primeiro dia retornado (padrão: início dos dados)
+        end: Último dia retornado (padrão: fim dos dados)
+
+    Returns:
+        DataFrame indexado por dia com uma coluna '<métrica>_<janela>d' por combinação
+    """
+    n_days = len(index.days)
+    positions = np.arange(1, n_days + 1)
+    measure_position = {name: i for i, name in enumerate(index.measures)}
+
+    columns = {}
+    for window in windows:
+        lower = np.maximum(positions - window, 0)
+        sums = index.prefix[positions] - index.prefix[lower]
+        incomplete = positions < window
+        for metric, (numerator, denominator) in ROLLING_METRICS.items():
+            top = sums[:, measure_position[numerator]]
+            if denominator is None:
+                values = top / window
+            else:
+                bottom = sums[:, measure_position[denominator]]
+                values = np.divide(top, bottom, out=np.full(n_days, np.nan), where=bottom > 0)
+            values[incomplete] = np.nan
+            columns[f'{metric}_{window}d'] = values
+
+    rolling = pd.DataFrame(columns, index=index.days)
+    rolling.index.name = 'date'
+    i, j = index.bounds(start, end)
+    return rolling.iloc[i:j]
+
+@st.cache_data
+def get_rolling_metrics(_index: PrefixSumIndex, data_version: str, date_range=None, windows: Tuple[int, ...] = DEFAULT_WINDOWS) -> pd.DataFrame:
+    """Métricas móveis em cache por versão do dataset, período filtrado e janelas."""
+    start, end = date_range if date_range else (None, None)
+    return calculate_rolling_metrics(_index, windows, start, end)
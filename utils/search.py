@@ -0,0 +1,159 @@
+import re
+import pandas as pd
+import numpy as np
+import streamlit as st
+from typing import Dict, Any, List, Optional
+from utils.nlp_analysis import tokenize_text, normalize_words, get_stop_words
+
+# Separador de alternativas na consulta ("atraso OR demora")
+OR_PATTERN = re.compile(r'\s+(?:OR|OU)\s+|\s*\|\s*')
+# Frases entre aspas ("não chegou")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+def ignored_terms(query: str) -> List[str]:
+    """
+    Palavras da consulta descartadas pela normalização.
+
+    O índice é construído sobre os tokens do corpus, que não têm stop words
+    (incluindo negações como "não" e termos de CUSTOM_STOP_WORDS como "chegou"),
+    então essas palavras não podem ser buscadas e são ignoradas na consulta.
+    """
+    stop_words = get_stop_words()
+    words = normalize_words(OR_PATTERN.sub(' ', query.replace('"', ' ')))
+    return list(dict.fromkeys(word for word in words if word in stop_words))
+
+class ReviewSearchIndex:
+    """
+    Índice invertido sobre os tokens normalizados do corpus de avaliações.
+
+    Cada termo tem duas listas de postings em arrays de inteiros ordenados: as
+    avaliações que o contêm (para E/OU) e os pares (avaliação, posição) de cada
+    ocorrência (para frases). Todas as listas ficam concatenadas em arrays únicos,
+    com os deslocamentos de cada termo. Consultas usam a mesma normalização do
+    corpus (minúsculas, sem stop words, lematização), então frases casam tokens
+    consecutivos após a remoção das stop words.
+    """
+
+    def __init__(self, corpus: pd.DataFrame):
+        tokens = corpus['tokens']
+        lengths = tokens.map(len).to_numpy(dtype=np.int64)
+        docs = np.repeat(np.arange(len(corpus), dtype=np.int32), lengths)
+        positions = (np.arange(len(docs)) - np.repeat(np.cumsum(lengths) - lengths, lengths)).astype(np.int32)
+        words = np.concatenate([np.asarray(review, dtype=object) for review in tokens]) if len(docs) else np.array([], dtype=object)
+        term_ids, self.vocabulary = pd.factorize(words)
+        self.vocabulary = pd.Index(self.vocabulary)
+
+        # Postings posicionais ordenados por (termo, avaliação, posição)
+        order = np.lexsort((positions, docs, term_ids))
+        term_ids, self.post_docs, self.post_positions = term_ids[order], docs[order], positions[order]
+        self.offsets = np.searchsorted(term_ids, np.arange(len(self.vocabulary) + 1))
+
+        # Postings por avaliação: uma entrada por (termo, avaliação)
+        first = np.ones(len(term_ids), dtype=bool)
+        first[1:] = (term_ids[1:] != term_ids[:-1]) | (self.post_docs[1:] != self.post_docs[:-1])
+        self.doc_postings = self.post_docs[first]
+        self.doc_offsets = np.searchsorted(term_ids[first], np.arange(len(self.vocabulary) + 1))
+
+        self.n_docs = len(corpus)
+        self.max_length = int(lengths.max()) + 1 if len(lengths) else 1
+        self.dates = pd.to_datetime(corpus['date']).to_numpy()
+        self.categories = corpus['product_category_name'].fillna('desconhecido').to_numpy()
+        self.reviews = corpus[['review_id', 'date', 'review_score', 'product_category_name', 'review_comment_message']].reset_index(drop=True)
+
+    def _term_id(self, term: str) -> int:
+        """Posição do termo no vocabulário (-1 se ausente)."""
+        return int(self.vocabulary.get_indexer([term])[0])
+
+    def term_docs(self, term: str) -> np.ndarray:
+        """Avaliações que contêm o termo (array ordenado)."""
+        term_id = self._term_id(term)
+        if term_id < 0:
+            return np.empty(0, dtype=np.int32)
+        return self.doc_postings[self.doc_offsets[term_id]:self.doc_offsets[term_id + 1]]
+
+    def phrase_docs(self, terms: List[str]) -> np.ndarray:
+        """Avaliações em que os termos aparecem consecutivos, na ordem dada."""
+        term_ids = [self._term_id(term) for term in terms]
+        if min(term_ids) < 0:
+            return np.empty(0, dtype=np.int32)
+        keys = []
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            keys.append(self.post_docs[start:end].astype(np.int64) * self.max_length + self.post_positions[start:end])
+        # Ocorrências do primeiro termo seguidas pelos demais nas posições seguintes
+        starts = keys[0]
+        for shift, following in enumerate(keys[1:], start=1):
+            starts = starts[np.isin(starts + shift, following, assume_unique=True)]
+        return np.unique(starts // self.max_length).astype(np.int32)
+
+    def match(self, query: str) -> np.ndarray:
+        """
+        Avaliações que satisfazem a consulta.
+
+        Sintaxe: termos separados por espaço são combinados com E, alternativas são
+        separadas por OR, OU ou |, e frases ficam entre aspas.
+        Ex.: 'quebrado OR "embalagem violada"' ou 'entrega atraso'. Stop words
+        são ignoradas (ver ignored_terms), e um trecho formado só por elas não
+        casa nenhuma avaliação.
+        """
+        result = np.empty(0, dtype=np.int32)
+        for clause in OR_PATTERN.split(query.strip()):
+            postings = [self.phrase_docs(terms) for terms in map(tokenize_text, PHRASE_PATTERN.findall(clause)) if terms]
+            postings += [self.term_docs(term) for term in tokenize_text(PHRASE_PATTERN.sub(' ', clause))]
+            if not postings:
+                continue
+            # Interseção a partir da lista mais curta
+            postings.sort(key=len)
+            docs = postings[0]
+            for other in postings[1:]:
+                docs = np.intersect1d(docs, other, assume_unique=True)
+            result = np.union1d(result, docs)
+        return result.astype(np.int32)
+
+    def search(self, query: str, date_range=None, categories: Optional[List[str]] = None, k: int = 20) -> Dict[str, Any]:
+        """
+        Busca avaliações e resume os resultados.
+
+        Args:
+            query: Consulta (ver match)
+            date_range: Lista [início, fim] da data da compra, ou None
+            categories: Categorias a incluir (None ou vazio para todas)
+            k: Número de avaliações retornadas
+
+        Returns:
+            Dict com count, avg_score, scores (contagem por nota), categories
+            (contagem por categoria), trend (contagem mensal), reviews (as k
+            avaliações com mais ocorrências dos termos, das mais recentes para as
+            mais antigas em caso de empate) e ignored (palavras da consulta
+            descartadas pela normalização)
+        """
+        docs = self.match(query)
+        if date_range and len(docs):
+            dates = self.dates[docs]
+            docs = docs[(dates >= pd.to_datetime(date_range[0]).normalize()) & (dates <= pd.to_datetime(date_range[1]))]
+        if categories and len(docs):
+            docs = docs[np.isin(self.categories[docs], categories)]
+
+        matched = self.reviews.iloc[docs]
+        # Relevância: ocorrências dos termos da consulta em cada avaliação
+        hits = np.zeros(self.n_docs, dtype=np.int32)
+        for term in set(tokenize_text(PHRASE_PATTERN.sub(lambda m: m.group(1), query))):
+            term_id = self._term_id(term)
+            if term_id >= 0:
+                hits += np.bincount(self.post_docs[self.offsets[term_id]:self.offsets[term_id + 1]], minlength=self.n_docs).astype(np.int32)
+        ranked = matched.assign(ocorrencias=hits[docs]).sort_values(['ocorrencias', 'date'], ascending=False, kind='stable')
+
+        return {
+            'count': len(docs),
+            'avg_score': matched['review_score'].mean(),
+            'scores': matched['review_score'].value_counts().sort_index(),
+            'categories': matched['product_category_name'].fillna('desconhecido').value_counts(),
+            'trend': matched.groupby(pd.to_datetime(matched['date']).dt.to_period('M')).size(),
+            'reviews': ranked.head(k),
+            'ignored': ignored_terms(query),
+        }
+
+@st.cache_resource
+def get_search_index(_corpus: pd.DataFrame, data_version: str) -> ReviewSearchIndex:
+    """Constrói (uma vez por versão do dataset) o índice de busca das avaliações."""
+    return ReviewSearchIndex(_corpus)
@@ -0,0 +1,76 @@
+import heapq
+import pandas as pd
+import streamlit as st
+
+# Métricas do scorecard: nome -> (rótulo, maior é melhor)
+SELLER_METRICS = {
+    'revenue': ('Receita (R$)', True),
+    'orders': ('Pedidos', True),
+    'cancellation_rate': ('Taxa de Cancelamento', False),
+    'review_score': ('Avaliação Média', True),
+    'avg_delivery_time': ('Tempo Médio de Entrega (dias)', False),
+    'late_share': ('Entregas Atrasadas', False),
+}
+
+def calculate_seller_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula o scorecard de cada vendedor em uma única passada agrupada.
+
+    Os dados são reduzidos ao grão de item do pedido (order_id, order_item_id)
+    antes da agregação, pois o DataFrame consolidado repete cada item por pagamento.
+
+    Args:
+        df: DataFrame consolidado do Olist
+
+    Returns:
+        DataFrame indexado por seller_id com cidade, estado, receita, pedidos, itens,
+        taxa de cancelamento, avaliação média, tempo médio de entrega e % de atrasos
+    """
+    items = df.drop_duplicates(['order_id', 'order_item_id'])
+    purchase = pd.to_datetime(items['order_purchase_timestamp'])
+    delivered = pd.to_datetime(items['order_delivered_customer_date'])
+    estimated = pd.to_datetime(items['order_estimated_delivery_date'])
+    items = items.assign(
+        receita_liquida=items['price'].where(items['pedido_cancelado'] == 0, 0),
+        delivery_time=(delivered - purchase).dt.days,
+        # Atraso só é definido para pedidos entregues
+        is_late=(delivered > estimated).astype(float).where(delivered.notna())
+    )
+
+    return items.groupby('seller_id').agg(
+        seller_city=('seller_city', 'first'),
+        seller_state=('seller_state', 'first'),
+        revenue=('receita_liquida', 'sum'),
+        orders=('order_id', 'nunique'),
+        items=('order_id', 'size'),
+        cancellation_rate=('pedido_cancelado', 'mean'),
+        review_score=('review_score', 'mean'),
+        avg_delivery_time=('delivery_time', 'mean'),
+        late_share=('is_late', 'mean')
+    )
+
+@st.cache_data
+def get_seller_scorecard(_df: pd.DataFrame, data_version: str, date_range=None) -> pd.DataFrame:
+    """Scorecard de vendedores em cache por versão do dataset e período filtrado."""
+    return calculate_seller_metrics(_df)
+
+def rank_sellers(metrics: pd.DataFrame, metric: str, k: int = 10, best: bool = True, min_orders: int = 1) -> pd.DataFrame:
+    """
+    Seleciona os k melhores ou piores vendedores em uma métrica usando um heap.
+
+    Args:
+        metrics: Resultado de calculate_seller_metrics
+        metric: Coluna do scorecard (ver SELLER_METRICS)
+        k: Número de vendedores
+        best: True para os melhores, False para os piores
+        min_orders: Mínimo de pedidos para o vendedor entrar no ranking
+
+    Returns:
+        DataFrame com os k vendedores ordenados
+    """
+    higher_is_better = SELLER_METRICS[metric][1]
+    eligible = metrics[(metrics['orders'] >= min_orders) & metrics[metric].notna()]
+    candidates = zip(eligible[metric].to_numpy(), eligible.index)
+    select = heapq.nlargest if best == higher_is_better else heapq.nsmallest
+    top = select(k, candidates, key=lambda item: item[0])
+    return eligible.loc[[seller_id for _, seller_id in top]]
@@ -0,0 +1,117 @@
+import numpy as np
+from scipy import sparse
+from typing import Dict, List, Tuple
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Léxico de polaridade em português: termo -> peso (-3 a 3)
+SENTIMENT_LEXICON = {
+    # Positivos
+    'bom': 1.5, 'boa': 1.5, 'bons': 1.5, 'boas': 1.5,
+    'ótimo': 2.5, 'ótima': 2.5, 'otimo': 2.5, 'otima': 2.5, 'ótimos': 2.5, 'ótimas': 2.5,
+    'excelente': 3.0, 'excelentes': 3.0, 'perfeito': 3.0, 'perfeita': 3.0, 'maravilhoso': 3.0, 'maravilhosa': 3.0,
+    'adorei': 2.5, 'amei': 3.0, 'gostei': 2.0, 'recomendo': 2.0, 'satisfeito': 2.0, 'satisfeita': 2.0,
+    'rápido': 1.5, 'rápida': 1.5, 'rapido': 1.5, 'rapida': 1.5, 'rapidez': 1.5,
+    'lindo': 2.0, 'linda': 2.0, 'bonito': 1.5, 'bonita': 1.5, 'top': 2.0,
+    'parabéns': 2.5, 'parabens': 2.5, 'certinho': 1.5, 'correto': 1.0, 'correta': 1.0,
+    'confiável': 1.5, 'confiavel': 1.5, 'eficiente': 2.0, 'agradável': 1.5, 'feliz': 2.0,
+    'superou': 2.5, 'antes': 0.5, 'prazo': 0.5, 'funciona': 1.0, 'conforme': 0.5,
+    # Negativos
+    'ruim': -2.0, 'ruins': -2.0, 'péssimo': -3.0, 'péssima': -3.0, 'pessimo': -3.0, 'pessima': -3.0,
+    'horrível': -3.0, 'horrivel': -3.0, 'terrível': -3.0, 'terrivel': -3.0, 'lixo': -3.0, 'pior': -2.5,
+    'defeito': -2.5, 'defeituoso': -2.5, 'defeituosa': -2.5, 'quebrado': -2.5, 'quebrada': -2.5,
+    'atrasado': -2.0, 'atrasada': -2.0, 'atraso': -2.0, 'atrasou': -2.0, 'demora': -1.5, 'demorou': -1.5,
+    'errado': -2.0, 'errada': -2.0, 'faltando': -2.0, 'falta': -1.0, 'faltou': -2.0,
+    'problema': -1.5, 'problemas': -1.5, 'decepcionado': -2.5, 'decepcionada': -2.5, 'decepção': -2.5,
+    'insatisfeito': -2.5, 'insatisfeita': -2.5, 'reclamação': -1.5, 'devolver': -1.5, 'devolução': -1.5,
+    'cancelado': -1.5, 'cancelei': -1.5, 'fraco': -1.5, 'fraca': -1.5, 'caro': -1.0, 'frágil': -1.0,
+    'enganado': -2.5, 'enganada': -2.5, 'golpe': -3.0, 'descaso': -2.5, 'absurdo': -2.5, 'lamentável': -2.5,
+}
+
+# Pesos de termos neutros que mudam de sentido quando negados: termo -> peso com negação
+NEGATED_LEXICON = {
+    'recebi': -2.5, 'recebido': -2.5, 'chegou': -2.0, 'entregue': -2.0, 'entregaram': -2.0,
+    'veio': -1.0, 'funciona': -2.5, 'funcionou': -2.5, 'respondem': -1.5, 'resposta': -1.5,
+}
+
+NEGATORS = frozenset({'não', 'nao', 'nem', 'nunca', 'jamais', 'sem'})
+INTENSIFIERS = frozenset({'muito', 'muita', 'super', 'bem', 'bastante', 'extremamente', 'totalmente', 'mega', 'tão', 'tao'})
+
+# Alcance da negação (termos seguintes) e fatores aplicados aos pesos
+NEGATION_SCOPE = 3
+NEGATION_FACTOR = -0.75
+INTENSIFIER_FACTOR = 1.5
+# Constante de normalização do escore bruto para (-1, 1), como no VADER
+NORMALIZATION_ALPHA = 15.0
+
+NEGATION_PREFIX = 'NEG_'
+INTENSIFIER_PREFIX = 'INT_'
+
+def sentiment_features(words: List[str]) -> List[str]:
+    """
+    Converte as palavras normalizadas de uma avaliação em features do léxico.
+
+    Termos até NEGATION_SCOPE posições após um negador recebem o prefixo NEG_ e o
+    termo logo após um intensificador recebe INT_ (ex.: "não muito bom" ->
+    NEG_INT_bom). Negadores e intensificadores não geram features próprias.
+    """
+    features = []
+    negated = 0
+    intensified = False
+    for word in words:
+        if word in NEGATORS:
+            negated = NEGATION_SCOPE
+            continue
+        if word in INTENSIFIERS:
+            intensified = True
+            continue
+        prefix = (NEGATION_PREFIX if negated else '') + (INTENSIFIER_PREFIX if intensified else '')
+        features.append(prefix + word)
+        negated = max(negated - 1, 0)
+        intensified = False
+    return features
+
+def build_sentiment_weights() -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Vocabulário de features e vetor de pesos do léxico.
+
+    Cada termo gera as variantes simples, NEG_, INT_ e NEG_INT_; termos de
+    NEGATED_LEXICON têm peso próprio quando negados.
+
+    Returns:
+        Tupla (feature -> coluna, vetor de pesos)
+    """
+    weights = {}
+    for term, weight in SENTIMENT_LEXICON.items():
+        weights[term] = weight
+        weights[INTENSIFIER_PREFIX + term] = weight * INTENSIFIER_FACTOR
+        weights[NEGATION_PREFIX + term] = weight * NEGATION_FACTOR
+        weights[NEGATION_PREFIX + INTENSIFIER_PREFIX + term] = weight * INTENSIFIER_FACTOR * NEGATION_FACTOR
+    for term, weight in NEGATED_LEXICON.items():
+        weights[NEGATION_PREFIX + term] = weight
+        weights[NEGATION_PREFIX + INTENSIFIER_PREFIX + term] = weight * INTENSIFIER_FACTOR
+    vocabulary = {feature: column for column, feature in enumerate(weights)}
+    return vocabulary, np.fromiter(weights.values(), dtype=float, count=len(weights))
+
+SENTIMENT_VOCABULARY, SENTIMENT_WEIGHTS = build_sentiment_weights()
+
+def _identity_analyzer(features):
+    """As features já vêm prontas de sentiment_features."""
+    return features
+
+def sentiment_matrix(word_lists: List[List[str]]) -> sparse.csr_matrix:
+    """Matriz esparsa avaliações x features do léxico (contagens)."""
+    vectorizer = CountVectorizer(analyzer=_identity_analyzer, vocabulary=SENTIMENT_VOCABULARY)
+    return vectorizer.transform([sentiment_features(words) for words in word_lists])
+
+def score_reviews(word_lists: List[List[str]]) -> np.ndarray:
+    """
+    Polaridade do texto de cada avaliação, entre -1 (negativa) e 1 (positiva).
+
+    O escore bruto é o produto da matriz de features pelo vetor de pesos do léxico,
+    normalizado por x / sqrt(x² + NORMALIZATION_ALPHA). Avaliações sem nenhum termo
+    do léxico ficam com 0.
+    """
+    if len(word_lists) == 0:
+        return np.zeros(0)
+    raw = sentiment_matrix(word_lists) @ SENTIMENT_WEIGHTS
+    return raw / np.sqrt(raw ** 2 + NORMALIZATION_ALPHA)
@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+from scipy import sparse
+from typing import List, Optional
+
+# Faixas de nota de cada sentimento (inclusive): nome -> (mínimo, máximo)
+SENTIMENTS = {
+    'positive': (4, 5),
+    'neutral': (3, 3),
+    'negative': (1, 2),
+}
+
+KEY_LEVELS = ['date', 'sentiment', 'category']
+
+def sentiment_labels(scores: pd.Series) -> np.ndarray:
+    """Sentimento de cada avaliação a partir da nota (SENTIMENTS)."""
+    scores = scores.to_numpy(dtype=float)
+    conditions = [(scores >= low) & (scores <= high) for low, high in SENTIMENTS.values()]
+    return np.select(conditions, list(SENTIMENTS), default='')
+
+class TermFrequencyIndex:
+    """
+    Contagens de termos por dia x sentimento x categoria em uma matriz esparsa.
+
+    Cada linha é uma combinação (data, sentimento, categoria) e cada coluna um termo
+    do vocabulário compartilhado. As frequências de qualquer recorte são a soma das
+    linhas selecionadas (um produto matriz-vetor esparso) seguida de argpartition
+    para os N maiores. Novas avaliações entram com append: termos e combinações
+    novas ganham colunas e linhas, e as contagens existentes são somadas.
+    """
+
+    def __init__(self, reviews: Optional[pd.DataFrame] = None):
+        self.vocabulary = pd.Index([], dtype=object)
+        self.row_keys = pd.MultiIndex.from_arrays([[], [], []], names=KEY_LEVELS)
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.int64)
+        if reviews is not None:
+            self.append(reviews)
+
+    def append(self, reviews: pd.DataFrame) -> 'TermFrequencyIndex':
+        """
+        Soma as avaliações ao índice.
+
+        Args:
+            reviews: Avaliações no formato do corpus (colunas date, review_score,
+                product_category_name e tokens)
+        """
+        reviews = reviews[reviews['tokens'].map(len).to_numpy() > 0]
+        sentiments = sentiment_labels(reviews['review_score'])
+        reviews = reviews[sentiments != '']
+        if reviews.empty:
+            return self
+
+        keys = pd.MultiIndex.from_arrays([
+            pd.to_datetime(reviews['date']).dt.normalize(),
+            sentiments[sentiments != ''],
+            reviews['product_category_name'].fillna('desconhecido'),
+        ], names=KEY_LEVELS)
+        new_keys = keys.unique()
+        self.row_keys = self.row_keys.append(new_keys[self.row_keys.get_indexer(new_keys) < 0]) if len(self.row_keys) else new_keys
+
+        lengths = reviews['tokens'].map(len).to_numpy()
+        terms = np.concatenate([np.asarray(tokens, dtype=object) for tokens in reviews['tokens']])
+        new_terms = pd.Index(pd.unique(terms))
+        self.vocabulary = self.vocabulary.append(new_terms[self.vocabulary.get_indexer(new_terms) < 0])
+
+        rows = np.repeat(self.row_keys.get_indexer(keys), lengths)
+        cols = self.vocabulary.get_indexer(terms)
+        shape = (len(self.row_keys), len(self.vocabulary))
+        counts = sparse.csr_matrix((np.ones(len(terms), dtype=np.int64), (rows, cols)), shape=shape)
+        self.matrix.resize(shape)
+        self.matrix = (self.matrix + counts).tocsr()
+
+        self.dates = self.row_keys.get_level_values('date')
+        self.sentiments = self.row_keys.get_level_values('sentiment')
+        self.categories = self.row_keys.get_level_values('category')
+        return self
+
+    def row_mask(self, date_range=None, sentiments: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None) -> np.ndarray:
+        """Linhas do recorte (filtros vazios ou None incluem tudo)."""
+        mask = np.ones(len(self.row_keys), dtype=bool)
+        if len(self.row_keys) == 0:
+            return mask
+        if date_range:
+            mask &= (self.dates >= pd.to_datetime(date_range[0]).normalize()) & (self.dates <= pd.to_datetime(date_range[1]))
+        if sentiments:
+            mask &= self.sentiments.isin(sentiments)
+        if categories:
+            mask &= self.categories.isin(categories)
+        return mask
+
+    def term_counts(self, date_range=None, sentiments: Optional[List[str]] = None,
+                    categories: Optional[List[str]] = None) -> np.ndarray:
+        """Contagem de cada termo do vocabulário no recorte."""
+        mask = self.row_mask(date_range, sentiments, categories)
+        return self.matrix.T @ mask.astype(self.matrix.dtype)
+
+    def top_terms(self, n: int = 20, date_range=None, sentiments: Optional[List[str]] = None,
+                  categories: Optional[List[str]] = None) -> pd.Series:
+        """
+        N termos mais frequentes do recorte.
+
+        Returns:
+            pd.Series termo -> ocorrências, em ordem decrescente
+        """
+        counts = self.term_counts(date_range, sentiments, categories)
+        present = np.flatnonzero(counts > 0)
+        if len(present) > n:
+            present = present[np.argpartition(-counts[present], n)[:n]]
+        present = present[np.argsort(-counts[present], kind='stable')]
+        return pd.Series(counts[present], index=self.vocabulary[present], dtype=np.int64)
+
+@st.cache_resource
+def get_term_frequency_index(_corpus: pd.DataFrame, data_version: str) -> TermFrequencyIndex:
+    """Constrói (uma vez por versão do dataset) o índice de frequência de termos do corpus de avaliações."""
+    return TermFrequencyIndex(_corpus)
@@ -0,0 +1,170 @@
+import os
+import joblib
+import pandas as pd
+import numpy as np
+import streamlit as st
+from scipy import sparse
+from typing import Dict, Any, List, Optional
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.decomposition import LatentDirichletAllocation, MiniBatchNMF
+
+TOPIC_MODELS_PATH = os.path.join("models", "review_topics.joblib")
+
+# Parâmetros padrão do treinamento
+DEFAULT_N_TOPICS = 10
+DEFAULT_EPOCHS = 5
+DEFAULT_BATCH_SIZE = 2048
+MAX_FEATURES = 5000
+MIN_DF = 5
+
+# Métodos de modelagem de tópicos: nome -> rótulo
+TOPIC_METHODS = {
+    'lda': 'LDA',
+    'nmf': 'NMF',
+}
+
+def _identity_analyzer(tokens):
+    """Os tokens do corpus já estão normalizados; o vetorizador só os conta."""
+    return list(tokens)
+
+def train_topic_models(tokens: pd.Series, review_ids: pd.Series, n_topics: int = DEFAULT_N_TOPICS,
+                       n_epochs: int = DEFAULT_EPOCHS, batch_size: int = DEFAULT_BATCH_SIZE,
+                       seed: int = 42) -> Optional[Dict[str, Any]]:
+    """
+    Treina LDA e NMF sobre a matriz documento-termo por avaliação.
+
+    Cada avaliação é um documento. Os dois modelos são ajustados com atualizações
+    em minibatches (LDA online e MiniBatchNMF via partial_fit), percorrendo as
+    avaliações embaralhadas `n_epochs` vezes. O NMF usa a matriz ponderada por TF-IDF.
+
+    Args:
+        tokens: Lista de tokens de cada avaliação (coluna 'tokens' do corpus)
+        review_ids: review_id de cada avaliação, na mesma ordem
+        n_topics: Número de tópicos
+        n_epochs: Passadas sobre o corpus
+        batch_size: Avaliações por minibatch
+        seed: Semente do embaralhamento e dos modelos
+
+    Returns:
+        Dict com vectorizer, tfidf, lda, nmf, a matriz documento-termo ('dtm') e os
+        review_ids de suas linhas, ou None quando há menos avaliações com tokens que
+        tópicos ou nenhum termo atinge a frequência mínima. O número de tópicos é
+        limitado ao tamanho do vocabulário.
+    """
+    has_tokens = tokens.map(len).to_numpy() > 0
+    tokens, review_ids = tokens[has_tokens], review_ids[has_tokens]
+    if len(tokens) == 0 or len(tokens) < n_topics:
+        return None
+
+    vectorizer = CountVectorizer(analyzer=_identity_analyzer, max_features=MAX_FEATURES,
+                                 min_df=min(MIN_DF, len(tokens)))
+    try:
+        dtm = vectorizer.fit_transform(tokens).tocsr()
+    except ValueError:
+        # Nenhum termo atinge min_df
+        return None
+    tfidf = TfidfTransformer()
+    weighted = tfidf.fit_transform(dtm).tocsr()
+
+    # O NMF (init nndsvda) exige n_components <= min(documentos, termos)
+    n_topics = min(n_topics, dtm.shape[0], dtm.shape[1])
+    lda = LatentDirichletAllocation(n_components=n_topics, learning_method='online', batch_size=batch_size,
+                                    total_samples=dtm.shape[0], random_state=seed)
+    nmf = MiniBatchNMF(n_components=n_topics, batch_size=batch_size, init='nndsvda', random_state=seed)
+
+    rng = np.random.default_rng(seed)
+    for _ in range(n_epochs):
+        order = rng.permutation(dtm.shape[0])
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            lda.partial_fit(dtm[rows])
+            nmf.partial_fit(weighted[rows])
+
+    return {
+        'vectorizer': vectorizer,
+        'tfidf': tfidf,
+        'lda': lda,
+        'nmf': nmf,
+        'dtm': dtm,
+        'review_ids': np.asarray(review_ids, dtype=object),
+        'n_topics': n_topics,
+        'trained_at': pd.Timestamp.now().isoformat(),
+    }
+
+def save_topic_models(models: Dict[str, Any], path: str = TOPIC_MODELS_PATH) -> None:
+    """Persiste os modelos de tópicos com joblib."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(models, path, compress=3)
+
+def load_topic_models(path: str = TOPIC_MODELS_PATH) -> Optional[Dict[str, Any]]:
+    """Carrega os modelos de tópicos persistidos (None se o arquivo não existir)."""
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+@st.cache_resource
+def get_topic_models(_corpus: pd.DataFrame, data_version: str, path: str = TOPIC_MODELS_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Modelos de tópicos treinados offline (train_topic_models.py).
+
+    Sem o arquivo, treina em memória uma vez por versão do dataset (None se o
+    corpus for pequeno demais para treinar).
+    """
+    models = load_topic_models(path)
+    if models is None:
+        models = train_topic_models(_corpus['tokens'], _corpus['review_id'])
+    return models
+
+def review_term_matrix(models: Dict[str, Any], reviews: pd.DataFrame) -> sparse.csr_matrix:
+    """
+    Linhas da matriz documento-termo das avaliações selecionadas.
+
+    Avaliações vistas no treinamento reaproveitam a matriz persistida; as demais
+    (ex.: dados mais novos que o modelo) são vetorizadas na hora.
+    """
+    positions = pd.Index(models['review_ids']).get_indexer(reviews['review_id'])
+    known = positions >= 0
+    blocks = [models['dtm'][positions[known]]]
+    if not known.all():
+        blocks.append(models['vectorizer'].transform(reviews['tokens'].to_numpy()[~known]))
+    return sparse.vstack(blocks).tocsr()
+
+def topic_shares(models: Dict[str, Any], dtm: sparse.csr_matrix, method: str = 'lda') -> np.ndarray:
+    """
+    Participação média de cada tópico nas avaliações da matriz.
+
+    Avaliações sem nenhum termo do vocabulário são ignoradas.
+    """
+    dtm = dtm[dtm.getnnz(axis=1) > 0]
+    if dtm.shape[0] == 0:
+        return np.zeros(models['n_topics'])
+    if method == 'lda':
+        weights = models['lda'].transform(dtm)
+    else:
+        weights = models['nmf'].transform(models['tfidf'].transform(dtm))
+    totals = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    return weights.mean(axis=0)
+
+def topic_terms(models: Dict[str, Any], method: str = 'lda', n_words: int = 10) -> List[List[str]]:
+    """Palavras de maior peso de cada tópico."""
+    feature_names = models['vectorizer'].get_feature_names_out()
+    components = models[method].components_
+    return [[feature_names[i] for i in np.argsort(-topic)[:n_words]] for topic in components]
+
+def summarize_topics(models: Dict[str, Any], reviews: pd.DataFrame, method: str = 'lda',
+                     n_topics: int = 3, n_words: int = 10) -> List[str]:
+    """
+    Principais tópicos de um subconjunto de avaliações, ordenados pela participação média.
+
+    Returns:
+        Lista de textos no formato "Tópico k (xx.x%): palavra1, palavra2, ..."
+    """
+    if len(reviews) == 0:
+        return []
+    shares = topic_shares(models, review_term_matrix(models, reviews), method)
+    terms = topic_terms(models, method, n_words)
+    return [
+        f"Tópico {topic + 1} ({shares[topic]:.1%}): {', '.join(terms[topic])}"
+        for topic in np.argsort(-shares)[:n_topics] if shares[topic] > 0
+    ]